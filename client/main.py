@@ -1,9 +1,9 @@
 import sys
 import logging
 import asyncio
-from PyQt5.QtWidgets import QApplication, QStyleFactory
+from PyQt5.QtWidgets import QApplication, QStyleFactory, QMessageBox
 from PyQt5.QtGui import QPalette, QColor
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from qasync import QEventLoop
 from qt_material import apply_stylesheet
 
@@ -11,6 +11,7 @@ from services.api_client import ApiClient
 from services.database_manager import Database
 from views.main_window import MainWindow
 from views.auth_window import LoginWindow
+from utils.temp_files import purge_media_temp_files
 
 logging.basicConfig(
     level=logging.INFO,
@@ -25,12 +26,13 @@ logger = logging.getLogger("client-app")
 
 class ChatApplication:
     def __init__(self):
-        self.api_client = ApiClient()
         self.login_window = None
         self.main_window = None
         self.app = QApplication(sys.argv)
         self.loop = QEventLoop(self.app)
         asyncio.set_event_loop(self.loop)
+        self.api_client = ApiClient(loop=self.loop)
+        self.api_client.on_session_expired = self.on_session_expired
 
         self.setup_style()
 
@@ -84,6 +86,7 @@ class ChatApplication:
         if self.main_window:
             self.main_window.close()
             self.main_window = None
+        self.api_client.clear_session()
 
         self.login_window = LoginWindow(
             self.api_client,
@@ -91,8 +94,20 @@ class ChatApplication:
         )
         self.login_window.show()
 
+    def on_session_expired(self):
+        """Возврат к окну входа после истечения сессии"""
+        # Reported from inside a request, so the windows are swapped from the Qt queue
+        QTimer.singleShot(0, self._login_after_session_expired)
+
+    def _login_after_session_expired(self):
+        if not self.main_window:
+            return
+        self.on_logout()
+        QMessageBox.warning(self.login_window, "Session Expired", "Your session has expired. Please log in again.")
+
     def run(self):
         """Запуск приложения"""
+        purge_media_temp_files()
         self.login_window = LoginWindow(
             self.api_client,
             on_login_success=self.on_login_success
@@ -101,6 +116,7 @@ class ChatApplication:
 
         with self.loop:
             self.loop.run_forever()
+            self.loop.run_until_complete(self.api_client.close())
 
 
 if __name__ == '__main__':
@@ -0,0 +1,62 @@
+import json
+import base64
+import struct
+from typing import Tuple
+
+ENVELOPE_MAGIC = b"CCE1"
+ENVELOPE_CONTENT_TYPE = "application/x-chat-envelope"
+
+_HEADER_LENGTH = struct.Struct(">I")
+
+def is_envelope(raw: bytes) -> bool:
+    return raw[:len(ENVELOPE_MAGIC)] == ENVELOPE_MAGIC
+
+def encode_envelope(header: dict, payload: bytes = b"") -> bytes:
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return b"".join((ENVELOPE_MAGIC, _HEADER_LENGTH.pack(len(header_bytes)), header_bytes, payload))
+
+def decode_envelope(raw: bytes) -> Tuple[dict, bytes]:
+    if not is_envelope(raw):
+        raise ValueError("Not a chat envelope")
+    offset = len(ENVELOPE_MAGIC)
+    if len(raw) < offset + _HEADER_LENGTH.size:
+        raise ValueError("Truncated chat envelope")
+    (header_length,) = _HEADER_LENGTH.unpack_from(raw, offset)
+    offset += _HEADER_LENGTH.size
+    if len(raw) < offset + header_length:
+        raise ValueError("Truncated chat envelope header")
+    header = json.loads(raw[offset:offset + header_length])
+    return header, raw[offset + header_length:]
+
+def pack_event(event: dict) -> bytes:
+    header = dict(event)
+    container = header
+    if isinstance(header.get("data"), dict):
+        container = header["data"] = dict(header["data"])
+
+    payload = b""
+    for field, value in list(container.items()):
+        if isinstance(value, (bytes, bytearray)):
+            payload = bytes(value)
+            del container[field]
+            header["payload_field"] = field
+            break
+    return encode_envelope(header, payload)
+
+def unpack_event(raw: bytes) -> dict:
+    header, payload = decode_envelope(raw)
+    field = header.pop("payload_field", None)
+    if field is not None:
+        container = header["data"] if isinstance(header.get("data"), dict) else header
+        container[field] = payload
+    return header
+
+def decode_event(raw: bytes) -> dict:
+    if is_envelope(raw):
+        return unpack_event(raw)
+    return json.loads(raw.decode("utf-8"))
+
+def as_bytes(value) -> bytes:
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value)
+    return base64.b64decode(value)
@@ -0,0 +1,118 @@
+import json
+import asyncio
+import logging
+import struct
+from typing import List
+from urllib.parse import urlencode
+import websockets
+
+from messaging.envelope import decode_event
+from messaging.kafka.consumer import OffsetTracker
+
+logger = logging.getLogger("SecureChat")
+
+FRAME_HEADER = struct.Struct(">iq")
+
+def websocket_url(api_base_url: str) -> str:
+    if api_base_url.startswith("https://"):
+        return "wss://" + api_base_url[len("https://"):]
+    if api_base_url.startswith("http://"):
+        return "ws://" + api_base_url[len("http://"):]
+    return api_base_url
+
+
+class GatewayEventConsumer:
+    """Receives this user's events from the server push gateway instead of joining a Kafka group.
+
+    Offsets are the gateway's Kafka cursor and are committed to the local DB, so a reconnect resumes
+    where the last persisted event left off.
+    """
+
+    def __init__(self, api_base_url: str, user_id: str, cursor_store, topic: str = "chat_messages",
+                 max_records: int = 200, max_frame_size: int = 8 * 1024 * 1024, catch_up=None,
+                 token_provider=None):
+        self.url = f"{websocket_url(api_base_url.rstrip('/'))}/events/ws/{user_id}"
+        self.cursor_store = cursor_store
+        self.topic = topic
+        self.max_records = max_records
+        self.max_frame_size = max_frame_size
+        self.offsets = OffsetTracker()
+        self.catch_up = catch_up
+        self.token_provider = token_provider
+        self._ws = None
+
+    async def start(self):
+        self.offsets.reset()
+        if self.catch_up:
+            self.catch_up.reload()
+
+        params = {}
+        cursor = self.cursor_store.get_consumer_offsets(self.topic)
+        if cursor:
+            partition, offset = list(cursor.items())[-1]
+            params = {"partition": partition, "offset": offset}
+        elif not self.catch_up or self.catch_up.has_chats():
+            params = {"offset": 0}
+
+        # Awaited on every (re)connect, so a reconnect after a long outage does not reuse an expired token
+        token = await self.token_provider() if self.token_provider else None
+        if token:
+            params = {**params, "token": token}
+
+        url = f"{self.url}?{urlencode(params)}" if params else self.url
+        self._ws = await websockets.connect(url, max_size=self.max_frame_size)
+
+        hello = json.loads(await self._ws.recv())
+        logger.info(f"Connected to event gateway, partition {hello['partition']}, "
+                    f"resume {params.get('offset', 'live')}")
+        if self.catch_up:
+            self.catch_up.set_end_offsets({(self.topic, hello["partition"]): hello["end_offset"]})
+
+    async def stop(self):
+        if self._ws:
+            try:
+                await self.commit()
+            except Exception as e:
+                logger.warning(f"Final cursor commit failed: {e}")
+            await self._ws.close()
+            self._ws = None
+
+    async def get_batch(self, timeout_ms: int = 500) -> List[dict]:
+        if self._ws is None:
+            raise RuntimeError("Gateway consumer not started")
+
+        records = []
+        timeout = timeout_ms / 1000
+        while len(records) < self.max_records:
+            try:
+                frame = await asyncio.wait_for(self._ws.recv(), timeout=timeout)
+            except asyncio.TimeoutError:
+                break
+            # Drain whatever is already buffered without waiting for the next event
+            timeout = 0.01
+            if isinstance(frame, str):
+                continue
+            partition, offset = FRAME_HEADER.unpack_from(frame)
+            records.append({
+                "topic": self.topic,
+                "partition": partition,
+                "offset": offset,
+                "value": decode_event(frame[FRAME_HEADER.size:])
+            })
+
+        self.offsets.delivered(records)
+        if self.catch_up:
+            records, skipped = self.catch_up.split(records)
+            for record in skipped:
+                self.offsets.ack(record)
+        return records
+
+    def ack(self, record: dict):
+        self.offsets.ack(record)
+
+    async def commit(self):
+        offsets = self.offsets.committable()
+        if not offsets:
+            return
+        self.cursor_store.save_consumer_offsets(offsets)
+        self.offsets.committed(offsets)
@@ -0,0 +1,124 @@
+import logging
+import threading
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger("SecureChat")
+
+STATUS_EVENTS = {"user_joined", "user_left", "encryption_ready", "chat_closed"}
+
+class CatchUpFilter:
+    """Drops replayed events that cannot change local state before they reach the GUI thread.
+
+    Records for chats missing from the local DB, records at or below the offset already applied for
+    their chat, and all but the latest status event per chat while replaying history are skipped.
+    """
+
+    def __init__(self, db_manager, user_id: str):
+        self.db_manager = db_manager
+        self.user_id = user_id
+        self._lock = threading.Lock()
+        self._known_chats = set()
+        self._chat_offsets: Dict[Tuple[str, str, int], int] = {}
+        self._end_offsets: Dict[Tuple[str, int], int] = {}
+        self._pending: Dict[Tuple[str, str, int], set] = {}
+        self._highest: Dict[Tuple[str, str, int], int] = {}
+
+    def reload(self):
+        known_chats = set(self.db_manager.get_chat_ids())
+        chat_offsets = self.db_manager.get_chat_offsets()
+        with self._lock:
+            self._known_chats = known_chats
+            self._chat_offsets = chat_offsets
+            self._end_offsets = {}
+            self._pending.clear()
+            self._highest.clear()
+
+    def has_chats(self) -> bool:
+        with self._lock:
+            return bool(self._known_chats)
+
+    def is_known(self, chat_id: str) -> bool:
+        with self._lock:
+            return chat_id in self._known_chats
+
+    def add_chat(self, chat_id: str):
+        with self._lock:
+            self._known_chats.add(chat_id)
+
+    def remove_chat(self, chat_id: str):
+        with self._lock:
+            self._known_chats.discard(chat_id)
+            for offsets in (self._chat_offsets, self._pending, self._highest):
+                for key in [key for key in offsets if key[0] == chat_id]:
+                    del offsets[key]
+
+    def set_end_offsets(self, end_offsets: Dict[Tuple[str, int], int]):
+        with self._lock:
+            self._end_offsets = dict(end_offsets)
+
+    def split(self, records: List[dict]) -> Tuple[List[dict], List[dict]]:
+        deliver, skip = [], []
+        latest_status = {}
+
+        with self._lock:
+            for record in records:
+                value = record["value"]
+                chat_id = value.get("chat_id")
+                if (value.get("recipient", self.user_id) != self.user_id
+                        or chat_id not in self._known_chats
+                        or record["offset"] <= self._chat_offsets.get(
+                            (chat_id, record["topic"], record["partition"]), -1)):
+                    skip.append(record)
+                    continue
+
+                if value.get("type") in STATUS_EVENTS and self._replaying(record):
+                    previous = latest_status.get(chat_id)
+                    if previous is not None:
+                        skip.append(previous)
+                    latest_status[chat_id] = record
+                deliver.append(record)
+
+        if skip:
+            logger.debug(f"Catch-up skipped {len(skip)} of {len(records)} Kafka records")
+        superseded = {id(record) for record in skip}
+        return [record for record in deliver if id(record) not in superseded], skip
+
+    def _replaying(self, record: dict) -> bool:
+        return record["offset"] < self._end_offsets.get((record["topic"], record["partition"]), 0)
+
+    def deferred(self, record: dict):
+        key = self._chat_key(record)
+        if key is not None:
+            with self._lock:
+                self._pending.setdefault(key, set()).add(record["offset"])
+
+    def applied(self, records: List[dict]):
+        changed = {}
+        with self._lock:
+            touched = set()
+            for record in records:
+                key = self._chat_key(record)
+                if key is None:
+                    continue
+                self._pending.get(key, set()).discard(record["offset"])
+                self._highest[key] = max(self._highest.get(key, -1), record["offset"])
+                touched.add(key)
+
+            for key in touched:
+                position = self._highest[key]
+                waiting = self._pending.get(key)
+                if waiting:
+                    position = min(position, min(waiting) - 1)
+                if key[0] in self._known_chats and position > self._chat_offsets.get(key, -1):
+                    self._chat_offsets[key] = position
+                    changed[key] = position
+
+        if changed:
+            self.db_manager.save_chat_offsets(changed)
+
+    @staticmethod
+    def _chat_key(record: dict):
+        chat_id = record["value"].get("chat_id")
+        if chat_id is None:
+            return None
+        return chat_id, record["topic"], record["partition"]
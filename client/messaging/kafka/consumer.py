@@ -1,40 +1,152 @@
-import asyncio
-import json
-from aiokafka import AIOKafkaConsumer
+import logging
+import threading
+from typing import Dict, List, Tuple
+from aiokafka import AIOKafkaConsumer, TopicPartition
+from aiokafka.structs import OffsetAndMetadata
+
+from messaging.envelope import decode_event
+from messaging.kafka.partitioning import partition_for
+
+logger = logging.getLogger("SecureChat")
+
+class OffsetTracker:
+    """Tracks delivered offsets per partition and yields the highest contiguous acked position."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._outstanding: Dict[Tuple[str, int], set] = {}
+        self._next_offset: Dict[Tuple[str, int], int] = {}
+        self._committed: Dict[Tuple[str, int], int] = {}
+
+    def delivered(self, records: List[dict]):
+        with self._lock:
+            for record in records:
+                tp = (record["topic"], record["partition"])
+                self._outstanding.setdefault(tp, set()).add(record["offset"])
+                self._next_offset[tp] = max(self._next_offset.get(tp, 0), record["offset"] + 1)
+
+    def ack(self, record: dict):
+        with self._lock:
+            self._outstanding.get((record["topic"], record["partition"]), set()).discard(record["offset"])
+
+    def committable(self) -> Dict[Tuple[str, int], int]:
+        with self._lock:
+            offsets = {}
+            for tp, next_offset in self._next_offset.items():
+                outstanding = self._outstanding.get(tp)
+                position = min(outstanding) if outstanding else next_offset
+                if position > self._committed.get(tp, -1):
+                    offsets[tp] = position
+            return offsets
+
+    def committed(self, offsets: Dict[Tuple[str, int], int]):
+        with self._lock:
+            self._committed.update(offsets)
+
+    def reset(self):
+        with self._lock:
+            self._outstanding.clear()
+            self._next_offset.clear()
+            self._committed.clear()
+
 
 class KafkaEventConsumer:
-    def __init__(self, bootstrap_servers: str, topics: list, group_id: str):
+    def __init__(self, bootstrap_servers: str, topics: list, group_id: str, partition_key: str | None = None,
+                 max_records: int = 200, fetch_max_bytes: int = 16 * 1024 * 1024,
+                 max_partition_fetch_bytes: int = 4 * 1024 * 1024, catch_up=None):
         self.topics = topics
         self.bootstrap_servers = bootstrap_servers
         self.group_id = group_id
+        self.partition_key = partition_key
+        self.max_records = max_records
+        self.fetch_max_bytes = fetch_max_bytes
+        self.max_partition_fetch_bytes = max_partition_fetch_bytes
+        self.offsets = OffsetTracker()
+        self.catch_up = catch_up
         self._consumer: AIOKafkaConsumer | None = None
 
     async def start(self):
+        self.offsets.reset()
+        if self.catch_up:
+            self.catch_up.reload()
         self._consumer = AIOKafkaConsumer(
-            *self.topics,
             bootstrap_servers=self.bootstrap_servers,
-            value_deserializer=lambda m: json.loads(m.decode('utf-8')),
+            value_deserializer=decode_event,
             auto_offset_reset='earliest',
             group_id=self.group_id,
-            enable_auto_commit=True
+            enable_auto_commit=False,
+            fetch_max_bytes=self.fetch_max_bytes,
+            max_partition_fetch_bytes=self.max_partition_fetch_bytes
         )
         await self._consumer.start()
 
+        assignment = await self._own_partitions() if self.partition_key else None
+        if assignment:
+            logger.info(f"Consuming only {[f'{tp.topic}:{tp.partition}' for tp in assignment]}")
+            self._consumer.assign(assignment)
+            await self._prepare_catch_up(assignment)
+        else:
+            self._consumer.subscribe(self.topics)
+
+    async def _own_partitions(self):
+        await self._consumer.topics()
+        assignment = []
+        for topic in self.topics:
+            partitions = self._consumer.partitions_for_topic(topic)
+            if not partitions:
+                logger.warning(f"No partition metadata for {topic}, subscribing to the whole topic")
+                return None
+            assignment.append(TopicPartition(topic, partition_for(self.partition_key, len(partitions))))
+        return assignment
+
+    async def _prepare_catch_up(self, assignment):
+        if not self.catch_up:
+            return
+        end_offsets = await self._consumer.end_offsets(assignment)
+        self.catch_up.set_end_offsets({(tp.topic, tp.partition): offset for tp, offset in end_offsets.items()})
+
+        if self.catch_up.has_chats():
+            return
+        for tp in assignment:
+            if await self._consumer.committed(tp) is None:
+                logger.info(f"No local chats and no committed offset, skipping history of {tp.topic}:{tp.partition}")
+                await self._consumer.seek_to_end(tp)
+
     async def stop(self):
         if self._consumer:
+            try:
+                await self.commit()
+            except Exception as e:
+                logger.warning(f"Final offset commit failed: {e}")
             await self._consumer.stop()
+            self._consumer = None
 
-    def __aiter__(self):
-        return self
-
-    async def __anext__(self):
+    async def get_batch(self, timeout_ms: int = 500) -> List[dict]:
         if self._consumer is None:
-            raise StopAsyncIteration
-
-        try:
-            msg = await self._consumer.getone()
-            return msg
-        except asyncio.CancelledError:
-            raise StopAsyncIteration
-        except Exception as e:
-            raise StopAsyncIteration
+            raise RuntimeError("Kafka consumer not started")
+
+        batches = await self._consumer.getmany(timeout_ms=timeout_ms, max_records=self.max_records)
+        records = [
+            {"topic": msg.topic, "partition": msg.partition, "offset": msg.offset, "value": msg.value}
+            for messages in batches.values()
+            for msg in messages
+        ]
+        self.offsets.delivered(records)
+        if self.catch_up:
+            records, skipped = self.catch_up.split(records)
+            for record in skipped:
+                self.offsets.ack(record)
+        return records
+
+    def ack(self, record: dict):
+        self.offsets.ack(record)
+
+    async def commit(self):
+        offsets = self.offsets.committable()
+        if not offsets or self._consumer is None:
+            return
+        await self._consumer.commit({
+            TopicPartition(topic, partition): OffsetAndMetadata(offset, "")
+            for (topic, partition), offset in offsets.items()
+        })
+        self.offsets.committed(offsets)
@@ -0,0 +1,89 @@
+import logging
+from typing import Dict, Set, Tuple
+
+logger = logging.getLogger("SecureChat")
+
+class ChatSequenceTracker:
+    """Tracks which server-assigned per-chat seqs are stored locally, on the GUI thread.
+
+    The persisted cursor is the highest seq up to which every message of the chat is stored. Seqs
+    stored above it that are neither contiguous nor still being decrypted are a gap the history
+    sync has to fill.
+    """
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._cursors: Dict[str, int] = {}
+        self._stored_above: Dict[str, Set[int]] = {}
+        self._in_flight: Set[Tuple[str, int]] = set()
+
+    def cursor(self, chat_id: str) -> int:
+        if chat_id not in self._cursors:
+            self._cursors[chat_id] = self.db_manager.get_history_cursor(chat_id)
+        return self._cursors[chat_id]
+
+    def claim(self, chat_id: str, seq: int) -> bool:
+        """Returns False for a seq that is already stored or being handled, so the copy can be dropped."""
+        if seq <= self.cursor(chat_id) or seq in self._stored_above.get(chat_id, ()):
+            return False
+        if (chat_id, seq) in self._in_flight:
+            return False
+        if self.db_manager.has_message_seq(chat_id, seq):
+            # Stored by an earlier run above its cursor
+            self.complete(chat_id, seq)
+            return False
+        self._in_flight.add((chat_id, seq))
+        return True
+
+    def release(self, chat_id: str, seq: int):
+        """Gives up the claim on a seq that was not stored, so a redelivered copy or the history sync can store it."""
+        self._in_flight.discard((chat_id, seq))
+
+    def complete(self, chat_id: str, seq: int) -> bool:
+        """Marks seq as stored and returns True when messages below it are missing."""
+        self._in_flight.discard((chat_id, seq))
+        cursor = self.cursor(chat_id)
+        stored = self._stored_above.setdefault(chat_id, set())
+        if seq > cursor:
+            stored.add(seq)
+        return self._advance(chat_id)
+
+    def complete_range(self, chat_id: str, after: int, upto: int, handled: Set[int]) -> bool:
+        """Marks the seqs of a synced history page that are not handled separately as stored.
+
+        The history only returns messages for this user, the seqs in between went to other recipients.
+        """
+        stored = self._stored_above.setdefault(chat_id, set())
+        stored.update(seq for seq in range(max(after, self.cursor(chat_id)) + 1, upto + 1) if seq not in handled)
+        return self._advance(chat_id)
+
+    def _advance(self, chat_id: str) -> bool:
+        cursor = self.cursor(chat_id)
+        stored = self._stored_above.setdefault(chat_id, set())
+        advanced = cursor
+        while advanced + 1 in stored:
+            advanced += 1
+            stored.remove(advanced)
+        if advanced != cursor:
+            self._cursors[chat_id] = advanced
+            self.db_manager.save_history_cursor(chat_id, advanced)
+        return self.has_gap(chat_id)
+
+    def has_gap(self, chat_id: str) -> bool:
+        stored = self._stored_above.get(chat_id)
+        if not stored:
+            return False
+        return any(
+            seq not in stored and (chat_id, seq) not in self._in_flight
+            for seq in range(self.cursor(chat_id) + 1, max(stored))
+        )
+
+    def start_at(self, chat_id: str, seq: int):
+        """Starts the cursor of a joined chat at the seq the chat had reached before the join."""
+        self.forget(chat_id)
+        self.db_manager.save_history_cursor(chat_id, seq)
+
+    def forget(self, chat_id: str):
+        self._cursors.pop(chat_id, None)
+        self._stored_above.pop(chat_id, None)
+        self._in_flight = {key for key in self._in_flight if key[0] != chat_id}
@@ -1,6 +1,19 @@
 import json
+import time
+import base64
+import asyncio
 import logging
-import requests
+import concurrent.futures
+import httpx
+
+from messaging.envelope import ENVELOPE_CONTENT_TYPE, pack_event
+from utils.telemetry import tracer
+
+try:
+    import h2  # noqa: F401 - enables HTTP/2 in httpx
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 logging.basicConfig(
     level=logging.INFO,
@@ -8,132 +21,323 @@ logging.basicConfig(
 )
 logger = logging.getLogger("SecureChat")
 
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+SESSION_REFRESH_MARGIN = 300
+
+
+class SessionExpired(Exception):
+    pass
+
 
 class ApiClient:
 
-    def __init__(self, server_url="http://localhost:8000"):
+    def __init__(self, server_url="http://localhost:8000", loop=None, max_connections=20,
+                 max_keepalive_connections=10, keepalive_expiry=60.0, max_retries=3, retry_base_delay=0.25):
         self.server_url = server_url
-        self.http = requests.Session()
-        self.request_timeout = 15
+        self.loop = loop
+        self.request_timeout = httpx.Timeout(15.0, connect=5.0)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.use_envelope = True
+        self.session_token: str | None = None
+        self.session_expires_at = 0
+        self._http: httpx.AsyncClient | None = None
+        self._refresh_lock = asyncio.Lock()
+        # Called once when the token can no longer be refreshed, the app then asks for a login
+        self.on_session_expired = None
 
-    def _send_api_request(self, http_method, api_path, **options):
-        full_url = f"{self.server_url}{api_path}"
-        try:
-            response = self.http.request(
-                method=http_method,
-                url=full_url,
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                base_url=self.server_url,
                 timeout=self.request_timeout,
-                **options
-            )
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.Timeout:
-            logger.error(f"Timeout occurred for {http_method} {full_url}")
-            raise TimeoutError(f"Server request timed out: {full_url}")
-        except requests.exceptions.ConnectionError:
-            logger.error(f"Connection failed to {self.server_url}")
-            raise ConnectionError(f"Unable to connect to server")
-        except requests.exceptions.HTTPError as err:
-            logger.error(
-                f"HTTP Error {err.response.status_code} - "
-                f"{http_method} {full_url}: {err.response.text}"
+                limits=self.limits,
+                http2=HTTP2_AVAILABLE
             )
-            raise err
-        except requests.exceptions.RequestException as err:
-            logger.error(f"Request error: {http_method} {full_url} - {err}")
-            raise err
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON from {http_method} {full_url}")
-            raise ValueError("Received malformed JSON response")
-
-    def register(self, username: str, password: str):
+        return self._http
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def _update_session(self, response: dict):
+        if response and response.get("session_token"):
+            self.session_token = response["session_token"]
+            self.session_expires_at = response["expires_at"]
+
+    def clear_session(self):
+        self.session_token = None
+        self.session_expires_at = 0
+
+    def _session_expiring(self) -> bool:
+        return self.session_expires_at - time.time() <= SESSION_REFRESH_MARGIN
+
+    def _session_lost(self):
+        if self.session_token is None:
+            return
+        logger.warning("Session expired, a new login is required")
+        self.clear_session()
+        if self.on_session_expired:
+            self.on_session_expired()
+
+    async def ensure_session(self):
+        """Refreshes a token close to expiry, raises SessionExpired once it is too late to refresh."""
+        if self.session_token is None:
+            raise SessionExpired()
+        if self.session_expires_at <= time.time():
+            # The server only refreshes valid tokens, after an idle night or a sleep only a login helps
+            self._session_lost()
+            raise SessionExpired()
+        await self._refresh_session_if_expiring()
+
+    async def fresh_session_token(self) -> str:
+        await self.ensure_session()
+        return self.session_token
+
+    async def _refresh_session_if_expiring(self):
+        if not self._session_expiring():
+            return
+        # Requests in flight near expiry share one refresh
+        async with self._refresh_lock:
+            if not self._session_expiring():
+                return
+            try:
+                response = await self._send_api_request(
+                    "post",
+                    "/auth/refresh",
+                    headers={"Authorization": f"Bearer {self.session_token}"}
+                )
+            except httpx.HTTPStatusError as err:
+                if err.response.status_code == 401:
+                    self._session_lost()
+                    raise SessionExpired() from err
+                raise
+            self._update_session(response)
+
+    def submit_from_thread(self, coro) -> concurrent.futures.Future:
+        """Schedules a request coroutine on the GUI event loop from a worker thread.
+
+        Cancelling the returned future cancels the request, so a worker never has to block the GUI thread to stop.
+        """
+        if self.loop is None:
+            raise RuntimeError("ApiClient has no event loop to run requests on")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_from_thread(self, coro):
+        """Runs a request coroutine on the GUI event loop from a worker thread and waits for the result."""
+        return self.submit_from_thread(coro).result()
+
+    async def _send_api_request(self, http_method, api_path, idempotent=None, **options):
+        with tracer.span(f"{http_method.upper()} {api_path}", "net"):
+            return await self._send_with_retries(http_method, api_path, idempotent, **options)
+
+    async def _send_with_retries(self, http_method, api_path, idempotent=None, **options):
+        full_url = f"{self.server_url}{api_path}"
+        if idempotent is None:
+            idempotent = http_method.lower() == "get"
+
+        if self.session_token and not api_path.startswith("/auth/"):
+            await self.ensure_session()
+            options["headers"] = {**options.get("headers", {}), "Authorization": f"Bearer {self.session_token}"}
+
+        for attempt in range(self.max_retries + 1):
+            retry_reason = None
+            try:
+                response = await self.http.request(http_method, api_path, **options)
+                if idempotent and response.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                    retry_reason = f"HTTP {response.status_code}"
+                else:
+                    response.raise_for_status()
+                    return response.json()
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as err:
+                # Nothing reached the server, so even non-idempotent requests are safe to resend
+                retry_reason = str(err) or type(err).__name__
+                if attempt == self.max_retries:
+                    logger.error(f"Connection failed to {self.server_url}")
+                    raise ConnectionError(f"Unable to connect to server")
+            except httpx.TimeoutException:
+                if not idempotent or attempt == self.max_retries:
+                    logger.error(f"Timeout occurred for {http_method} {full_url}")
+                    raise TimeoutError(f"Server request timed out: {full_url}")
+                retry_reason = "timeout"
+            except httpx.HTTPStatusError as err:
+                logger.error(
+                    f"HTTP Error {err.response.status_code} - "
+                    f"{http_method} {full_url}: {err.response.text}"
+                )
+                if err.response.status_code == 401 and not api_path.startswith("/auth/"):
+                    self._session_lost()
+                raise err
+            except httpx.HTTPError as err:
+                logger.error(f"Request error: {http_method} {full_url} - {err}")
+                raise err
+            except json.JSONDecodeError:
+                logger.error(f"Invalid JSON from {http_method} {full_url}")
+                raise ValueError("Received malformed JSON response")
+
+            delay = self.retry_base_delay * 2 ** attempt
+            logger.warning(f"{http_method.upper()} {api_path} failed ({retry_reason}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def _send_payload_request(self, api_path, payload: dict, idempotent=False):
+        if self.use_envelope:
+            try:
+                return await self._send_api_request(
+                    "post",
+                    api_path,
+                    idempotent=idempotent,
+                    content=pack_event(payload),
+                    headers={"Content-Type": ENVELOPE_CONTENT_TYPE}
+                )
+            except httpx.HTTPStatusError as err:
+                # Only an unsupported media type means the server cannot read envelopes, a 422 is a real
+                # validation error of this payload and must not switch the session to JSON
+                if err.response.status_code != 415:
+                    raise
+                logger.warning(f"Server rejected {ENVELOPE_CONTENT_TYPE}, falling back to JSON payloads")
+                self.use_envelope = False
+
+        json_payload = {
+            field: base64.b64encode(value).decode('utf-8') if isinstance(value, bytes) else value
+            for field, value in payload.items()
+        }
+        return await self._send_api_request(
+            "post",
+            api_path,
+            idempotent=idempotent,
+            json=json_payload
+        )
+
+    async def register(self, username: str, password: str):
         payload = {"username": username, "password": password}
-        return self._send_api_request(
+        return await self._send_api_request(
             "post",
             "/auth/register",
             json=payload
         )
 
-    def login(self, username: str, password: str):
+    async def login(self, username: str, password: str):
         credentials = {"username": username, "password": password}
-        return self._send_api_request(
+        response = await self._send_api_request(
             "post",
             "/auth/login",
             json=credentials
         )
+        self._update_session(response)
+        return response
 
-    def create_chat(self, user_id, algorithm, mode, padding):
+    async def create_chat(self, user_id, algorithm, mode, padding):
         chat_data = {
             "user_id": user_id,
             "algorithm": algorithm,
             "encryption_mode": mode,
             'padding_mode': padding
         }
-        return self._send_api_request(
+        response = await self._send_api_request(
             "post",
             "/chat/create",
             json=chat_data
         )
+        # The refreshed token carries the new chat membership
+        self._update_session(response)
+        return response
 
-    def join_chat(self, chat_id, user_id):
+    async def join_chat(self, chat_id, user_id):
         join_data = {"chat_id": chat_id, "user_id": user_id}
-        return self._send_api_request(
+        response = await self._send_api_request(
             "post",
             "/chat/join",
             json=join_data
         )
+        self._update_session(response)
+        return response
 
-    def leave_chat(self, chat_id, user_id):
+    async def leave_chat(self, chat_id, user_id):
         leave_data = {"chat_id": chat_id, "user_id": user_id}
-        return self._send_api_request(
+        return await self._send_api_request(
             "post",
             "/chat/leave",
             json=leave_data
         )
 
-    def close_chat(self, chat_id, user_id):
+    async def close_chat(self, chat_id, user_id):
         close_data = {"chat_id": chat_id, "user_id": user_id}
-        return self._send_api_request(
+        return await self._send_api_request(
             "post",
             "/chat/close",
             json=close_data
         )
 
-    def get_dh_params(self, chat_id):
-        return self._send_api_request(
+    async def get_dh_params(self, chat_id):
+        return await self._send_api_request(
             "get",
             f"/key/{chat_id}/dh_params"
         )
 
-    def store_public_key(self, chat_id, user_id, public_key):
+    async def store_public_key(self, chat_id, user_id, public_key):
         key_data = {
             "chat_id": chat_id,
             "user_id": user_id,
             "public_key": public_key
         }
-        return self._send_api_request(
+        return await self._send_api_request(
             "post",
             "/key/public_key",
             json=key_data
         )
 
-    def get_participant_key(self, chat_id, user_id):
+    async def exchange_keys(self, chat_id, user_id, public_key):
+        key_data = {
+            "chat_id": chat_id,
+            "user_id": user_id,
+            "public_key": public_key
+        }
+        # Storing the same public key twice is harmless, so a timed out exchange can be resent
+        return await self._send_api_request(
+            "post",
+            "/key/exchange",
+            idempotent=True,
+            json=key_data
+        )
+
+    async def get_participant_key(self, chat_id, user_id):
         query_params = {"user_id": user_id}
-        return self._send_api_request(
+        return await self._send_api_request(
             "get",
             f"/key/{chat_id}/participant_key",
             params=query_params
         )
 
-    def get_encryption_status(self, chat_id, user_id):
+    async def get_encryption_status(self, chat_id, user_id):
         status_params = {"chat_id": chat_id, "user_id": user_id}
-        return self._send_api_request(
+        return await self._send_api_request(
             "get",
             f"/chat/{chat_id}/{user_id}/encryption_status",
             params=status_params
         )
 
-    def send_message(
+    async def get_message_history(self, chat_id, after=0, limit=100):
+        return await self._send_api_request(
+            "get",
+            f"/message/{chat_id}/history",
+            params={"after": after, "limit": limit}
+        )
+
+    async def get_file_chunks(self, chat_id, transfer_id, after=-1, limit=8):
+        return await self._send_api_request(
+            "get",
+            f"/message/{chat_id}/transfers/{transfer_id}/chunks",
+            params={"after": after, "limit": limit}
+        )
+
+    async def send_message(
             self,
             chat_id,
             user_id,
@@ -156,8 +360,36 @@ class ApiClient:
             "file_name": file_name if is_file else None,
             "timestamp": timestamp
         }
-        return self._send_api_request(
-            "post",
-            "/message/send",
-            json=message_payload
-        )
\ No newline at end of file
+        if self.use_envelope and isinstance(encrypted_message, str):
+            message_payload["encrypted_message"] = base64.b64decode(encrypted_message)
+        return await self._send_payload_request("/message/send", message_payload)
+
+    async def send_file_chunk(
+            self,
+            chat_id,
+            user_id,
+            transfer_id,
+            seq,
+            total_chunks,
+            file_name,
+            file_size,
+            sha256,
+            encrypted_chunk,
+            iv_nonce,
+            timestamp
+    ):
+        chunk_payload = {
+            "chat_id": chat_id,
+            "user_id": user_id,
+            "transfer_id": transfer_id,
+            "seq": seq,
+            "total_chunks": total_chunks,
+            "file_name": file_name,
+            "file_size": file_size,
+            "sha256": sha256,
+            "encrypted_chunk": encrypted_chunk,
+            "iv_nonce": iv_nonce,
+            "timestamp": timestamp
+        }
+        # Chunks are keyed by (transfer_id, seq) on the receiver, so resending one is harmless
+        return await self._send_payload_request("/message/file/chunk", chunk_payload, idempotent=True)
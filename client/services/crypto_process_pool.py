@@ -0,0 +1,178 @@
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Optional
+
+from crypto.base.modes import PaddingMode, CipherMode
+from utils.cryptography_manager import CryptographyManager
+
+logger = logging.getLogger("SecureChat")
+
+# Shared buffer layout: [cancel flag][progress percent][6 reserved][payload]. The payload holds the
+# input and is overwritten with the output, which is at most an IV and a padding block longer.
+CANCEL_OFFSET = 0
+PROGRESS_OFFSET = 1
+HEADER_SIZE = 8
+OUTPUT_SLACK = 64
+PROGRESS_POLL_INTERVAL = 0.05
+
+class CryptoJobCancelled(Exception):
+    pass
+
+# Per process state of the pool workers, the cipher cache keeps key schedules warm between jobs
+_worker_manager: Optional[CryptographyManager] = None
+
+def _init_worker(cipher_cache_size: int):
+    global _worker_manager
+    _worker_manager = CryptographyManager(cipher_cache_size=cipher_cache_size)
+
+def _ping() -> int:
+    return os.getpid()
+
+def _run(kind: str, algorithm, key: bytes, data: bytes, mode, padding_mode, progress_callback=None):
+    if kind == "encrypt":
+        return _worker_manager.encrypt(algorithm, key, data, mode=mode, padding_mode=padding_mode,
+                                       progress_callback=progress_callback)
+    return _worker_manager.decrypt(algorithm, key, data, mode=mode, padding_mode=padding_mode, iv=None,
+                                   progress_callback=progress_callback)
+
+def _run_inline(kind: str, algorithm, key: bytes, data: bytes, mode, padding_mode):
+    return _run(kind, algorithm, key, data, mode, padding_mode)
+
+def _run_shared(kind: str, shm_name: str, size: int, algorithm, key: bytes, mode, padding_mode):
+    shm = SharedMemory(name=shm_name)
+    try:
+        buf = shm.buf
+
+        def report_progress(percent: int):
+            if buf[CANCEL_OFFSET]:
+                raise CryptoJobCancelled()
+            buf[PROGRESS_OFFSET] = percent
+
+        data = bytes(buf[HEADER_SIZE:HEADER_SIZE + size])
+        result = _run(kind, algorithm, key, data, mode, padding_mode, report_progress)
+        output, iv = result if kind == "encrypt" else (result, None)
+        buf[HEADER_SIZE:HEADER_SIZE + len(output)] = output
+        return len(output), iv
+    finally:
+        shm.close()
+
+
+class CryptoProcessPool:
+    """Runs the pure-Python ciphers in spawned worker processes, so they neither hold the GUI
+    process's GIL nor serialize against each other.
+
+    Exposes the encrypt/decrypt signature of CryptographyManager, so workers call it from their own
+    threads unchanged. Payloads from `shared_memory_threshold` up travel through a shared memory
+    block that also carries progress and cancellation. Smaller ones are pickled, which is cheaper.
+    """
+
+    def __init__(self, processes: int, shared_memory_threshold: int = 64 * 1024, cipher_cache_size: int = 32):
+        self.processes = processes
+        self.shared_memory_threshold = shared_memory_threshold
+        self.cipher_cache_size = cipher_cache_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Scheduler threads call in concurrently. The generation tells a restart already done by
+        # another thread apart from a pool that is still broken
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def start(self):
+        with self._lock:
+            self._start_locked()
+
+    def _start_locked(self):
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.cipher_cache_size,)
+        )
+        self._generation += 1
+        # Spawning imports the client in every process, done once here instead of on the first message
+        for _ in range(self.processes):
+            self._executor.submit(_ping)
+        logger.info(f"Started {self.processes} crypto worker processes")
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _restart(self, generation: int):
+        with self._lock:
+            # Every thread with a job on the broken pool gets here, only the first one restarts it
+            if self._executor is None or self._generation != generation:
+                return
+            broken = self._executor
+            logger.error("Crypto worker process died, restarting the pool")
+            self._start_locked()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def encrypt(self, algorithm, key: bytes, plaintext: bytes, mode: CipherMode = CipherMode.CBC,
+                padding_mode: PaddingMode = PaddingMode.PKCS7, iv: bytes = None,
+                progress_callback: Optional[Callable[[int], None]] = None) -> tuple:
+        if iv is not None:
+            raise ValueError("The process pool generates IVs in the worker")
+        return self._submit("encrypt", algorithm, key, plaintext, mode, padding_mode, progress_callback)
+
+    def decrypt(self, algorithm, key: bytes, ciphertext: bytes, mode: CipherMode = CipherMode.CBC,
+                padding_mode: PaddingMode = PaddingMode.PKCS7, iv: bytes = None,
+                progress_callback: Optional[Callable[[int], None]] = None) -> bytes:
+        if iv is not None:
+            raise ValueError("The process pool reads the IV from the ciphertext")
+        return self._submit("decrypt", algorithm, key, ciphertext, mode, padding_mode, progress_callback)
+
+    def _submit(self, kind, algorithm, key, data, mode, padding_mode, progress_callback):
+        with self._lock:
+            executor, generation = self._executor, self._generation
+        if executor is None:
+            raise RuntimeError("Crypto process pool is not running")
+        try:
+            if len(data) < self.shared_memory_threshold:
+                return executor.submit(_run_inline, kind, algorithm, key, data, mode, padding_mode).result()
+            return self._submit_shared(executor, kind, algorithm, key, data, mode, padding_mode, progress_callback)
+        except BrokenProcessPool:
+            # A worker died (killed or out of memory), later jobs get a fresh pool
+            self._restart(generation)
+            raise
+
+    def _submit_shared(self, executor, kind, algorithm, key, data, mode, padding_mode, progress_callback):
+        shm = SharedMemory(create=True, size=HEADER_SIZE + len(data) + OUTPUT_SLACK)
+        try:
+            shm.buf[HEADER_SIZE:HEADER_SIZE + len(data)] = data
+            future = executor.submit(_run_shared, kind, shm.name, len(data), algorithm, key, mode, padding_mode)
+            while True:
+                try:
+                    length, iv = future.result(timeout=PROGRESS_POLL_INTERVAL)
+                    break
+                except FutureTimeout:
+                    if progress_callback is None:
+                        continue
+                    try:
+                        progress_callback(shm.buf[PROGRESS_OFFSET])
+                    except BaseException:
+                        # The callback raising means the job was cancelled, the worker stops at its next block
+                        shm.buf[CANCEL_OFFSET] = 1
+                        if not future.cancel():
+                            try:
+                                future.result()
+                            except Exception:
+                                pass
+                        raise
+            output = bytes(shm.buf[HEADER_SIZE:HEADER_SIZE + length])
+        finally:
+            shm.close()
+            shm.unlink()
+        return (output, iv) if kind == "encrypt" else output
+
+def default_process_count() -> int:
+    configured = os.environ.get("CHAT_CRYPTO_PROCESSES")
+    if configured is not None:
+        return max(0, int(configured))
+    return max(1, min(4, (os.cpu_count() or 2) - 1))
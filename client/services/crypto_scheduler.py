@@ -0,0 +1,148 @@
+import uuid
+import logging
+from collections import deque
+from itertools import count
+from typing import Callable, Dict, Optional
+from PyQt5.QtCore import QObject, QThread, QThreadPool
+
+from utils.workers.crypto_worker import CryptoTask, CryptoSignals, JOB_CANCELLED
+
+logger = logging.getLogger("SecureChat")
+
+# Lower runs first. Text and small files stay interactive while a large file is processed
+PRIORITY_TEXT = 0
+PRIORITY_FILE = 10
+PRIORITY_LARGE_FILE = 20
+LARGE_FILE_SIZE = 1024 * 1024
+
+def file_priority(size: int) -> int:
+    return PRIORITY_LARGE_FILE if size >= LARGE_FILE_SIZE else PRIORITY_FILE
+
+
+class CryptoScheduler(QObject):
+    """Runs encryption and decryption jobs on a fixed-size thread pool.
+
+    Jobs of one chat and priority form a lane that runs strictly in submission order, one job at a
+    time, so messages of a chat complete in the order they arrived. Free threads take the head of
+    the lane with the best priority, so text is never stuck behind a large file, even in its own chat.
+    """
+
+    def __init__(self, crypto_manager, max_threads: Optional[int] = None, parent=None):
+        super().__init__(parent)
+        self.crypto_manager = crypto_manager
+        self.max_threads = max_threads or max(1, min(4, QThread.idealThreadCount() - 1))
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(self.max_threads)
+        self._signals = CryptoSignals()
+        self._signals.progress.connect(self._on_progress)
+        self._signals.result.connect(self._on_result)
+        self._signals.error.connect(self._on_error)
+
+        self._order = count()
+        self._jobs: Dict[str, dict] = {}
+        self._lanes: Dict[tuple, deque] = {}
+        self._running: Dict[tuple, str] = {}
+
+    def submit(self, kind: str, chat_id: str, algorithm, key: bytes, data, mode, padding_mode,
+               priority: int = PRIORITY_TEXT, trace_id: Optional[str] = None,
+               on_result: Optional[Callable] = None, on_error: Optional[Callable[[str], None]] = None,
+               on_progress: Optional[Callable[[int], None]] = None) -> str:
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "kind": kind,
+            "chat_id": chat_id,
+            "priority": priority,
+            "order": next(self._order),
+            "algorithm": algorithm,
+            "key": key,
+            "data": data,
+            "mode": mode,
+            "padding_mode": padding_mode,
+            "trace_id": trace_id,
+            "on_result": on_result,
+            "on_error": on_error,
+            "on_progress": on_progress,
+            "cancelled": False
+        }
+        self._jobs[job["job_id"]] = job
+        self._lanes.setdefault((chat_id, priority), deque()).append(job)
+        self._dispatch()
+        return job["job_id"]
+
+    def cancel(self, job_id: str) -> bool:
+        job = self._jobs.get(job_id)
+        if job is None:
+            return False
+        lane = (job["chat_id"], job["priority"])
+        if self._running.get(lane) == job_id:
+            # The task notices at its next progress report and finishes with JOB_CANCELLED
+            job["cancelled"] = True
+            return True
+
+        self._lanes[lane].remove(job)
+        if not self._lanes[lane]:
+            del self._lanes[lane]
+        del self._jobs[job_id]
+        if job["on_error"]:
+            job["on_error"](JOB_CANCELLED)
+        return True
+
+    def cancel_chat(self, chat_id: str, kind: Optional[str] = None) -> int:
+        job_ids = [
+            job_id for job_id, job in self._jobs.items()
+            if job["chat_id"] == chat_id and (kind is None or job["kind"] == kind)
+        ]
+        for job_id in job_ids:
+            self.cancel(job_id)
+        return len(job_ids)
+
+    def has_jobs(self, chat_id: str) -> bool:
+        return any(job["chat_id"] == chat_id for job in self._jobs.values())
+
+    def shutdown(self, timeout_ms: int = 3000):
+        for job_id in list(self._jobs):
+            self.cancel(job_id)
+        if not self._pool.waitForDone(timeout_ms):
+            logger.warning("Crypto jobs still running at shutdown")
+
+    def _dispatch(self):
+        while len(self._running) < self.max_threads:
+            ready = [
+                jobs[0] for lane, jobs in self._lanes.items()
+                if lane not in self._running
+            ]
+            if not ready:
+                return
+            job = min(ready, key=lambda item: (item["priority"], item["order"]))
+            self._running[(job["chat_id"], job["priority"])] = job["job_id"]
+            self._pool.start(CryptoTask(self.crypto_manager, job, self._signals))
+
+    def _finish(self, job_id: str) -> Optional[dict]:
+        job = self._jobs.pop(job_id, None)
+        if job is None:
+            return None
+        lane = (job["chat_id"], job["priority"])
+        self._running.pop(lane, None)
+        jobs = self._lanes.get(lane)
+        if jobs:
+            jobs.popleft()
+            if not jobs:
+                del self._lanes[lane]
+        self._dispatch()
+        return job
+
+    def _on_progress(self, job_id: str, percent: int):
+        job = self._jobs.get(job_id)
+        if job and job["on_progress"]:
+            job["on_progress"](percent)
+
+    def _on_result(self, job_id: str, result):
+        job = self._finish(job_id)
+        if job and job["on_result"]:
+            job["on_result"](result)
+
+    def _on_error(self, job_id: str, error_message: str):
+        job = self._finish(job_id)
+        if job and job["on_error"]:
+            job["on_error"](error_message)
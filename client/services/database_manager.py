@@ -1,9 +1,12 @@
+import hashlib
 import logging
 import sqlite3
+from datetime import datetime
 from pathlib import Path
 
 from crypto.base.modes import PaddingMode, CipherMode
 from utils.constants import EncryptionAlgorithm
+from utils.telemetry import traced
 
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -24,14 +27,15 @@ class Database:
         self.migrate_db()
 
     def _get_connection(self):
-        return sqlite3.connect(self.db_path)
+        conn = sqlite3.connect(self.db_path)
+        # Per connection in SQLite, without it deleting a chat leaves its rows in the child tables
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
 
     def init_db(self):
         conn = self._get_connection()
         cursor = conn.cursor()
 
-        cursor.execute("PRAGMA foreign_keys = ON;")
-
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS chats (
             chat_id TEXT PRIMARY KEY,
@@ -59,10 +63,78 @@ class Database:
             file_name TEXT,
             file_path TEXT, -- Path where the decrypted file is stored locally
             file_bytes BLOB,
+            file_hash TEXT, -- sha256 of file_bytes, keys the thumbnail cache
+            seq INTEGER NOT NULL DEFAULT 0, -- server per-chat sequence; rows without one (chunked files,
+                                            -- messages from before seqs) take the chat's latest seq to sort after it
             FOREIGN KEY (chat_id) REFERENCES chats (chat_id) ON DELETE CASCADE -- Cascade delete
         )
         ''')
 
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS file_chunks (
+            transfer_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            chat_id TEXT NOT NULL,
+            sender TEXT NOT NULL,
+            total_chunks INTEGER NOT NULL,
+            file_name TEXT NOT NULL,
+            file_size INTEGER NOT NULL,
+            sha256 TEXT NOT NULL, -- hash of the whole plaintext file
+            timestamp TEXT,
+            encrypted_chunk TEXT NOT NULL, -- base64 encoded, IV prepended
+            PRIMARY KEY (transfer_id, seq),
+            FOREIGN KEY (chat_id) REFERENCES chats (chat_id) ON DELETE CASCADE
+        )
+        ''')
+
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS transfers (
+            transfer_id TEXT PRIMARY KEY,
+            chat_id TEXT NOT NULL,
+            direction TEXT NOT NULL, -- 'upload' or 'download'
+            sender TEXT,
+            file_name TEXT NOT NULL,
+            file_path TEXT, -- source file for uploads, reassembly target for downloads
+            file_size INTEGER NOT NULL,
+            sha256 TEXT,
+            total_chunks INTEGER NOT NULL,
+            acked_chunks INTEGER NOT NULL DEFAULT 0, -- acknowledged by server / stored locally
+            timestamp TEXT NOT NULL,
+            status TEXT NOT NULL, -- active, paused, completed, cancelled, failed
+            message_seq INTEGER, -- chat seq of the file message, known once the server has every chunk
+            FOREIGN KEY (chat_id) REFERENCES chats (chat_id) ON DELETE CASCADE
+        )
+        ''')
+
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS chat_offsets (
+            chat_id TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            partition INTEGER NOT NULL,
+            offset INTEGER NOT NULL, -- last Kafka offset applied to this chat
+            PRIMARY KEY (chat_id, topic, partition),
+            FOREIGN KEY (chat_id) REFERENCES chats (chat_id) ON DELETE CASCADE
+        )
+        ''')
+
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS chat_sync (
+            chat_id TEXT PRIMARY KEY,
+            last_seq INTEGER NOT NULL, -- last server history seq fetched for this chat
+            FOREIGN KEY (chat_id) REFERENCES chats (chat_id) ON DELETE CASCADE
+        )
+        ''')
+
+        cursor.execute('''
+        CREATE TABLE IF NOT EXISTS consumer_offsets (
+            topic TEXT NOT NULL,
+            partition INTEGER NOT NULL,
+            offset INTEGER NOT NULL, -- next offset to read from the event gateway
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (topic, partition)
+        )
+        ''')
+
         cursor.execute('''
         CREATE TABLE IF NOT EXISTS keys (
             chat_id TEXT PRIMARY KEY,
@@ -91,6 +163,29 @@ class Database:
                 cursor.execute("ALTER TABLE chats ADD COLUMN mode TEXT NOT NULL DEFAULT 'CBC'")
             if 'padding' not in columns:
                 cursor.execute("ALTER TABLE chats ADD COLUMN padding TEXT NOT NULL DEFAULT 'PKCS7'")
+
+            cursor.execute("PRAGMA table_info(messages)")
+            message_columns = [column[1] for column in cursor.fetchall()]
+
+            if 'file_hash' not in message_columns:
+                cursor.execute("ALTER TABLE messages ADD COLUMN file_hash TEXT")
+            if 'seq' not in message_columns:
+                cursor.execute("ALTER TABLE messages ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+
+            cursor.execute("PRAGMA table_info(transfers)")
+            if 'message_seq' not in [column[1] for column in cursor.fetchall()]:
+                cursor.execute("ALTER TABLE transfers ADD COLUMN message_seq INTEGER")
+
+            # Left behind by chats deleted while foreign keys were only enabled on the init connection.
+            # A stale cursor or offset would make a rejoined chat skip messages
+            for table in ("messages", "file_chunks", "transfers", "chat_offsets", "chat_sync", "keys"):
+                cursor.execute(f"DELETE FROM {table} WHERE chat_id NOT IN (SELECT chat_id FROM chats)")
+
+            cursor.execute("DROP INDEX IF EXISTS idx_messages_chat_timestamp")
+            cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_messages_chat_order
+            ON messages (chat_id, seq, timestamp, message_id)
+            ''')
                 
             conn.commit()
             logger.info("Database migration completed successfully")
@@ -105,9 +200,12 @@ class Database:
         cursor = conn.cursor()
         try:
             cursor.execute('''
-            INSERT OR REPLACE INTO chats 
+            INSERT INTO chats
             (chat_id, algorithm, mode, padding, created_at, status, is_creator)
             VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (chat_id) DO UPDATE SET
+                algorithm = excluded.algorithm, mode = excluded.mode, padding = excluded.padding,
+                created_at = excluded.created_at, status = excluded.status, is_creator = excluded.is_creator
             ''', (
                 chat_id, 
                 algorithm.name if hasattr(algorithm, 'name') else str(algorithm),
@@ -139,19 +237,24 @@ class Database:
         finally:
             conn.close()
 
+    @traced("db")
     def save_message(self, message_id, chat_id, sender, timestamp, encrypted_message,
                        decrypted_message, iv_nonce, encryption_mode, padding_mode,
-                       is_file=False, file_name=None, file_path=None, file_bytes=None):
+                       is_file=False, file_name=None, file_path=None, file_bytes=None, file_hash=None, seq=None):
+        if file_hash is None and file_bytes:
+            file_hash = hashlib.sha256(file_bytes).hexdigest()
         conn = self._get_connection()
         cursor = conn.cursor()
         try:
             cursor.execute('''
             INSERT OR REPLACE INTO messages
             (message_id, chat_id, sender, timestamp, encrypted_message, decrypted_message,
-             iv_nonce, encryption_mode, padding_mode, is_file, file_name, file_path, file_bytes)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+             iv_nonce, encryption_mode, padding_mode, is_file, file_name, file_path, file_bytes, file_hash, seq)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?,
+                    COALESCE(?, (SELECT MAX(seq) FROM messages WHERE chat_id = ?), 0))
             ''', (message_id, chat_id, sender, timestamp, encrypted_message, decrypted_message,
-                  iv_nonce, encryption_mode, padding_mode, is_file, file_name, file_path, file_bytes))
+                  iv_nonce, encryption_mode, padding_mode, is_file, file_name, file_path, file_bytes, file_hash,
+                  seq, chat_id))
             conn.commit()
             logger.debug(f"Saved message {message_id} for chat {chat_id}.")
         except sqlite3.Error as e:
@@ -183,6 +286,7 @@ class Database:
         finally:
             conn.close()
 
+    @traced("db")
     def get_chats(self):
         conn = self._get_connection()
         cursor = conn.cursor()
@@ -210,18 +314,162 @@ class Database:
             conn.close()
         return chats_data
 
-    def get_messages(self, chat_id):
+    def get_chat_ids(self):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        chat_ids = []
+        try:
+            cursor.execute('SELECT chat_id FROM chats')
+            chat_ids = [row[0] for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Error getting chat ids: {e}")
+        finally:
+            conn.close()
+        return chat_ids
+
+    def get_chat_offsets(self):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        offsets = {}
+        try:
+            cursor.execute('SELECT chat_id, topic, partition, offset FROM chat_offsets')
+            offsets = {(row[0], row[1], row[2]): row[3] for row in cursor.fetchall()}
+        except sqlite3.Error as e:
+            logger.error(f"Error getting chat offsets: {e}")
+        finally:
+            conn.close()
+        return offsets
+
+    def save_chat_offsets(self, offsets):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.executemany('''
+            INSERT INTO chat_offsets (chat_id, topic, partition, offset)
+            SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM chats WHERE chat_id = ?1)
+            ON CONFLICT (chat_id, topic, partition) DO UPDATE SET offset = MAX(offset, excluded.offset)
+            ''', [(chat_id, topic, partition, offset) for (chat_id, topic, partition), offset in offsets.items()])
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error saving chat offsets: {e}")
+        finally:
+            conn.close()
+
+    def get_consumer_offsets(self, topic):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        offsets = {}
+        try:
+            cursor.execute('''
+            SELECT partition, offset FROM consumer_offsets WHERE topic = ? ORDER BY updated_at ASC
+            ''', (topic,))
+            offsets = dict(cursor.fetchall())
+        except sqlite3.Error as e:
+            logger.error(f"Error getting consumer offsets for {topic}: {e}")
+        finally:
+            conn.close()
+        return offsets
+
+    @traced("db")
+    def save_consumer_offsets(self, offsets):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            updated_at = datetime.now().isoformat()
+            cursor.executemany('''
+            INSERT INTO consumer_offsets (topic, partition, offset, updated_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (topic, partition) DO UPDATE SET offset = excluded.offset, updated_at = excluded.updated_at
+            ''', [(topic, partition, offset, updated_at) for (topic, partition), offset in offsets.items()])
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error saving consumer offsets: {e}")
+        finally:
+            conn.close()
+
+    def get_history_cursor(self, chat_id):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        last_seq = 0
+        try:
+            cursor.execute('SELECT last_seq FROM chat_sync WHERE chat_id = ?', (chat_id,))
+            row = cursor.fetchone()
+            if row:
+                last_seq = row[0]
+        except sqlite3.Error as e:
+            logger.error(f"Error getting history cursor for chat {chat_id}: {e}")
+        finally:
+            conn.close()
+        return last_seq
+
+    def save_history_cursor(self, chat_id, last_seq):
         conn = self._get_connection()
         cursor = conn.cursor()
-        messages_data = []
         try:
             cursor.execute('''
-            SELECT message_id, sender, timestamp, decrypted_message, is_file, file_name, file_path, file_bytes
+            INSERT INTO chat_sync (chat_id, last_seq)
+            SELECT ?1, ?2 WHERE EXISTS (SELECT 1 FROM chats WHERE chat_id = ?1)
+            ON CONFLICT (chat_id) DO UPDATE SET last_seq = MAX(last_seq, excluded.last_seq)
+            ''', (chat_id, last_seq))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error saving history cursor for chat {chat_id}: {e}")
+        finally:
+            conn.close()
+
+    @traced("db")
+    def has_message(self, message_id):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT 1 FROM messages WHERE message_id = ?', (message_id,))
+            return cursor.fetchone() is not None
+        except sqlite3.Error as e:
+            logger.error(f"Error checking message {message_id}: {e}")
+            return False
+        finally:
+            conn.close()
+
+    @traced("db")
+    def has_message_seq(self, chat_id, seq):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT 1 FROM messages WHERE chat_id = ? AND seq = ?', (chat_id, seq))
+            return cursor.fetchone() is not None
+        except sqlite3.Error as e:
+            logger.error(f"Error checking seq {seq} of chat {chat_id}: {e}")
+            return False
+        finally:
+            conn.close()
+
+    @traced("db")
+    def get_messages(self, chat_id, before=None, limit=None):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        messages_data = []
+        try:
+            query = '''
+            SELECT message_id, sender, timestamp, decrypted_message, is_file, file_name, file_path,
+                   file_hash, file_bytes IS NOT NULL OR file_path IS NOT NULL
             FROM messages
             WHERE chat_id = ?
-            ORDER BY timestamp ASC
-            ''', (chat_id,))
+            '''
+            params = [chat_id]
+            # Rows without a server seq share the latest seq at the time they were stored and sort by timestamp within it
+            if before is not None:
+                query += (" AND (seq, timestamp, message_id) <"
+                          " (SELECT seq, timestamp, message_id FROM messages WHERE message_id = ?)")
+                params.append(before)
+            if limit is not None:
+                query += " ORDER BY seq DESC, timestamp DESC, message_id DESC LIMIT ?"
+                params.append(limit)
+            else:
+                query += " ORDER BY seq ASC, timestamp ASC, message_id ASC"
+
+            cursor.execute(query, params)
             messages = cursor.fetchall()
+            if limit is not None:
+                messages.reverse()
             messages_data = [
                 {
                     "message_id": msg[0],
@@ -231,7 +479,8 @@ class Database:
                     "is_file": bool(msg[4]),
                     "file_name": msg[5],
                     "file_path": msg[6],
-                    "file_bytes": bytes(msg[7]) if msg[7] else None
+                    "file_hash": msg[7],
+                    "has_file_bytes": bool(msg[8])
                 }
                 for msg in messages
             ]
@@ -241,6 +490,153 @@ class Database:
             conn.close()
         return messages_data
 
+    @traced("db")
+    def get_file_bytes(self, message_id):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT file_bytes, file_path FROM messages WHERE message_id = ?', (message_id,))
+            row = cursor.fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error loading file bytes for message {message_id}: {e}")
+            return None
+        finally:
+            conn.close()
+
+        if not row:
+            return None
+        if row[0]:
+            return bytes(row[0])
+        if row[1]:
+            try:
+                return Path(row[1]).read_bytes()
+            except OSError as e:
+                logger.error(f"Error reading file {row[1]} for message {message_id}: {e}")
+        return None
+
+    @traced("db")
+    def save_file_chunk(self, chunk: dict) -> int:
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+            INSERT OR IGNORE INTO file_chunks
+            (transfer_id, seq, chat_id, sender, total_chunks, file_name, file_size, sha256, timestamp, encrypted_chunk)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (chunk["transfer_id"], chunk["seq"], chunk["chat_id"], chunk["sender"], chunk["total_chunks"],
+                  chunk["file_name"], chunk["file_size"], chunk["sha256"], chunk["timestamp"],
+                  chunk["encrypted_chunk"]))
+            cursor.execute('SELECT COUNT(*) FROM file_chunks WHERE transfer_id = ?', (chunk["transfer_id"],))
+            received = cursor.fetchone()[0]
+            conn.commit()
+            return received
+        except sqlite3.Error as e:
+            logger.error(f"Error saving chunk {chunk['seq']} of transfer {chunk['transfer_id']}: {e}")
+            return 0
+        finally:
+            conn.close()
+
+    def get_file_chunk(self, transfer_id, seq):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+            SELECT encrypted_chunk FROM file_chunks WHERE transfer_id = ? AND seq = ?
+            ''', (transfer_id, seq))
+            row = cursor.fetchone()
+            return row[0] if row else None
+        except sqlite3.Error as e:
+            logger.error(f"Error loading chunk {seq} of transfer {transfer_id}: {e}")
+            return None
+        finally:
+            conn.close()
+
+    def delete_file_chunks(self, transfer_id):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('DELETE FROM file_chunks WHERE transfer_id = ?', (transfer_id,))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error deleting chunks of transfer {transfer_id}: {e}")
+        finally:
+            conn.close()
+
+    def save_transfer(self, transfer: dict):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('''
+            INSERT OR IGNORE INTO transfers
+            (transfer_id, chat_id, direction, sender, file_name, file_path, file_size, sha256,
+             total_chunks, acked_chunks, timestamp, status, message_seq)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (transfer["transfer_id"], transfer["chat_id"], transfer["direction"], transfer.get("sender"),
+                  transfer["file_name"], transfer.get("file_path"), transfer["file_size"], transfer.get("sha256"),
+                  transfer["total_chunks"], transfer.get("acked_chunks", 0), transfer["timestamp"],
+                  transfer.get("status", "active"), transfer.get("message_seq")))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error saving transfer {transfer['transfer_id']}: {e}")
+        finally:
+            conn.close()
+
+    def set_transfer_hash(self, transfer_id, sha256):
+        self._update_transfer(transfer_id, "sha256", sha256)
+
+    def update_transfer_progress(self, transfer_id, acked_chunks):
+        self._update_transfer(transfer_id, "acked_chunks", acked_chunks)
+
+    def update_transfer_status(self, transfer_id, status):
+        self._update_transfer(transfer_id, "status", status)
+
+    def set_transfer_message_seq(self, transfer_id, message_seq):
+        self._update_transfer(transfer_id, "message_seq", message_seq)
+
+    def get_transfer_message_seq(self, transfer_id):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('SELECT message_seq FROM transfers WHERE transfer_id = ?', (transfer_id,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+        except sqlite3.Error as e:
+            logger.error(f"Error loading message seq of transfer {transfer_id}: {e}")
+            return None
+        finally:
+            conn.close()
+
+    def _update_transfer(self, transfer_id, column, value):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(f'UPDATE transfers SET {column} = ? WHERE transfer_id = ?', (value, transfer_id))
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error updating {column} of transfer {transfer_id}: {e}")
+        finally:
+            conn.close()
+
+    def get_pending_transfers(self, direction):
+        conn = self._get_connection()
+        cursor = conn.cursor()
+        transfers = []
+        try:
+            cursor.execute('''
+            SELECT transfer_id, chat_id, direction, sender, file_name, file_path, file_size, sha256,
+                   total_chunks, acked_chunks, timestamp, status, message_seq
+            FROM transfers
+            WHERE direction = ? AND status IN ('active', 'paused')
+            ORDER BY timestamp ASC
+            ''', (direction,))
+            columns = [column[0] for column in cursor.description]
+            transfers = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            logger.error(f"Error getting pending {direction} transfers: {e}")
+        finally:
+            conn.close()
+        return transfers
+
     def get_chat_key(self, chat_id):
         conn = self._get_connection()
         cursor = conn.cursor()
@@ -279,6 +675,7 @@ class Database:
         finally:
             conn.close()
     
+    @traced("db")
     def get_chat_encryption_params(self, chat_id):
         conn = self._get_connection()
         cursor = conn.cursor()
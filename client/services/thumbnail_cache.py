@@ -0,0 +1,80 @@
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+from PyQt5.QtCore import QObject, QThreadPool, QSize, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader, QPixmap
+
+from utils.workers.thumbnail_worker import ThumbnailTask, ThumbnailSignals
+from views.models.message_model import load_entry_bytes
+
+logger = logging.getLogger("SecureChat")
+
+class ThumbnailCache(QObject):
+    thumbnail_ready = pyqtSignal(str)
+
+    def __init__(self, cache_dir: Path, max_memory_items: int = 128, max_threads: int = 2, parent=None):
+        super().__init__(parent)
+        self.cache_dir = cache_dir
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_memory_items = max_memory_items
+
+        self._pixmaps = OrderedDict()
+        self._hashes = {}
+        self._pending = set()
+        self._failed = set()
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_threads)
+        self._signals = ThumbnailSignals()
+        self._signals.finished.connect(self._on_finished)
+        self._signals.failed.connect(self._on_failed)
+
+    def pixmap(self, entry: dict, target_size: QSize, keep_aspect: bool) -> Optional[QPixmap]:
+        key = entry["key"]
+        pixmap = self._pixmaps.get(key)
+        if pixmap is not None:
+            self._pixmaps.move_to_end(key)
+            return pixmap
+
+        if key not in self._pending and key not in self._failed:
+            self._pending.add(key)
+            self._pool.start(ThumbnailTask(
+                key, self._file_hash(entry), lambda: load_entry_bytes(entry),
+                target_size, keep_aspect, self.cache_dir, self._signals
+            ))
+        return None
+
+    def cached_size(self, entry: dict, target_size: QSize, keep_aspect: bool) -> Optional[QSize]:
+        pixmap = self._pixmaps.get(entry["key"])
+        if pixmap is not None:
+            return pixmap.size()
+
+        file_hash = self._file_hash(entry)
+        if not file_hash:
+            return None
+        cache_path = self.cache_dir / ThumbnailTask.cache_name(file_hash, target_size, keep_aspect)
+        if not cache_path.exists():
+            return None
+        size = QImageReader(str(cache_path)).size()
+        return size if size.isValid() else None
+
+    def has_failed(self, entry: dict) -> bool:
+        return entry["key"] in self._failed
+
+    def _file_hash(self, entry: dict) -> Optional[str]:
+        return entry.get("file_hash") or self._hashes.get(entry["key"])
+
+    def _on_finished(self, key: str, file_hash: str, image: QImage):
+        self._pending.discard(key)
+        self._hashes[key] = file_hash
+        self._pixmaps[key] = QPixmap.fromImage(image)
+        if len(self._pixmaps) > self.max_memory_items:
+            self._pixmaps.popitem(last=False)
+        self.thumbnail_ready.emit(key)
+
+    def _on_failed(self, key: str):
+        self._pending.discard(key)
+        self._failed.add(key)
+        logger.warning(f"Could not build thumbnail for message {key}")
+        self.thumbnail_ready.emit(key)
@@ -0,0 +1,23 @@
+import asyncio
+import logging
+from PyQt5.QtCore import QTimer
+
+logger = logging.getLogger("SecureChat")
+
+_running_tasks = set()
+
+def run_async(coro) -> asyncio.Task:
+    """Schedules a coroutine on the qasync loop from a Qt slot and logs anything it raises."""
+    task = asyncio.ensure_future(coro)
+    _running_tasks.add(task)
+    task.add_done_callback(_on_task_done)
+    return task
+
+def _on_task_done(task: asyncio.Task):
+    _running_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Background task failed", exc_info=task.exception())
+
+def show_message_later(show, parent, title: str, text: str):
+    # A modal box opened inside a task step would re-enter the qasync loop, so it is shown from the Qt queue
+    QTimer.singleShot(0, lambda: show(parent, title, text))
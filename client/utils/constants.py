@@ -3,3 +3,8 @@ from enum import Enum
 class EncryptionAlgorithm(Enum):
     MACGUFFIN = 0
     SERPENT = 1
+
+FILE_CHUNK_SIZE = 512 * 1024
+CHUNK_UPLOAD_RETRIES = 5
+CHUNK_RETRY_BASE_DELAY = 0.5
+CHUNK_RETRY_MAX_DELAY = 8.0
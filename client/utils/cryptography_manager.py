@@ -1,4 +1,6 @@
 import os
+import threading
+from collections import OrderedDict
 from typing import Optional, Callable
 from cryptography.hazmat.backends import default_backend
 
@@ -9,8 +11,26 @@ from utils.constants import EncryptionAlgorithm
 
 class CryptographyManager:
     
-    def __init__(self):
+    def __init__(self, cipher_cache_size: int = 32):
         self.backend = default_backend()
+        self.cipher_cache_size = cipher_cache_size
+        self._ciphers = OrderedDict()
+        self._ciphers_lock = threading.Lock()
+
+    def _cipher(self, cipher_class, key: bytes):
+        # Building a cipher validates the key and runs its key schedule, instances hold no per-call state
+        cache_key = (cipher_class, key)
+        with self._ciphers_lock:
+            cipher = self._ciphers.get(cache_key)
+            if cipher is not None:
+                self._ciphers.move_to_end(cache_key)
+                return cipher
+        cipher = cipher_class(key)
+        with self._ciphers_lock:
+            self._ciphers[cache_key] = cipher
+            while len(self._ciphers) > self.cipher_cache_size:
+                self._ciphers.popitem(last=False)
+        return cipher
 
     def generate_iv(self, block_size=8):
         return os.urandom(block_size)
@@ -67,7 +87,7 @@ class CryptographyManager:
                      padding_mode: PaddingMode, iv: bytes = None, progress_callback: Optional[Callable[[int], None]] = None) -> tuple:
         if iv is None:
             iv = self.generate_iv(8)
-        cipher = MacGuffinCipher(key)
+        cipher = self._cipher(MacGuffinCipher, key)
         ciphertext = cipher.encrypt(
             plaintext,
             mode=mode,
@@ -80,7 +100,7 @@ class CryptographyManager:
 
     def _decrypt_macguffin(self, key: bytes, ciphertext: bytes, mode: CipherMode,
                      padding_mode: PaddingMode, iv: bytes, progress_callback: Optional[Callable[[int], None]] = None) -> bytes:
-        cipher = MacGuffinCipher(key)
+        cipher = self._cipher(MacGuffinCipher, key)
         plaintext = cipher.decrypt(
             ciphertext,
             mode=mode,
@@ -95,7 +115,7 @@ class CryptographyManager:
                          padding_mode: PaddingMode, iv: bytes = None, progress_callback: Optional[Callable[[int], None]] = None) -> tuple:
         if iv is None:
             iv = self.generate_iv(16)
-        cipher = SerpentCipher(key)
+        cipher = self._cipher(SerpentCipher, key)
         ciphertext = cipher.encrypt(
             plaintext,
             mode=mode,
@@ -108,7 +128,7 @@ class CryptographyManager:
 
     def _decrypt_serpent(self, key: bytes, ciphertext: bytes, mode: CipherMode,
                          padding_mode: PaddingMode, iv: bytes, progress_callback: Optional[Callable[[int], None]] = None) -> bytes:
-        cipher = SerpentCipher(key)
+        cipher = self._cipher(SerpentCipher, key)
         plaintext = cipher.decrypt(
             ciphertext,
             mode=mode,
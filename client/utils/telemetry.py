@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import asyncio
+import threading
+import functools
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional
+
+
+class Tracer:
+    """Collects timed spans from every thread into a bounded buffer and per-message stage totals.
+
+    Spans that name a tracked message add their duration to that message's breakdown, so the
+    workers, the API client and the views only need the message's trace id.
+    """
+
+    def __init__(self, max_spans: int = 20000, max_messages: int = 200, enabled: bool = True):
+        self.enabled = enabled
+        self.max_messages = max_messages
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._spans = deque(maxlen=max_spans)
+        self._messages = OrderedDict()
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self._origin) * 1_000_000
+
+    @staticmethod
+    def _track_id() -> int:
+        # Spans of concurrent tasks on the GUI loop overlap, so each task gets its own track
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        return id(task) if task is not None else threading.get_ident()
+
+    @contextmanager
+    def span(self, name: str, category: str, trace: Optional[str] = None, stage: Optional[str] = None, **args):
+        if not self.enabled:
+            yield
+            return
+        started = self._now_us()
+        track = self._track_id()
+        try:
+            yield
+        finally:
+            self._record(name, category, started, self._now_us() - started, track, trace, stage, args)
+
+    def _record(self, name, category, started, duration, track, trace, stage, args):
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": started,
+            "dur": duration,
+            "pid": os.getpid(),
+            "tid": track,
+            "args": {**args, "trace": trace} if trace else args
+        }
+        with self._lock:
+            self._spans.append(event)
+            message = self._messages.get(trace) if trace else None
+            if message is not None and stage:
+                message["stages"][stage] = message["stages"].get(stage, 0.0) + duration / 1000
+
+    def begin_message(self, trace: str, direction: str, chat_id: str):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._messages[trace] = {
+                "trace": trace,
+                "direction": direction,
+                "chat_id": chat_id,
+                "started_at": time.time(),
+                "stages": {}
+            }
+            while len(self._messages) > self.max_messages:
+                self._messages.popitem(last=False)
+
+    def rename_message(self, trace: str, new_trace: str):
+        # A sent message is traced under a local id until the server returns its message_id
+        with self._lock:
+            message = self._messages.pop(trace, None)
+            if message is not None:
+                message["trace"] = new_trace
+                self._messages[new_trace] = message
+
+    def recent_messages(self) -> list:
+        with self._lock:
+            return [
+                {**message, "stages": dict(message["stages"])}
+                for message in reversed(self._messages.values())
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+            self._messages.clear()
+
+    def export_chrome_trace(self, path: Path) -> int:
+        """Writes the buffered spans as Chrome trace JSON (chrome://tracing, Perfetto), returns the span count."""
+        with self._lock:
+            events = list(self._spans)
+        thread_names = {
+            thread.ident: thread.name for thread in threading.enumerate() if thread.ident is not None
+        }
+        metadata = [
+            {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+            for tid, name in thread_names.items()
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+
+tracer = Tracer(enabled=os.environ.get("CHAT_TRACING", "1") != "0")
+
+def traced(category: str):
+    """Decorator recording a span named after the method for every call."""
+    def decorator(fn):
+        name = fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name, category):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,18 @@
+import logging
+import shutil
+import tempfile
+from pathlib import Path
+
+logger = logging.getLogger("SecureChat")
+
+MEDIA_TEMP_DIR = Path(tempfile.gettempdir()) / "secure-chat-media"
+
+def media_temp_file(suffix: str = ""):
+    MEDIA_TEMP_DIR.mkdir(parents=True, exist_ok=True)
+    return tempfile.NamedTemporaryFile(delete=False, suffix=suffix, dir=MEDIA_TEMP_DIR)
+
+def purge_media_temp_files():
+    if not MEDIA_TEMP_DIR.exists():
+        return
+    shutil.rmtree(MEDIA_TEMP_DIR, ignore_errors=True)
+    logger.info(f"Removed leftover media temp files from {MEDIA_TEMP_DIR}")
@@ -0,0 +1,84 @@
+import base64
+import logging
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+from messaging.envelope import as_bytes
+from utils.telemetry import tracer
+
+logger = logging.getLogger("SecureChat")
+
+JOB_CANCELLED = "Cancelled"
+
+class JobCancelled(Exception):
+    pass
+
+class CryptoSignals(QObject):
+    progress = pyqtSignal(str, int)
+    result = pyqtSignal(str, object)
+    error = pyqtSignal(str, str)
+
+class CryptoTask(QRunnable):
+    """Encrypts or decrypts one job on a pool thread.
+
+    Encryption results are (ciphertext_b64, iv_b64), decryption results are the plaintext bytes.
+    """
+
+    def __init__(self, crypto_manager, job: dict, signals: CryptoSignals):
+        super().__init__()
+        self.crypto_manager = crypto_manager
+        self.job = job
+        self.signals = signals
+        self._last_percent = -1
+
+    def report_progress(self, percent: int):
+        if self.job["cancelled"]:
+            raise JobCancelled()
+        # Ciphers report per block, only changes are worth a cross-thread signal
+        if percent != self._last_percent:
+            self._last_percent = percent
+            self.signals.progress.emit(self.job["job_id"], percent)
+
+    def run(self):
+        job = self.job
+        try:
+            if job["cancelled"]:
+                raise JobCancelled()
+            if job["kind"] == "encrypt":
+                result = self._encrypt(job)
+            else:
+                result = self._decrypt(job)
+            self.signals.result.emit(job["job_id"], result)
+        except JobCancelled:
+            self.signals.error.emit(job["job_id"], JOB_CANCELLED)
+        except Exception as e:
+            logger.exception(f"{job['kind'].capitalize()} job {job['job_id']} failed:")
+            self.signals.error.emit(job["job_id"], f"{job['kind'].capitalize()} error: {e}")
+
+    def _encrypt(self, job: dict) -> tuple:
+        if not isinstance(job["data"], bytes):
+            raise TypeError("Data to encrypt must be bytes")
+        with tracer.span("encrypt", "crypto", trace=job["trace_id"], stage="encrypt",
+                         algorithm=job["algorithm"].name, size=len(job["data"])):
+            ciphertext, iv = self.crypto_manager.encrypt(
+                algorithm=job["algorithm"],
+                key=job["key"],
+                plaintext=job["data"],
+                mode=job["mode"],
+                padding_mode=job["padding_mode"],
+                progress_callback=self.report_progress
+            )
+        return base64.b64encode(ciphertext).decode('utf-8'), base64.b64encode(iv).decode('utf-8')
+
+    def _decrypt(self, job: dict) -> bytes:
+        encrypted_bytes = as_bytes(job["data"])
+        with tracer.span("decrypt", "crypto", trace=job["trace_id"], stage="decrypt",
+                         algorithm=job["algorithm"].name, size=len(encrypted_bytes)):
+            return self.crypto_manager.decrypt(
+                job["algorithm"],
+                job["key"],
+                encrypted_bytes,
+                mode=job["mode"],
+                padding_mode=job["padding_mode"],
+                iv=None,
+                progress_callback=self.report_progress
+            )
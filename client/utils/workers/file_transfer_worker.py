@@ -0,0 +1,257 @@
+import math
+import time
+import uuid
+import base64
+import hashlib
+import logging
+import concurrent.futures
+import httpx
+from pathlib import Path
+from datetime import datetime
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from crypto.base.modes import PaddingMode, CipherMode
+from messaging.envelope import as_bytes
+from utils.constants import FILE_CHUNK_SIZE, CHUNK_UPLOAD_RETRIES, CHUNK_RETRY_BASE_DELAY, CHUNK_RETRY_MAX_DELAY
+
+logger = logging.getLogger("SecureChat")
+
+class TransferCancelled(Exception):
+    pass
+
+def new_upload_transfer(chat_id: str, file_path: Path) -> dict:
+    file_size = file_path.stat().st_size
+    return {
+        "transfer_id": str(uuid.uuid4()),
+        "chat_id": chat_id,
+        "direction": "upload",
+        "file_name": file_path.name,
+        "file_path": str(file_path),
+        "file_size": file_size,
+        "sha256": None,
+        "total_chunks": max(math.ceil(file_size / FILE_CHUNK_SIZE), 1),
+        "acked_chunks": 0,
+        "timestamp": datetime.now().isoformat(),
+        "status": "active"
+    }
+
+class FileUploadWorker(QThread):
+
+    progress = pyqtSignal(int)
+    result = pyqtSignal(dict)
+    error = pyqtSignal(str)
+
+    def __init__(self, crypto_manager, api_client, db_manager, transfer: dict, user_id, algorithm, key,
+                 mode=CipherMode.CBC, padding_mode=PaddingMode.PKCS7, parent=None):
+        super().__init__(parent)
+        self.crypto_manager = crypto_manager
+        self.api_client = api_client
+        self.db_manager = db_manager
+        self.transfer = transfer
+        self.user_id = user_id
+        self.algorithm = algorithm
+        self.key = key
+        self.mode = mode
+        self.padding_mode = padding_mode
+        self._is_running = False
+        self._cancelled = False
+        self._pending_request = None
+
+    def run(self):
+        self._is_running = True
+        self._cancelled = False
+        transfer = self.transfer
+        transfer_id = transfer["transfer_id"]
+        file_path = Path(transfer["file_path"])
+        total_chunks = transfer["total_chunks"]
+
+        try:
+            if file_path.stat().st_size != transfer["file_size"]:
+                raise ValueError(f"'{file_path.name}' changed since the transfer started")
+
+            sha256 = file_sha256(file_path)
+            if transfer["sha256"] is None:
+                transfer["sha256"] = sha256
+                self.db_manager.set_transfer_hash(transfer_id, sha256)
+            elif transfer["sha256"] != sha256:
+                raise ValueError(f"'{file_path.name}' changed since the transfer started")
+
+            start_seq = transfer["acked_chunks"]
+            if start_seq:
+                logger.info(f"Resuming transfer {transfer_id} from chunk {start_seq}/{total_chunks}")
+
+            with open(file_path, "rb") as f:
+                f.seek(start_seq * FILE_CHUNK_SIZE)
+                for seq in range(start_seq, total_chunks):
+                    chunk = f.read(FILE_CHUNK_SIZE)
+
+                    def report_progress(percent, seq=seq):
+                        if self._cancelled:
+                            raise TransferCancelled()
+                        self.progress.emit(int((seq + percent / 100) * 100 / total_chunks))
+
+                    ciphertext, iv = self.crypto_manager.encrypt(
+                        algorithm=self.algorithm,
+                        key=self.key,
+                        plaintext=chunk,
+                        mode=self.mode,
+                        padding_mode=self.padding_mode,
+                        progress_callback=report_progress
+                    )
+
+                    self._send_chunk(seq, ciphertext, iv)
+                    transfer["acked_chunks"] = seq + 1
+                    self.db_manager.update_transfer_progress(transfer_id, seq + 1)
+                    self.progress.emit(int((seq + 1) * 100 / total_chunks))
+
+            self.db_manager.update_transfer_status(transfer_id, "completed")
+            self.result.emit(dict(transfer))
+
+        except TransferCancelled:
+            self.db_manager.update_transfer_status(transfer_id, "cancelled")
+            self.error.emit("File upload cancelled")
+        except Exception as e:
+            logger.exception(f"File upload error for transfer {transfer_id}:")
+            self.db_manager.update_transfer_status(transfer_id, "paused")
+            self.error.emit(f"File upload error: {str(e)}")
+        finally:
+            self._is_running = False
+
+    def _send_chunk(self, seq: int, ciphertext: bytes, iv: bytes):
+        transfer = self.transfer
+        for attempt in range(CHUNK_UPLOAD_RETRIES + 1):
+            if self._cancelled:
+                raise TransferCancelled()
+            try:
+                self._pending_request = self.api_client.submit_from_thread(self.api_client.send_file_chunk(
+                    chat_id=transfer["chat_id"],
+                    user_id=self.user_id,
+                    transfer_id=transfer["transfer_id"],
+                    seq=seq,
+                    total_chunks=transfer["total_chunks"],
+                    file_name=transfer["file_name"],
+                    file_size=transfer["file_size"],
+                    sha256=transfer["sha256"],
+                    encrypted_chunk=ciphertext,
+                    iv_nonce=base64.b64encode(iv).decode('utf-8'),
+                    timestamp=transfer["timestamp"]
+                ))
+                if self._cancelled:
+                    self._pending_request.cancel()
+                try:
+                    response = self._pending_request.result()
+                except concurrent.futures.CancelledError:
+                    raise TransferCancelled()
+                finally:
+                    self._pending_request = None
+                if response.get("status") != "accepted" or response.get("seq") != seq:
+                    raise ValueError(f"Server did not acknowledge chunk {seq}: {response}")
+                if response.get("message_seq") is not None:
+                    # Set by the chunk that completed the transfer, the chat seq of the file message
+                    transfer["message_seq"] = response["message_seq"]
+                return
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code < 500:
+                    raise
+                error = e
+            except (ConnectionError, TimeoutError) as e:
+                error = e
+
+            if attempt == CHUNK_UPLOAD_RETRIES:
+                raise error
+            delay = min(CHUNK_RETRY_BASE_DELAY * 2 ** attempt, CHUNK_RETRY_MAX_DELAY)
+            logger.warning(f"Chunk {seq} of transfer {transfer['transfer_id']} failed ({error}), "
+                           f"retrying in {delay:.1f}s")
+            self._sleep_unless_cancelled(delay)
+
+    def _sleep_unless_cancelled(self, delay: float):
+        deadline = time.monotonic() + delay
+        while not self._cancelled and time.monotonic() < deadline:
+            self.msleep(100)
+
+    def cancel(self):
+        # Never waits here: the thread may be waiting on a request that runs on the GUI thread's loop.
+        # The run loop stops at its next check and the finished signal does the cleanup
+        if self._is_running:
+            self._cancelled = True
+            pending_request = self._pending_request
+            if pending_request is not None:
+                pending_request.cancel()
+            logger.info("File upload cancellation requested.")
+
+
+class FileAssemblyWorker(QThread):
+
+    progress = pyqtSignal(int)
+    result = pyqtSignal(dict)
+    error = pyqtSignal(str)
+
+    def __init__(self, crypto_manager, db_manager, transfer: dict, algorithm, key, target_path: Path,
+                 mode=CipherMode.CBC, padding_mode=PaddingMode.PKCS7, parent=None):
+        super().__init__(parent)
+        self.crypto_manager = crypto_manager
+        self.db_manager = db_manager
+        self.transfer = transfer
+        self.algorithm = algorithm
+        self.key = key
+        self.target_path = target_path
+        self.mode = mode
+        self.padding_mode = padding_mode
+        self._is_running = False
+        self._cancelled = False
+
+    def run(self):
+        self._is_running = True
+        self._cancelled = False
+        transfer_id = self.transfer["transfer_id"]
+        total_chunks = self.transfer["total_chunks"]
+
+        try:
+            digest = hashlib.sha256()
+            with open(self.target_path, "wb") as f:
+                for seq in range(total_chunks):
+                    if self._cancelled:
+                        raise Exception("cancelled")
+
+                    encrypted_chunk = self.db_manager.get_file_chunk(transfer_id, seq)
+                    if encrypted_chunk is None:
+                        raise ValueError(f"Chunk {seq} of transfer {transfer_id} is missing")
+
+                    plaintext = self.crypto_manager.decrypt(
+                        self.algorithm,
+                        self.key,
+                        as_bytes(encrypted_chunk),
+                        mode=self.mode,
+                        padding_mode=self.padding_mode,
+                        iv=None
+                    )
+                    digest.update(plaintext)
+                    f.write(plaintext)
+                    self.progress.emit(int((seq + 1) * 100 / total_chunks))
+
+            if digest.hexdigest() != self.transfer["sha256"]:
+                raise ValueError(f"Checksum mismatch for '{self.transfer['file_name']}'")
+
+            self.result.emit(dict(self.transfer, file_path=str(self.target_path)))
+
+        except Exception as e:
+            logger.exception(f"File assembly error for transfer {transfer_id}:")
+            self.target_path.unlink(missing_ok=True)
+            self.error.emit(str(e))
+        finally:
+            self._is_running = False
+
+    def cancel(self):
+        if self._is_running:
+            self._cancelled = True
+            self.quit()
+            self.wait()
+            logger.info("File assembly cancellation requested.")
+
+
+def file_sha256(file_path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(FILE_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
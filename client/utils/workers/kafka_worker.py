@@ -1,12 +1,16 @@
 import asyncio
+import logging
 from PyQt5.QtCore import QObject, pyqtSignal
 
+logger = logging.getLogger("SecureChat")
+
 class KafkaWorker(QObject):
-    message_received = pyqtSignal(dict)
+    batch_received = pyqtSignal(list)
 
-    def __init__(self, kafka_consumer):
+    def __init__(self, kafka_consumer, max_backoff: float = 30.0):
         super().__init__()
         self.consumer = kafka_consumer
+        self.max_backoff = max_backoff
         self._loop = asyncio.new_event_loop()
         self._task = None
         self._stopping = False
@@ -26,18 +30,38 @@ class KafkaWorker(QObject):
             self._loop.close()
 
     async def run_consumer(self):
-        await self.consumer.start()
-        try:
-            async for msg in self.consumer:
-                if self._stopping:
+        backoff = 1.0
+        while not self._stopping:
+            try:
+                await self.consumer.start()
+                backoff = 1.0
+                while not self._stopping:
+                    records = await self.consumer.get_batch()
+                    if records:
+                        self.batch_received.emit(records)
+                    await self.consumer.commit()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Kafka consumer failed, reconnecting in {backoff:.0f}s: {e}")
+                await self._stop_consumer()
+                try:
+                    await asyncio.sleep(backoff)
+                except asyncio.CancelledError:
                     break
-                self.message_received.emit(msg.value)
-        except asyncio.CancelledError:
-            pass
-        finally:
+                backoff = min(backoff * 2, self.max_backoff)
+        await self._stop_consumer()
+
+    async def _stop_consumer(self):
+        try:
             await self.consumer.stop()
+        except Exception as e:
+            logger.warning(f"Error while stopping Kafka consumer: {e}")
+
+    def ack(self, record: dict):
+        self.consumer.ack(record)
 
     def stop(self):
         self._stopping = True
         if self._task and not self._task.done():
-            self._task.cancel()
+            self._loop.call_soon_threadsafe(self._task.cancel)
@@ -0,0 +1,73 @@
+import hashlib
+import logging
+from pathlib import Path
+from typing import Callable
+from PyQt5.QtCore import QObject, QRunnable, QBuffer, QByteArray, QIODevice, QSize, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader
+
+logger = logging.getLogger("SecureChat")
+
+class ThumbnailSignals(QObject):
+    finished = pyqtSignal(str, str, QImage)
+    failed = pyqtSignal(str)
+
+class ThumbnailTask(QRunnable):
+
+    def __init__(self, entry_key: str, file_hash: str, load_bytes: Callable[[], bytes],
+                 target_size: QSize, keep_aspect: bool, cache_dir: Path, signals: ThumbnailSignals):
+        super().__init__()
+        self.entry_key = entry_key
+        self.file_hash = file_hash
+        self.load_bytes = load_bytes
+        self.target_size = target_size
+        self.keep_aspect = keep_aspect
+        self.cache_dir = cache_dir
+        self.signals = signals
+
+    @staticmethod
+    def cache_name(file_hash: str, target_size: QSize, keep_aspect: bool) -> str:
+        if keep_aspect:
+            return f"{file_hash}_w{target_size.width()}.png"
+        return f"{file_hash}_{target_size.width()}x{target_size.height()}.png"
+
+    def run(self):
+        try:
+            data = None
+            file_hash = self.file_hash
+            if not file_hash:
+                data = self.load_bytes()
+                file_hash = hashlib.sha256(data).hexdigest()
+
+            cache_path = self.cache_dir / self.cache_name(file_hash, self.target_size, self.keep_aspect)
+            image = QImage()
+            if cache_path.exists():
+                image.load(str(cache_path))
+
+            if image.isNull():
+                if data is None:
+                    data = self.load_bytes()
+                image = self._decode_scaled(data)
+                if not image.isNull():
+                    image.save(str(cache_path), "PNG")
+
+            if image.isNull():
+                self.signals.failed.emit(self.entry_key)
+            else:
+                self.signals.finished.emit(self.entry_key, file_hash, image)
+        except Exception as e:
+            logger.error(f"Thumbnail generation failed for {self.entry_key}: {e}")
+            self.signals.failed.emit(self.entry_key)
+
+    def _decode_scaled(self, data: bytes) -> QImage:
+        buffer = QBuffer()
+        buffer.setData(QByteArray(data))
+        buffer.open(QIODevice.ReadOnly)
+        reader = QImageReader(buffer)
+
+        target = self.target_size
+        source = reader.size()
+        if self.keep_aspect and source.isValid() and source.width() > 0:
+            target = QSize(self.target_size.width(),
+                           max(int(source.height() * self.target_size.width() / source.width()), 1))
+        reader.setScaledSize(target)
+        return reader.read()
@@ -1,4 +1,4 @@
-import requests
+import httpx
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton,
     QMessageBox, QTabWidget, QFormLayout, QFrame
@@ -8,6 +8,7 @@ from PyQt5.QtCore import Qt, QSize
 
 
 from services.api_client import ApiClient
+from utils.async_tasks import run_async, show_message_later
 
 class LoginWindow(QWidget):
 
@@ -160,6 +161,11 @@ class LoginWindow(QWidget):
         self.register_tab.setLayout(layout)
 
 
+    def set_busy(self, busy: bool):
+        # Keeps a second click from firing another request while one is in flight
+        self.login_button.setEnabled(not busy)
+        self.register_button.setEnabled(not busy)
+
     def try_login(self):
         user_id = self.login_user_id_input.text().strip()
         password = self.login_password_input.text().strip()
@@ -176,17 +182,23 @@ class LoginWindow(QWidget):
             QMessageBox.warning(self, "Login Error", "Password must be at least 6 characters long.")
             return
 
+        run_async(self.login(user_id, password))
+
+    async def login(self, user_id: str, password: str):
+        self.set_busy(True)
         try:
-            id = self.api_client.login(user_id, password)['id']
+            id = (await self.api_client.login(user_id, password))['id']
             self.on_login_success(id)
             self.close()
-        except requests.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             if e.response.status_code == 401:
-                QMessageBox.warning(self, "Login Failed", "Invalid credentials.")
+                show_message_later(QMessageBox.warning, self, "Login Failed", "Invalid credentials.")
             else:
-                QMessageBox.critical(self, "Login Error", f"Unexpected error: {e.response.text}")
+                show_message_later(QMessageBox.critical, self, "Login Error", f"Unexpected error: {e.response.text}")
         except Exception as e:
-            QMessageBox.critical(self, "Login Error", f"Unexpected error: {str(e)}")
+            show_message_later(QMessageBox.critical, self, "Login Error", f"Unexpected error: {str(e)}")
+        finally:
+            self.set_busy(False)
 
 
     def try_register(self):
@@ -205,14 +217,21 @@ class LoginWindow(QWidget):
             QMessageBox.warning(self, "Registration Error", "Password must be at least 6 characters long.")
             return
 
+        run_async(self.register(user_id, password))
+
+    async def register(self, user_id: str, password: str):
+        self.set_busy(True)
         try:
-            self.api_client.register(user_id, password)
-            QMessageBox.information(self, "Registered", "Account created. You can now log in.")
+            await self.api_client.register(user_id, password)
+            show_message_later(QMessageBox.information, self, "Registered", "Account created. You can now log in.")
             self.tabs.setCurrentIndex(0)
-        except requests.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             if e.response.status_code == 400:
-                QMessageBox.warning(self, "Registration Failed", "User ID is already taken.")
+                show_message_later(QMessageBox.warning, self, "Registration Failed", "User ID is already taken.")
             else:
-                QMessageBox.critical(self, "Registration Error", f"Unexpected error: {e.response.text}")
+                show_message_later(QMessageBox.critical, self, "Registration Error",
+                                   f"Unexpected error: {e.response.text}")
         except Exception as e:
-            QMessageBox.critical(self, "Registration Error", f"Unexpected error: {str(e)}")
+            show_message_later(QMessageBox.critical, self, "Registration Error", f"Unexpected error: {str(e)}")
+        finally:
+            self.set_busy(False)
@@ -0,0 +1,355 @@
+from collections import OrderedDict
+from PyQt5.QtWidgets import QStyledItemDelegate, QStyle, QApplication
+from PyQt5.QtCore import Qt, QRect, QRectF, QSize, QPoint, QEvent, QBuffer, QByteArray, QIODevice, pyqtSignal
+from PyQt5.QtGui import (QPainter, QColor, QPen, QFont, QFontMetrics, QImage, QImageReader,
+                         QPixmap, QTextDocument, QTextOption)
+
+from views.models.message_model import MessageRole, load_entry_bytes
+from views.dialogs.image_preview import ImagePreviewDialog
+from views.dialogs.gif_preview import GifPreviewDialog
+from views.dialogs.text_preview import TextPreviewDialog
+from views.dialogs.markdown_preview import MarkdownPreviewDialog
+from views.dialogs.video_preview import VideoPreviewDialog
+
+SIDE_MARGIN = 25
+ROW_PADDING = 10
+BUBBLE_PADDING_H = 12
+BUBBLE_PADDING_V = 8
+BUBBLE_SPACING = 6
+BUBBLE_RADIUS = 12
+TEXT_WIDTH = 260
+MEDIA_WIDTH = 300
+GIF_SIZE = QSize(300, 300)
+VIDEO_SIZE = QSize(360, 200)
+IMAGE_PLACEHOLDER_SIZE = QSize(300, 200)
+FILE_ROW_HEIGHT = 22
+FILE_ICON_SIZE = 18
+FILE_NAME_WIDTH = 200
+SAVE_BUTTON_SIZE = QSize(110, 30)
+SYSTEM_PADDING = 6
+DOCUMENT_CACHE_SIZE = 256
+
+BUBBLE_COLORS = {
+    True: (QColor("#2a4a7a"), QColor("#3a5a8a")),
+    False: (QColor("#2a2a3a"), QColor("#383848")),
+}
+
+
+class MessageDelegate(QStyledItemDelegate):
+    save_file_requested = pyqtSignal(object)
+
+    def __init__(self, view, thumbnail_cache, parent=None):
+        super().__init__(parent)
+        self.view = view
+        self.thumbnail_cache = thumbnail_cache
+        self.gif_animator = None
+
+        base_font = QApplication.font()
+        self.sender_font = QFont(base_font)
+        self.sender_font.setPixelSize(10)
+        self.sender_font.setWeight(QFont.Medium)
+        self.time_font = QFont(base_font)
+        self.time_font.setPixelSize(9)
+        self.file_font = QFont(base_font)
+        self.file_font.setPixelSize(12)
+        self.file_font.setItalic(True)
+        self.system_font = QFont(base_font)
+        self.system_font.setPixelSize(11)
+        self.system_font.setItalic(True)
+        self.button_font = QFont(base_font)
+        self.button_font.setPixelSize(12)
+
+        self._content_sizes = {}
+        self._system_heights = {}
+        self._documents = OrderedDict()
+
+    def sizeHint(self, option, index):
+        entry = index.data(MessageRole)
+        width = self.view.viewport().width()
+        if entry is None:
+            return QSize(width, 0)
+        if entry["kind"] == "system":
+            return QSize(width, self._system_height(entry, width))
+        content = self._content_size(entry)
+        return QSize(width, content.height() + 2 * BUBBLE_PADDING_V + 2 * ROW_PADDING)
+
+    def paint(self, painter, option, index):
+        entry = index.data(MessageRole)
+        if entry is None:
+            return
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform)
+        if entry["kind"] == "system":
+            self._paint_system(painter, option.rect, entry)
+        else:
+            self._paint_message(painter, option, entry)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() != QEvent.MouseButtonRelease or event.button() != Qt.LeftButton:
+            return False
+
+        entry = index.data(MessageRole)
+        if not entry or entry["kind"] != "message" or not entry["is_file"]:
+            return False
+
+        layout = self._layout(entry, option.rect)
+        pos = event.pos()
+        if layout["save"].contains(pos):
+            self.save_file_requested.emit(entry)
+            return True
+        if layout["file_row"].contains(pos) or (layout["media"] is not None and layout["media"].contains(pos)):
+            self.open_preview(entry)
+            return True
+        return False
+
+    def invalidate(self, key: str):
+        self._content_sizes.pop(key, None)
+
+    def open_preview(self, entry: dict):
+        kind = entry["media_kind"]
+        file_bytes = load_entry_bytes(entry)
+        file_name = entry["file_name"]
+        if not file_bytes:
+            return
+        if kind == "image":
+            image = QImage.fromData(file_bytes)
+            if not image.isNull():
+                ImagePreviewDialog(QPixmap.fromImage(image)).exec_()
+        elif kind == "gif":
+            GifPreviewDialog(file_bytes).exec_()
+        elif kind == "video":
+            VideoPreviewDialog(file_bytes, file_name).exec_()
+        elif kind == "text":
+            TextPreviewDialog(file_bytes.decode(errors="ignore"), file_name).exec_()
+        elif kind == "markdown":
+            MarkdownPreviewDialog(file_bytes.decode(errors="ignore"), file_name).exec_()
+
+    def _system_height(self, entry: dict, width: int) -> int:
+        cache_key = (entry["key"], width)
+        height = self._system_heights.get(cache_key)
+        if height is None:
+            metrics = QFontMetrics(self.system_font)
+            bounds = metrics.boundingRect(
+                QRect(0, 0, max(width - 2 * SIDE_MARGIN, 1), 10000),
+                Qt.AlignHCenter | Qt.TextWordWrap,
+                entry["text"]
+            )
+            height = bounds.height() + 2 * SYSTEM_PADDING
+            self._system_heights[cache_key] = height
+        return height
+
+    def _header_height(self) -> int:
+        return max(QFontMetrics(self.sender_font).height(), QFontMetrics(self.time_font).height())
+
+    def _header_width(self, entry: dict) -> int:
+        return (QFontMetrics(self.sender_font).horizontalAdvance(entry["sender_display"]) + 6 +
+                QFontMetrics(self.time_font).horizontalAdvance(entry["formatted_time"]))
+
+    def _document(self, entry: dict) -> QTextDocument:
+        document = self._documents.get(entry["key"])
+        if document is not None:
+            self._documents.move_to_end(entry["key"])
+            return document
+
+        document = QTextDocument()
+        document.setDocumentMargin(2)
+        option = QTextOption()
+        option.setWrapMode(QTextOption.WrapAnywhere)
+        document.setDefaultTextOption(option)
+        document.setHtml(
+            f"<div style='color: #eeeeee; font-size: 13px; line-height: 1.4;'>"
+            f"{entry['text']}"
+            f"</div>"
+        )
+        document.setTextWidth(TEXT_WIDTH)
+        document.setTextWidth(min(TEXT_WIDTH, int(document.idealWidth()) + 1))
+
+        self._documents[entry["key"]] = document
+        if len(self._documents) > DOCUMENT_CACHE_SIZE:
+            self._documents.popitem(last=False)
+        return document
+
+    def _media_size(self, entry: dict):
+        kind = entry["media_kind"]
+        if kind == "gif":
+            return GIF_SIZE
+        if kind == "video":
+            return VIDEO_SIZE
+        if kind != "image":
+            return None
+
+        if entry.get("image_size") is not None:
+            return entry["image_size"]
+
+        if entry.get("file_bytes"):
+            buffer = QBuffer()
+            buffer.setData(QByteArray(entry["file_bytes"]))
+            buffer.open(QIODevice.ReadOnly)
+            source_size = QImageReader(buffer).size()
+            if source_size.isValid() and source_size.width() > 0:
+                height = int(source_size.height() * MEDIA_WIDTH / source_size.width())
+                entry["image_size"] = QSize(MEDIA_WIDTH, max(height, 1))
+                return entry["image_size"]
+
+        cached_size = self.thumbnail_cache.cached_size(entry, QSize(MEDIA_WIDTH, 0), keep_aspect=True)
+        if cached_size is not None:
+            entry["image_size"] = cached_size
+            return cached_size
+        return IMAGE_PLACEHOLDER_SIZE
+
+    def _content_size(self, entry: dict) -> QSize:
+        size = self._content_sizes.get(entry["key"])
+        if size is not None:
+            return size
+
+        width = self._header_width(entry)
+        height = self._header_height() + BUBBLE_SPACING
+        if entry["is_file"]:
+            width = max(width, FILE_ICON_SIZE + 6 + FILE_NAME_WIDTH, SAVE_BUTTON_SIZE.width())
+            height += FILE_ROW_HEIGHT + BUBBLE_SPACING
+            media_size = self._media_size(entry)
+            if media_size is not None:
+                width = max(width, media_size.width())
+                height += media_size.height() + BUBBLE_SPACING
+            height += SAVE_BUTTON_SIZE.height()
+        else:
+            document = self._document(entry)
+            width = max(width, int(document.textWidth()))
+            height += int(document.size().height())
+
+        size = QSize(width, height)
+        self._content_sizes[entry["key"]] = size
+        return size
+
+    def _layout(self, entry: dict, rect: QRect) -> dict:
+        content = self._content_size(entry)
+        bubble_width = content.width() + 2 * BUBBLE_PADDING_H
+        bubble_height = content.height() + 2 * BUBBLE_PADDING_V
+        if entry["is_own"]:
+            x = rect.right() - SIDE_MARGIN - bubble_width + 1
+        else:
+            x = rect.left() + SIDE_MARGIN
+        bubble = QRect(x, rect.top() + ROW_PADDING, bubble_width, bubble_height)
+
+        inner_x = bubble.left() + BUBBLE_PADDING_H
+        y = bubble.top() + BUBBLE_PADDING_V
+        header = QRect(inner_x, y, content.width(), self._header_height())
+        y += header.height() + BUBBLE_SPACING
+
+        layout = {"bubble": bubble, "header": header, "body": None,
+                  "file_row": QRect(), "media": None, "save": QRect()}
+        if entry["is_file"]:
+            layout["file_row"] = QRect(inner_x, y, FILE_ICON_SIZE + 6 + FILE_NAME_WIDTH, FILE_ROW_HEIGHT)
+            y += FILE_ROW_HEIGHT + BUBBLE_SPACING
+            media_size = self._media_size(entry)
+            if media_size is not None:
+                layout["media"] = QRect(QPoint(inner_x, y), media_size)
+                y += media_size.height() + BUBBLE_SPACING
+            layout["save"] = QRect(QPoint(inner_x, y), SAVE_BUTTON_SIZE)
+        else:
+            document = self._document(entry)
+            layout["body"] = QRect(inner_x, y, int(document.textWidth()), int(document.size().height()))
+        return layout
+
+    def _paint_system(self, painter: QPainter, rect: QRect, entry: dict):
+        painter.setFont(self.system_font)
+        painter.setPen(QColor("#aaaaaa"))
+        painter.drawText(
+            rect.adjusted(SIDE_MARGIN, SYSTEM_PADDING, -SIDE_MARGIN, -SYSTEM_PADDING),
+            Qt.AlignHCenter | Qt.AlignVCenter | Qt.TextWordWrap,
+            entry["text"]
+        )
+
+    def _paint_message(self, painter: QPainter, option, entry: dict):
+        layout = self._layout(entry, option.rect)
+        background, border = BUBBLE_COLORS[entry["is_own"]]
+
+        painter.setPen(QPen(border, 1))
+        painter.setBrush(background)
+        painter.drawRoundedRect(QRectF(layout["bubble"]).adjusted(0.5, 0.5, -0.5, -0.5),
+                                BUBBLE_RADIUS, BUBBLE_RADIUS)
+
+        header = layout["header"]
+        painter.setFont(self.sender_font)
+        painter.setPen(QColor("#aaaaaa"))
+        painter.drawText(header, Qt.AlignLeft | Qt.AlignVCenter, entry["sender_display"])
+        sender_width = QFontMetrics(self.sender_font).horizontalAdvance(entry["sender_display"]) + 6
+        painter.setFont(self.time_font)
+        painter.setPen(QColor("#888888"))
+        painter.drawText(header.adjusted(sender_width, 0, 0, 0), Qt.AlignLeft | Qt.AlignVCenter,
+                         entry["formatted_time"])
+
+        if not entry["is_file"]:
+            body = layout["body"]
+            painter.translate(body.topLeft())
+            self._document(entry).drawContents(painter, QRectF(0, 0, body.width(), body.height()))
+            painter.translate(-body.topLeft())
+            return
+
+        self._paint_file_row(painter, option, layout["file_row"], entry)
+        if layout["media"] is not None:
+            self._paint_media(painter, option, layout["media"], entry)
+        self._paint_save_button(painter, layout["save"])
+
+    def _paint_file_row(self, painter: QPainter, option, rect: QRect, entry: dict):
+        style = option.widget.style() if option.widget else QApplication.style()
+        icon = style.standardIcon(QStyle.SP_FileIcon).pixmap(FILE_ICON_SIZE, FILE_ICON_SIZE)
+        icon_top = rect.top() + (rect.height() - FILE_ICON_SIZE) // 2
+        painter.drawPixmap(rect.left(), icon_top, icon)
+
+        painter.setFont(self.file_font)
+        painter.setPen(QColor("#dddddd"))
+        metrics = QFontMetrics(self.file_font)
+        elided = metrics.elidedText(entry["file_name"] or "", Qt.ElideRight, FILE_NAME_WIDTH)
+        painter.drawText(rect.adjusted(FILE_ICON_SIZE + 6, 0, 0, 0), Qt.AlignLeft | Qt.AlignVCenter, elided)
+
+    def _paint_media(self, painter: QPainter, option, rect: QRect, entry: dict):
+        painter.setPen(QPen(QColor("#444444"), 1))
+        painter.setBrush(QColor("#000000") if entry["media_kind"] == "video" else QColor("#262630"))
+
+        pixmap = self._media_pixmap(entry)
+        if pixmap is not None:
+            painter.drawPixmap(rect, pixmap)
+            painter.setBrush(Qt.NoBrush)
+        painter.drawRoundedRect(QRectF(rect).adjusted(0.5, 0.5, -0.5, -0.5), 6, 6)
+
+        if entry["media_kind"] == "video":
+            style = option.widget.style() if option.widget else QApplication.style()
+            play = style.standardIcon(QStyle.SP_MediaPlay).pixmap(48, 48)
+            painter.drawPixmap(rect.center() - QPoint(24, 24), play)
+        elif pixmap is None:
+            painter.setFont(self.time_font)
+            painter.setPen(QColor("#888888"))
+            failed = self.thumbnail_cache.has_failed(entry)
+            painter.drawText(rect, Qt.AlignCenter, "Preview unavailable" if failed else "Loading preview...")
+        elif entry["media_kind"] == "gif":
+            painter.setFont(self.time_font)
+            badge = QRect(rect.left() + 6, rect.top() + 6, 28, 16)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor(0, 0, 0, 160))
+            painter.drawRoundedRect(QRectF(badge), 4, 4)
+            painter.setPen(QColor("#ffffff"))
+            painter.drawText(badge, Qt.AlignCenter, "GIF")
+
+    def _media_pixmap(self, entry: dict):
+        kind = entry["media_kind"]
+        if kind == "gif":
+            if self.gif_animator is not None:
+                frame = self.gif_animator.current_pixmap(entry["key"])
+                if frame is not None:
+                    return frame
+            return self.thumbnail_cache.pixmap(entry, GIF_SIZE, keep_aspect=False)
+        if kind == "image":
+            return self.thumbnail_cache.pixmap(entry, QSize(MEDIA_WIDTH, 0), keep_aspect=True)
+        return None
+
+    def _paint_save_button(self, painter: QPainter, rect: QRect):
+        painter.setPen(QPen(QColor("#4a6a8a"), 1))
+        painter.setBrush(QColor("#3a5a7a"))
+        painter.drawRoundedRect(QRectF(rect).adjusted(0.5, 0.5, -0.5, -0.5), 8, 8)
+        painter.setFont(self.button_font)
+        painter.setPen(QColor("#ffffff"))
+        painter.drawText(rect, Qt.AlignCenter, "Save File")
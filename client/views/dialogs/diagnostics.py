@@ -0,0 +1,103 @@
+import logging
+from datetime import datetime
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+                             QPushButton, QLabel, QFileDialog, QMessageBox, QHeaderView)
+
+logger = logging.getLogger("SecureChat")
+
+COLUMNS = ("Time", "Dir", "Chat", "Message", "Crypto ms", "Send ms", "Persist ms", "Render ms", "Total ms")
+
+
+class DiagnosticsDialog(QDialog):
+    """Per-message timing breakdown of recent messages, refreshed while the dialog is open."""
+
+    def __init__(self, tracer, parent=None, refresh_interval_ms: int = 1000):
+        super().__init__(parent)
+        self.tracer = tracer
+        self.setWindowTitle("Diagnostics")
+        self.resize(900, 400)
+
+        layout = QVBoxLayout(self)
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        export_button = QPushButton("Export Chrome trace...")
+        export_button.clicked.connect(self.export_trace)
+        clear_button = QPushButton("Clear")
+        clear_button.clicked.connect(self.clear)
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.close)
+        buttons.addWidget(export_button)
+        buttons.addWidget(clear_button)
+        buttons.addStretch()
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.setInterval(refresh_interval_ms)
+
+    def showEvent(self, event):
+        self.refresh()
+        self.refresh_timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        messages = self.tracer.recent_messages()
+        self.table.setRowCount(len(messages))
+        for row, message in enumerate(messages):
+            stages = message["stages"]
+            crypto = stages.get("encrypt", stages.get("decrypt"))
+            values = [
+                datetime.fromtimestamp(message["started_at"]).strftime("%H:%M:%S"),
+                message["direction"],
+                message["chat_id"][:8],
+                message["trace"][:8],
+                crypto,
+                stages.get("send"),
+                stages.get("persist"),
+                stages.get("render"),
+                sum(stages.values()) if stages else None
+            ]
+            for column, value in enumerate(values):
+                text = f"{value:.1f}" if isinstance(value, float) else ("" if value is None else str(value))
+                item = QTableWidgetItem(text)
+                if isinstance(value, float):
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.table.setItem(row, column, item)
+
+        status = "on" if self.tracer.enabled else "off (CHAT_TRACING=0)"
+        self.summary_label.setText(f"Tracing {status}, {len(messages)} recent messages")
+
+    def clear(self):
+        self.tracer.clear()
+        self.refresh()
+
+    def export_trace(self):
+        default_name = f"securechat-trace-{datetime.now():%Y%m%d-%H%M%S}.json"
+        path, _ = QFileDialog.getSaveFileName(self, "Export Chrome trace", default_name, "JSON (*.json)")
+        if not path:
+            return
+        try:
+            count = self.tracer.export_chrome_trace(path)
+        except OSError as e:
+            logger.error(f"Trace export to {path} failed: {e}")
+            QMessageBox.critical(self, "Export Error", f"Could not write trace: {e}")
+            return
+        logger.info(f"Exported {count} spans to {path}")
+        QMessageBox.information(self, "Trace exported",
+                                f"Wrote {count} spans to {path}.\nOpen it in chrome://tracing or ui.perfetto.dev.")
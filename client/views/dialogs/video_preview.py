@@ -0,0 +1,151 @@
+import os
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QWidget, QLabel,
+                             QSlider, QToolButton, QStyle, QGraphicsView, QGraphicsScene)
+from PyQt5.QtCore import Qt, QUrl, QSizeF
+from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
+from PyQt5.QtMultimediaWidgets import QGraphicsVideoItem
+
+from utils.temp_files import media_temp_file
+
+class VideoPreviewDialog(QDialog):
+    def __init__(self, video_bytes: bytes, file_name: str = "", parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(file_name or "Video preview")
+        self.setWindowModality(Qt.ApplicationModal)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+
+        suffix = os.path.splitext(file_name or '')[-1]
+        temp_video = media_temp_file(suffix)
+        temp_video.write(video_bytes)
+        temp_video.close()
+        self.temp_path = temp_video.name
+
+        scene = QGraphicsScene(self)
+        video_item = QGraphicsVideoItem()
+        video_item.setSize(QSizeF(720, 400))
+        scene.addItem(video_item)
+
+        graphics_view = QGraphicsView(scene)
+        graphics_view.setFixedSize(720, 400)
+        graphics_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        graphics_view.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        graphics_view.setStyleSheet("""
+            QGraphicsView {
+                background: #000000;
+                border: none;
+                border-radius: 6px;
+            }
+        """)
+
+        self.player = QMediaPlayer(self)
+        self.player.setVideoOutput(video_item)
+        self.player.setMedia(QMediaContent(QUrl.fromLocalFile(self.temp_path)))
+        self.player.setVolume(50)
+
+        control_panel = QWidget()
+        control_panel.setStyleSheet("""
+            QWidget {
+                background: rgba(0, 0, 0, 0.3);
+                border-radius: 6px;
+            }
+        """)
+        control_layout = QHBoxLayout(control_panel)
+        control_layout.setContentsMargins(6, 4, 6, 4)
+        control_layout.setSpacing(6)
+
+        self.play_btn = QToolButton()
+        self.play_btn.setIcon(self.play_btn.style().standardIcon(QStyle.SP_MediaPlay))
+        self.play_btn.setStyleSheet("""
+            QToolButton {
+                background: transparent;
+                border: none;
+                color: #cccccc;
+                padding: 4px;
+            }
+            QToolButton:hover {
+                color: #ffffff;
+            }
+        """)
+        self.play_btn.clicked.connect(self.toggle_play)
+
+        self.progress_slider = QSlider(Qt.Horizontal)
+        self.progress_slider.setRange(0, 0)
+        self.progress_slider.setStyleSheet("""
+            QSlider::groove:horizontal {
+                border: none;
+                height: 3px;
+                background: #555555;
+                border-radius: 1px;
+            }
+            QSlider::handle:horizontal {
+                background: #cccccc;
+                border: none;
+                width: 10px;
+                height: 10px;
+                border-radius: 5px;
+                margin: -4px 0;
+            }
+            QSlider::sub-page:horizontal {
+                background: #888888;
+                border-radius: 1px;
+            }
+        """)
+        self.progress_slider.sliderMoved.connect(self.player.setPosition)
+        self.player.positionChanged.connect(self.progress_slider.setValue)
+        self.player.durationChanged.connect(lambda duration: self.progress_slider.setRange(0, duration))
+
+        volume_slider = QSlider(Qt.Horizontal)
+        volume_slider.setRange(0, 100)
+        volume_slider.setValue(50)
+        volume_slider.setFixedWidth(80)
+        volume_slider.valueChanged.connect(self.player.setVolume)
+
+        vol_label = QLabel("Vol:")
+        vol_label.setStyleSheet("""
+            QLabel {
+                color: #cccccc;
+                font-size: 10px;
+                background: transparent;
+                padding: 0 4px;
+            }
+        """)
+
+        control_layout.addWidget(self.play_btn)
+        control_layout.addWidget(self.progress_slider)
+        control_layout.addWidget(vol_label)
+        control_layout.addWidget(volume_slider)
+
+        self.player.stateChanged.connect(self.update_icon)
+        self.player.mediaStatusChanged.connect(self.handle_media_status)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(graphics_view)
+        layout.addWidget(control_panel)
+        self.setLayout(layout)
+
+    def toggle_play(self):
+        if self.player.state() == QMediaPlayer.PlayingState:
+            self.player.pause()
+        else:
+            self.player.play()
+
+    def update_icon(self, state):
+        if state == QMediaPlayer.PlayingState:
+            self.play_btn.setIcon(self.play_btn.style().standardIcon(QStyle.SP_MediaPause))
+        else:
+            self.play_btn.setIcon(self.play_btn.style().standardIcon(QStyle.SP_MediaPlay))
+
+    def handle_media_status(self, status):
+        if status == QMediaPlayer.EndOfMedia:
+            self.player.pause()
+            self.player.setPosition(0)
+            self.update_icon(QMediaPlayer.PausedState)
+
+    def done(self, result):
+        self.player.stop()
+        self.player.setMedia(QMediaContent())
+        try:
+            os.remove(self.temp_path)
+        except OSError:
+            pass
+        super().done(result)
@@ -3,7 +3,8 @@ import uuid
 import base64
 import logging
 import asyncio
-import requests
+import httpx
+from functools import partial
 from pathlib import Path
 from typing import Dict, Optional
 from datetime import datetime
@@ -12,20 +13,29 @@ from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                              QFileDialog, QListWidget, QMessageBox, QSplitter,
                              QDialog, QMenu, QStatusBar)
 from PyQt5.QtCore import Qt, pyqtSlot, QTimer, QThread
-from PyQt5.QtGui import QIcon, QGuiApplication
+from PyQt5.QtGui import QIcon, QGuiApplication, QKeySequence
 from PyQt5.QtWidgets import QPushButton, QStyle
 
 from messaging.kafka.consumer import KafkaEventConsumer
+from messaging.kafka.catch_up import CatchUpFilter
+from messaging.gateway.consumer import GatewayEventConsumer
+from messaging.sequence import ChatSequenceTracker
 from crypto.diffie_hellman.diffie_hellman import DiffieHellman
 from crypto.base.key import derive_cipher_key_16
 from views.dialogs.create_chat import CreateChatDialog
 from views.dialogs.join_chat import JoinChatDialog
+from views.dialogs.diagnostics import DiagnosticsDialog
 from views.widgets.chat_tab import ChatTab
-from services.api_client import ApiClient
+from services.api_client import ApiClient, SessionExpired
 from services.database_manager import Database
+from services.thumbnail_cache import ThumbnailCache
+from services.crypto_scheduler import CryptoScheduler, PRIORITY_TEXT, file_priority
+from services.crypto_process_pool import CryptoProcessPool, default_process_count
 from utils.cryptography_manager import CryptographyManager
-from utils.workers.decryption_worker import DecryptionWorker
-from utils.workers.encryption_worker import EncryptionWorker
+from utils.async_tasks import run_async, show_message_later
+from utils.telemetry import tracer
+from utils.workers.crypto_worker import JOB_CANCELLED
+from utils.workers.file_transfer_worker import FileUploadWorker, FileAssemblyWorker, new_upload_transfer
 from utils.workers.kafka_worker import KafkaWorker
 from utils.constants import EncryptionAlgorithm
 
@@ -33,6 +43,21 @@ logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("SecureChat")
 
+HISTORY_PAGE_SIZE = 50
+SYNC_PAGE_SIZE = 200
+SYNC_CHUNK_PAGE_SIZE = 8
+UPLOAD_SHUTDOWN_TIMEOUT_MS = 3000
+SESSION_CHECK_INTERVAL_MS = 60_000
+
+
+def ciphertext_size(ciphertext) -> int:
+    # Envelope events carry raw bytes, JSON ones base64; estimated without decoding a large file on the GUI thread
+    if not ciphertext:
+        return 0
+    if isinstance(ciphertext, (bytes, bytearray, memoryview)):
+        return len(ciphertext)
+    return len(ciphertext) * 3 // 4
+
 
 class MainWindow(QMainWindow):
 
@@ -89,25 +114,59 @@ class MainWindow(QMainWindow):
         api_base_url = os.environ.get("CHAT_API_URL", "http://localhost:8000")
 
         self.api_client = api_client
+        self.catch_up = CatchUpFilter(db_manager, self.user_id)
+        self.sequence = ChatSequenceTracker(db_manager)
+        self._syncing_chats = set()
         self.kafka_thread = QThread()
-        self.kafka_worker = KafkaWorker(
-            kafka_consumer=KafkaEventConsumer(
-                bootstrap_servers="localhost:29092",
+        if os.environ.get("CHAT_EVENTS_TRANSPORT", "gateway") == "kafka":
+            event_consumer = KafkaEventConsumer(
+                bootstrap_servers=os.environ.get("CHAT_KAFKA_BOOTSTRAP", "localhost:29092"),
                 topics=["chat_messages"],
-                group_id=self.user_id
+                group_id=self.user_id,
+                partition_key=self.user_id,
+                catch_up=self.catch_up
             )
-        )
+        else:
+            event_consumer = GatewayEventConsumer(
+                api_base_url=api_base_url,
+                user_id=self.user_id,
+                cursor_store=db_manager,
+                catch_up=self.catch_up,
+                token_provider=self.gateway_session_token
+            )
+        self.kafka_worker = KafkaWorker(kafka_consumer=event_consumer)
 
         self.kafka_worker.moveToThread(self.kafka_thread)
         self.kafka_thread.started.connect(self.kafka_worker.start)
-        self.kafka_worker.message_received.connect(self.kafka_producer_callback)
+        self.kafka_worker.batch_received.connect(self.on_kafka_batch)
         self.kafka_thread.start()
         self.crypto_manager = CryptographyManager()
         self.db_manager = db_manager
+        self.thumbnail_cache = ThumbnailCache(self.db_manager.db_path.parent / "thumbnails", parent=self)
 
-        self.encryption_worker: Optional[EncryptionWorker] = None
-        self.decryption_worker: Optional[DecryptionWorker] = None
+        # Ciphers are pure Python, a process pool runs them in parallel and off the GUI process's GIL
+        processes = default_process_count()
+        self.crypto_backend = self.crypto_manager
+        if processes > 0:
+            try:
+                self.crypto_process_pool = CryptoProcessPool(processes)
+                self.crypto_process_pool.start()
+                self.crypto_backend = self.crypto_process_pool
+            except (OSError, RuntimeError) as e:
+                logger.warning(f"Crypto process pool unavailable, encrypting in threads: {e}")
+                self.crypto_process_pool = None
+        else:
+            self.crypto_process_pool = None
+        self.crypto_scheduler = CryptoScheduler(self.crypto_backend, max_threads=processes or None, parent=self)
+        self.diagnostics_dialog: Optional[DiagnosticsDialog] = None
+
+        # Refreshes while idle too, a token that expires unused can only be replaced by a new login
+        self.session_timer = QTimer(self)
+        self.session_timer.timeout.connect(lambda: run_async(self.keep_session_alive()))
+        self.session_timer.start(SESSION_CHECK_INTERVAL_MS)
         self._pending_decryption_files: Dict[str, Path] = {}
+        self.file_upload_workers: Dict[str, FileUploadWorker] = {}
+        self.file_assembly_workers: Dict[str, FileAssemblyWorker] = {}
 
         self.chat_keys: Dict[str, bytes] = {}
 
@@ -137,15 +196,131 @@ class MainWindow(QMainWindow):
 
     async def async_init(self):
         self.load_chats()
+        self.resume_transfers()
+        await self.sync_history()
+
+    async def sync_history(self):
+        # Pulls what arrived while offline from the server store instead of replaying the broker log
+        for chat_id in list(self.chat_keys):
+            try:
+                await self.sync_chat_history(chat_id)
+            except Exception as e:
+                logger.warning(f"History sync failed for chat {chat_id}: {e}")
+
+    async def sync_chat_history(self, chat_id: str):
+        if chat_id in self._syncing_chats:
+            return
+        self._syncing_chats.add(chat_id)
+        try:
+            # Starts after the last contiguous stored seq, messages already stored above it are skipped by claim
+            after = self.sequence.cursor(chat_id)
+            while True:
+                page = await self.api_client.get_message_history(chat_id, after=after, limit=SYNC_PAGE_SIZE)
+                handled = set()
+                for message in page["messages"]:
+                    # Messages for other recipients are under their keys, the range below completes them
+                    if message["recipient"] != self.user_id or message["sender"] == self.user_id \
+                            or self.db_manager.has_message(message["message_id"]):
+                        continue
+                    handled.add(message["seq"])
+                    if message.get("transfer_id"):
+                        await self.download_file_transfer(message)
+                    elif message["is_file"]:
+                        self.handle_incoming_file(message)
+                    else:
+                        self.handle_incoming_message(message)
+                self.sequence.complete_range(chat_id, after, page["next_after"], handled)
+                after = page["next_after"]
+                if not page["has_more"]:
+                    break
+            logger.info(f"Synced history of chat {chat_id} up to seq {after}")
+        finally:
+            self._syncing_chats.discard(chat_id)
+
+    async def download_file_transfer(self, message: dict):
+        # A chunked file, its message row only points at the chunks stored on the server
+        chat_id = message["chat_id"]
+        transfer_id = message["transfer_id"]
+        if transfer_id in self.file_assembly_workers or not self.sequence.claim(chat_id, message["seq"]):
+            return
+        try:
+            after = -1
+            while True:
+                page = await self.api_client.get_file_chunks(chat_id, transfer_id, after=after,
+                                                             limit=SYNC_CHUNK_PAGE_SIZE)
+                for chunk in page["chunks"]:
+                    self.handle_incoming_file_chunk({
+                        "transfer_id": transfer_id,
+                        "chat_id": chat_id,
+                        "sender": message["sender"],
+                        "seq": chunk["seq"],
+                        "total_chunks": message["total_chunks"],
+                        "file_name": message["file_name"],
+                        "file_size": message["file_size"],
+                        "sha256": message["sha256"],
+                        "encrypted_chunk": chunk["encrypted_chunk"],
+                        "iv_nonce": chunk["iv_nonce"],
+                        "timestamp": message["timestamp"],
+                        "message_seq": message["seq"]
+                    })
+                    after = chunk["seq"]
+                if not page["has_more"]:
+                    break
+        except Exception:
+            if transfer_id not in self.file_assembly_workers:
+                self.sequence.release(chat_id, message["seq"])
+            raise
+
+    async def gateway_session_token(self) -> str:
+        # Runs on the consumer thread's loop, the refresh itself runs on the GUI loop that owns the HTTP client
+        return await asyncio.wrap_future(self.api_client.submit_from_thread(self.api_client.fresh_session_token()))
+
+    async def keep_session_alive(self):
+        try:
+            await self.api_client.ensure_session()
+        except SessionExpired:
+            pass
+        except (httpx.HTTPError, ConnectionError, TimeoutError) as e:
+            logger.warning(f"Session refresh failed, retrying on the next tick: {e}")
 
-    def kafka_producer_callback(self, data):
+    def _message_stored(self, chat_id: str, seq: Optional[int]):
+        # Cancelled jobs of a chat that was just left still report here
+        if seq is None or not self.catch_up.is_known(chat_id):
+            return
+        if self.sequence.complete(chat_id, seq) and chat_id not in self._syncing_chats:
+            logger.info(f"Missing messages before seq {seq} in chat {chat_id}, syncing history")
+            run_async(self.sync_chat_history(chat_id))
+
+    @pyqtSlot(list)
+    def on_kafka_batch(self, records: list):
+        handled = []
+        for record in records:
+            try:
+                deferred = self.kafka_producer_callback(record["value"], record)
+            except Exception:
+                logger.exception(f"Failed to handle Kafka record at offset {record['offset']}")
+                deferred = False
+            if deferred:
+                self.catch_up.deferred(record)
+            else:
+                self.kafka_worker.ack(record)
+                handled.append(record)
+        self.catch_up.applied(handled)
+
+    def ack_kafka_record(self, record: Optional[dict]):
+        if record is not None:
+            self.kafka_worker.ack(record)
+            self.catch_up.applied([record])
+
+    def kafka_producer_callback(self, data, record: Optional[dict] = None) -> bool:
         msg_type = data.get("type")
         chat_id = data.get("chat_id", None)
 
-        chats = self.db_manager.get_chats()
-        exists = any(chat["chat_id"] == chat_id for chat in chats)
-        if not exists:
-            return
+        if data.get("recipient", self.user_id) != self.user_id:
+            return False
+
+        if not self.catch_up.is_known(chat_id):
+            return False
 
         if msg_type == "user_left":
             logger.info(f"User {data.get('user_id')} left chat {chat_id}")
@@ -165,14 +340,18 @@ class MainWindow(QMainWindow):
         chat_id = msg_data.get("chat_id")
 
         if recipient_id != self.user_id:
-            return
+            return False
 
         if msg_type == "message":
             logger.debug(f"Received message for chat {chat_id}")
-            self.handle_incoming_message(msg_data)
+            return self.handle_incoming_message(msg_data, record)
         if msg_type == "file":
             logger.debug(f"Received file metadata for chat {chat_id}")
-            self.handle_incoming_file(msg_data)
+            return self.handle_incoming_file(msg_data, record)
+        if msg_type == "file_chunk":
+            logger.debug(f"Received file chunk {msg_data.get('seq')} for chat {chat_id}")
+            self.handle_incoming_file_chunk(msg_data)
+        return False
 
     def init_ui(self):
         self.central_widget = QWidget()
@@ -201,6 +380,11 @@ class MainWindow(QMainWindow):
         left_layout.addWidget(self.chats_list)
         left_layout.addLayout(chat_buttons_layout)
 
+        self.diagnostics_button = QPushButton("Diagnostics")
+        self.diagnostics_button.setShortcut(QKeySequence("Ctrl+Shift+D"))
+        self.diagnostics_button.clicked.connect(self.show_diagnostics)
+        left_layout.addWidget(self.diagnostics_button)
+
         self.logout_button = QPushButton("Logout")
         self.logout_button.clicked.connect(self.logout)
         left_layout.addWidget(self.logout_button, alignment=Qt.AlignBottom)
@@ -224,6 +408,12 @@ class MainWindow(QMainWindow):
         main_layout.addWidget(splitter)
         self.setLayout(main_layout)
 
+    def show_diagnostics(self):
+        if self.diagnostics_dialog is None:
+            self.diagnostics_dialog = DiagnosticsDialog(tracer, parent=self)
+        self.diagnostics_dialog.show()
+        self.diagnostics_dialog.raise_()
+
     def logout(self):
         reply = QMessageBox.question(
             self,
@@ -286,29 +476,39 @@ class MainWindow(QMainWindow):
     def on_chat_selected(self, item):
         chat_id = item.data(Qt.UserRole)
         if chat_id:
-            self.open_chat_tab(chat_id)
+            run_async(self.open_chat_tab(chat_id))
         else:
             logger.error(f"Could not get chat_id from selected list item: {item.text()}")
 
     def open_chat_by_id(self, chat_id: str):
-        self.open_chat_tab(chat_id)
-
-    def open_chat_tab(self, chat_id: str):
-        try:
-            data = self.api_client.get_encryption_status(chat_id, self.user_id)
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 400:
-                QMessageBox.warning(self, "Chat is closed", "This chat is no longer available for secure messaging.")
-                return
-            else:
-                raise
+        run_async(self.open_chat_tab(chat_id))
 
+    def focus_existing_tab(self, chat_id: str) -> bool:
         for i in range(self.chat_tabs.count()):
             widget = self.chat_tabs.widget(i)
             if isinstance(widget, ChatTab) and widget.chat_id == chat_id:
                 self.chat_tabs.setCurrentIndex(i)
                 logger.debug(f"Switched to existing tab for chat {chat_id}")
+                return True
+        return False
+
+    async def open_chat_tab(self, chat_id: str):
+        if self.focus_existing_tab(chat_id):
+            return
+
+        try:
+            data = await self.api_client.get_encryption_status(chat_id, self.user_id)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 400:
+                show_message_later(QMessageBox.warning, self, "Chat is closed",
+                                   "This chat is no longer available for secure messaging.")
                 return
+            else:
+                raise
+
+        # Another open request for the same chat may have finished while this one was waiting
+        if self.focus_existing_tab(chat_id):
+            return
 
         logger.info(f"Opening new tab for chat {chat_id}")
 
@@ -322,11 +522,12 @@ class MainWindow(QMainWindow):
             logger.error(f"Cannot open tab: Chat info not found in DB for {chat_id}")
             return
 
-        chat_widget = ChatTab(chat_id, self.user_id, parent=self)
+        chat_widget = ChatTab(chat_id, self.user_id, self.thumbnail_cache, parent=self)
 
         chat_widget.send_message_requested.connect(self.send_chat_message)
         chat_widget.attach_file_requested.connect(self.attach_file_dialog)
         chat_widget.cancel_operation_requested.connect(self.cancel_current_operation)
+        chat_widget.load_older_requested.connect(lambda: self.load_older_messages(chat_widget))
 
         tab_title = f"{chat_id[:8]}... ({chat_info['algorithm'].name})"
         tab_index = self.chat_tabs.addTab(chat_widget, tab_title)
@@ -353,26 +554,33 @@ class MainWindow(QMainWindow):
 
     def load_chat_history(self, chat_id: str, chat_widget: ChatTab):
         logger.info(f"Loading message history for chat {chat_id}")
-        messages = self.db_manager.get_messages(chat_id)
+        messages = self.db_manager.get_messages(chat_id, limit=HISTORY_PAGE_SIZE)
         if not messages:
             chat_widget.append_system_message("No messages yet.")
             return
 
-        messages = sorted(messages, key=lambda msg: msg['timestamp'])
+        self._prepare_history(messages)
+        chat_widget.append_messages(messages)
+        chat_widget.set_history_state(has_more=len(messages) == HISTORY_PAGE_SIZE)
+        logger.info(f"Loaded {len(messages)} messages for chat {chat_id}")
+
+    def load_older_messages(self, chat_widget: ChatTab):
+        cursor = chat_widget.oldest_message_cursor()
+        if cursor is None:
+            chat_widget.set_history_state(has_more=False)
+            return
+
+        messages = self.db_manager.get_messages(chat_widget.chat_id, before=cursor, limit=HISTORY_PAGE_SIZE)
+        self._prepare_history(messages)
+        chat_widget.prepend_messages(messages)
+        chat_widget.set_history_state(has_more=len(messages) == HISTORY_PAGE_SIZE)
+        logger.debug(f"Loaded {len(messages)} older messages for chat {chat_widget.chat_id}")
 
+    def _prepare_history(self, messages: list):
         for msg in messages:
-            is_own = msg['sender'] == self.user_id
-            chat_widget.append_message(
-                sender=msg['sender'],
-                text=msg['text'],
-                timestamp=msg['timestamp'],
-                is_own=is_own,
-                is_file=msg['is_file'],
-                file_name=msg['file_name'],
-                file_path=None,
-                file_bytes=msg['file_bytes']
-            )
-        logger.info(f"Loaded {len(messages)} messages for chat {chat_id}")
+            msg['is_own'] = msg['sender'] == self.user_id
+            if msg['has_file_bytes']:
+                msg['load_file_bytes'] = partial(self.db_manager.get_file_bytes, msg['message_id'])
 
     def close_chat_tab(self, index: int):
         widget = self.chat_tabs.widget(index)
@@ -412,48 +620,48 @@ class MainWindow(QMainWindow):
     def create_chat_dialog(self):
         dialog = CreateChatDialog(self)
         if dialog.exec_() == QDialog.Accepted:
-            algorithm = dialog.get_algorithm()
-            mode = dialog.get_mode()
-            padding = dialog.get_padding()
+            run_async(self.create_chat(dialog.get_algorithm(), dialog.get_mode(), dialog.get_padding()))
 
-            self.statusBar().showMessage("Creating new chat...")
-            try:
-                response = self.api_client.create_chat(self.user_id, algorithm.name,
-                                                       mode.name if hasattr(mode, 'name') else str(mode),
-                                                       padding.name if hasattr(padding, 'name') else str(padding))
-                chat_id = response.get("chat_id")
-
-                if not chat_id:
-                    raise ValueError("Invalid response from server during chat creation.")
-
-                dh_params = self.api_client.get_dh_params(chat_id)
-                p = int(dh_params.get('p'))
-                g = int(dh_params.get('g'))
-                logger.info(f"Chat {chat_id} created. DH params received: p={p}, g={g}")
-
-                created_at = datetime.now().isoformat()
-                self.db_manager.save_chat(
-                    chat_id, algorithm, mode, padding, created_at,
-                    "waiting_dh", is_creator=True
-                )
+    async def create_chat(self, algorithm, mode, padding):
+        self.statusBar().showMessage("Creating new chat...")
+        try:
+            response = await self.api_client.create_chat(self.user_id, algorithm.name,
+                                                         mode.name if hasattr(mode, 'name') else str(mode),
+                                                         padding.name if hasattr(padding, 'name') else str(padding))
+            chat_id = response.get("chat_id")
 
-                status_indicator = " [waiting]"
-                list_item_text = f"{chat_id[:8]}... ({algorithm.name}/{mode.name}){status_indicator}"
-                self.chats_list.addItem(list_item_text)
-                item = self.chats_list.item(self.chats_list.count() - 1)
-                item.setData(Qt.UserRole, chat_id)
+            if not chat_id:
+                raise ValueError("Invalid response from server during chat creation.")
+
+            dh_params = response.get("dh_params")
+            if not dh_params:
+                dh_params = await self.api_client.get_dh_params(chat_id)
+            p = int(dh_params.get('p'))
+            g = int(dh_params.get('g'))
+            logger.info(f"Chat {chat_id} created. DH params received: p={p}, g={g}")
+
+            created_at = datetime.now().isoformat()
+            self.db_manager.save_chat(
+                chat_id, algorithm, mode, padding, created_at,
+                "waiting_dh", is_creator=True
+            )
+            self.catch_up.add_chat(chat_id)
 
-                self.statusBar().showMessage(f"Chat {chat_id[:8]} created. Waiting for participant...")
+            status_indicator = " [waiting]"
+            list_item_text = f"{chat_id[:8]}... ({algorithm.name}/{mode.name}){status_indicator}"
+            self.chats_list.addItem(list_item_text)
+            item = self.chats_list.item(self.chats_list.count() - 1)
+            item.setData(Qt.UserRole, chat_id)
 
-                self.initiate_diffie_hellman(chat_id, p, g)
+            self.statusBar().showMessage(f"Chat {chat_id[:8]} created. Waiting for participant...")
 
-                self.open_chat_tab(chat_id)
+            await asyncio.gather(self.initiate_diffie_hellman(chat_id, p, g), self.open_chat_tab(chat_id))
 
-            except Exception as e:
-                logger.exception("Failed to create chat:")
-                QMessageBox.critical(self, "Chat Creation Failed",
-                                     f"Error creating chat: {str(e)}\n\n")
-                self.statusBar().showMessage("Chat creation failed.")
+        except Exception as e:
+            logger.exception("Failed to create chat:")
+            show_message_later(QMessageBox.critical, self, "Chat Creation Failed",
+                               f"Error creating chat: {str(e)}\n\n")
+            self.statusBar().showMessage("Chat creation failed.")
 
     def join_chat_dialog(self):
         dialog = JoinChatDialog(self)
@@ -462,76 +670,81 @@ class MainWindow(QMainWindow):
             if not chat_id:
                 QMessageBox.warning(self, "Input Error", "Please enter a valid Chat ID.")
                 return
+            run_async(self.join_chat(chat_id))
 
-            self.statusBar().showMessage(f"Joining chat {chat_id[:8]}...")
-            try:
-                existing_chat = next((c for c in self.db_manager.get_chats() if c['chat_id'] == chat_id), None)
-                if existing_chat:
-                    logger.info(f"Chat {chat_id} already exists locally. Opening tab.")
-                    self.open_chat_tab(chat_id)
-                    self.statusBar().showMessage(f"Opened existing chat {chat_id[:8]}.")
-                    return
+    async def join_chat(self, chat_id: str):
+        self.statusBar().showMessage(f"Joining chat {chat_id[:8]}...")
+        try:
+            existing_chat = next((c for c in self.db_manager.get_chats() if c['chat_id'] == chat_id), None)
+            if existing_chat:
+                logger.info(f"Chat {chat_id} already exists locally. Opening tab.")
+                await self.open_chat_tab(chat_id)
+                self.statusBar().showMessage(f"Opened existing chat {chat_id[:8]}.")
+                return
 
-                response = self.api_client.join_chat(chat_id, self.user_id)
-                dh_params = response.get("dh_params")
-                algorithm = EncryptionAlgorithm[response.get("algorithm")]
+            response = await self.api_client.join_chat(chat_id, self.user_id)
+            dh_params = response.get("dh_params")
+            algorithm = EncryptionAlgorithm[response.get("algorithm")]
 
-                if not dh_params:
-                    dh_params = self.api_client.get_dh_params(chat_id)
+            if not dh_params:
+                dh_params = await self.api_client.get_dh_params(chat_id)
 
-                p = int(dh_params.get('p'))
-                g = int(dh_params.get('g'))
-                logger.info(f"Successfully joined chat {chat_id}. DH params: p={p}, g={g}")
+            p = int(dh_params.get('p'))
+            g = int(dh_params.get('g'))
+            logger.info(f"Successfully joined chat {chat_id}. DH params: p={p}, g={g}")
 
-                created_at = datetime.now().isoformat()
-                self.db_manager.save_chat(
-                    chat_id=chat_id,
-                    algorithm=algorithm,
-                    mode=response.get("encryption_mode"),
-                    padding=response.get("padding_mode"),
-                    created_at=created_at,
-                    status="waiting_dh",
-                    is_creator=False
-                )
+            created_at = datetime.now().isoformat()
+            self.db_manager.save_chat(
+                chat_id=chat_id,
+                algorithm=algorithm,
+                mode=response.get("encryption_mode"),
+                padding=response.get("padding_mode"),
+                created_at=created_at,
+                status="waiting_dh",
+                is_creator=False
+            )
+            # Seqs are per chat, the ones before the join were never meant for this user
+            self.sequence.start_at(chat_id, response.get("start_seq", 0))
+            self.catch_up.add_chat(chat_id)
 
-                self.add_chat_to_list(chat_id, algorithm.name, "waiting_dh")
-                self.statusBar().showMessage(f"Joined chat {chat_id[:8]}. Performing key exchange...")
+            self.add_chat_to_list(chat_id, algorithm.name, "waiting_dh")
+            self.statusBar().showMessage(f"Joined chat {chat_id[:8]}. Performing key exchange...")
 
-                self.initiate_diffie_hellman(chat_id, p, g)
+            await asyncio.gather(self.initiate_diffie_hellman(chat_id, p, g), self.open_chat_tab(chat_id))
 
-                self.open_chat_tab(chat_id)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                show_message_later(QMessageBox.critical, self, "Join Failed",
+                                   f"Chat with ID '{chat_id}' not found or already closed.")
+            elif e.response.status_code == 403:
+                show_message_later(QMessageBox.critical, self, "Join Failed",
+                                   f"Cannot join chat '{chat_id}'. It might be full or you don't have permission.")
+            else:
+                show_message_later(QMessageBox.critical, self, "Join Failed", f"Server error joining chat: {e}")
+            self.statusBar().showMessage("Failed to join chat.")
+        except Exception as e:
+            logger.exception(f"An unexpected error occurred during joining chat {chat_id}:")
+            show_message_later(QMessageBox.critical, self, "Error", f"An unexpected error occurred: {e}")
+            self.statusBar().showMessage("Failed to join chat.")
 
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 404:
-                    QMessageBox.critical(self, "Join Failed", f"Chat with ID '{chat_id}' not found or already closed.")
-                elif e.response.status_code == 403:
-                    QMessageBox.critical(self, "Join Failed",
-                                         f"Cannot join chat '{chat_id}'. It might be full or you don't have permission.")
-                else:
-                    QMessageBox.critical(self, "Join Failed", f"Server error joining chat: {e}")
-                self.statusBar().showMessage("Failed to join chat.")
-            except Exception as e:
-                logger.exception(f"An unexpected error occurred during joining chat {chat_id}:")
-                QMessageBox.critical(self, "Error", f"An unexpected error occurred: {e}")
-                self.statusBar().showMessage("Failed to join chat.")
-
-            except requests.exceptions.HTTPError as e:
-                if e.response.status_code == 404:
-                    QMessageBox.critical(self, "Join Failed", f"Chat with ID '{chat_id}' not found or already closed.")
-                elif e.response.status_code == 403:
-                    QMessageBox.critical(self, "Join Failed",
-                                         f"Cannot join chat '{chat_id}'. It might be full or you don't have permission.")
-                else:
-                    QMessageBox.critical(self, "Join Failed", f"Server error joining chat: {e}")
-                self.statusBar().showMessage("Failed to join chat.")
-            except (requests.exceptions.RequestException, ConnectionError, TimeoutError, ValueError) as e:
-                logger.exception(f"Failed to join chat {chat_id}:")
-                QMessageBox.critical(self, "Join Failed", f"Error joining chat: {e}")
-                self.statusBar().showMessage("Failed to join chat.")
-            except Exception as e:
-                logger.exception(f"An unexpected error occurred during joining chat {chat_id}:")
-                QMessageBox.critical(self, "Error", f"An unexpected error occurred: {e}")
-                self.statusBar().showMessage("Failed to join chat.")
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                show_message_later(QMessageBox.critical, self, "Join Failed",
+                                   f"Chat with ID '{chat_id}' not found or already closed.")
+            elif e.response.status_code == 403:
+                show_message_later(QMessageBox.critical, self, "Join Failed",
+                                   f"Cannot join chat '{chat_id}'. It might be full or you don't have permission.")
+            else:
+                show_message_later(QMessageBox.critical, self, "Join Failed", f"Server error joining chat: {e}")
+            self.statusBar().showMessage("Failed to join chat.")
+        except (httpx.HTTPError, ConnectionError, TimeoutError, ValueError) as e:
+            logger.exception(f"Failed to join chat {chat_id}:")
+            show_message_later(QMessageBox.critical, self, "Join Failed", f"Error joining chat: {e}")
+            self.statusBar().showMessage("Failed to join chat.")
+        except Exception as e:
+            logger.exception(f"An unexpected error occurred during joining chat {chat_id}:")
+            show_message_later(QMessageBox.critical, self, "Error", f"An unexpected error occurred: {e}")
+            self.statusBar().showMessage("Failed to join chat.")
 
     def add_chat_to_list(self, chat_id, algorithm, status):
         list_item_text = f"{chat_id[:8]}... ({algorithm}) [{status}]"
@@ -540,7 +753,7 @@ class MainWindow(QMainWindow):
         item.setData(Qt.UserRole, chat_id)
         logger.info(f"Added chat {chat_id} to list widget.")
 
-    def initiate_diffie_hellman(self, chat_id: str, p: int, g: int):
+    async def initiate_diffie_hellman(self, chat_id: str, p: int, g: int):
         logger.info(f"Initiating Diffie-Hellman key exchange for chat {chat_id}...")
         try:
             private_key = DiffieHellman.generate_private_key(p)
@@ -549,26 +762,32 @@ class MainWindow(QMainWindow):
 
             self.db_manager.save_keys(chat_id, None, p, g, private_key, public_key, None)
 
-            self.api_client.store_public_key(chat_id, self.user_id, public_key)
+            response = await self.api_client.exchange_keys(chat_id, self.user_id, public_key)
             logger.info(f"DH: Sent public key for {chat_id} to server.")
 
-            self.request_participant_key(chat_id, private_key, p)
+            other_public_key = response.get("other_public_key")
+            if other_public_key:
+                other_public_key = int(other_public_key)
+                logger.info(f"DH: Received participant's public key for {chat_id}: {other_public_key}")
+                self.compute_shared_secret(chat_id, private_key, other_public_key, p)
+            else:
+                logger.info(f"DH: Participant's key for {chat_id} not yet available. Waiting for encryption_ready.")
 
-        except (requests.exceptions.RequestException, ConnectionError, TimeoutError, ValueError) as e:
+        except (httpx.HTTPError, ConnectionError, TimeoutError, ValueError) as e:
             logger.exception(f"Diffie-Hellman initiation error for {chat_id}:")
-            QMessageBox.critical(self, "Key Exchange Failed", f"Error during key exchange setup: {e}")
+            show_message_later(QMessageBox.critical, self, "Key Exchange Failed", f"Error during key exchange setup: {e}")
             self.db_manager.update_chat_status(chat_id, "dh_failed")
             self.update_chat_list_item(chat_id, status="dh_failed")
         except Exception as e:
             logger.exception(f"Unexpected DH initiation error for {chat_id}:")
-            QMessageBox.critical(self, "Key Exchange Error", f"An unexpected error occurred: {e}")
+            show_message_later(QMessageBox.critical, self, "Key Exchange Error", f"An unexpected error occurred: {e}")
             self.db_manager.update_chat_status(chat_id, "dh_failed")
             self.update_chat_list_item(chat_id, status="dh_failed")
 
-    def request_participant_key(self, chat_id: str, local_private_key: int, p: int):
+    async def request_participant_key(self, chat_id: str, local_private_key: int, p: int):
         logger.info(f"Requesting participant's public key for chat {chat_id}...")
         try:
-            response = self.api_client.get_participant_key(chat_id, self.user_id)
+            response = await self.api_client.get_participant_key(chat_id, self.user_id)
             other_public_key = response.get("public_key")
 
             if other_public_key:
@@ -578,17 +797,17 @@ class MainWindow(QMainWindow):
             else:
                 logger.info(f"DH: Participant's key for {chat_id} not yet available. Waiting for WebSocket signal.")
 
-        except requests.exceptions.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             if e.response.status_code == 404:
                 logger.info(f"DH: Participant's key for {chat_id} not found via API (expected, waiting for WS).")
             else:
                 logger.error(f"DH: HTTP error getting participant key for {chat_id}: {e}")
-                QMessageBox.warning(self, "Key Exchange", f"Could not get participant key: {e}")
+                show_message_later(QMessageBox.warning, self, "Key Exchange", f"Could not get participant key: {e}")
                 self.db_manager.update_chat_status(chat_id, "dh_failed")
                 self.update_chat_list_item(chat_id, status="dh_failed")
-        except (requests.exceptions.RequestException, ConnectionError, TimeoutError, ValueError) as e:
+        except (httpx.HTTPError, ConnectionError, TimeoutError, ValueError) as e:
             logger.error(f"DH: Error requesting participant key for {chat_id}: {e}")
-            QMessageBox.warning(self, "Key Exchange Error", f"Error getting participant key: {e}")
+            show_message_later(QMessageBox.warning, self, "Key Exchange Error", f"Error getting participant key: {e}")
             self.db_manager.update_chat_status(chat_id, "dh_failed")
             self.update_chat_list_item(chat_id, status="dh_failed")
 
@@ -620,7 +839,7 @@ class MainWindow(QMainWindow):
 
         except Exception as e:
             logger.exception(f"Error computing/saving shared secret for {chat_id}: {e}")
-            QMessageBox.critical(self, "Key Exchange Error", f"Failed to finalize secure connection: {e}")
+            show_message_later(QMessageBox.critical, self, "Key Exchange Error", f"Failed to finalize secure connection: {e}")
             self.db_manager.update_chat_status(chat_id, "dh_failed")
             self.update_chat_list_item(chat_id, status="dh_failed")
 
@@ -644,7 +863,12 @@ class MainWindow(QMainWindow):
             local_private_key = key_data['private_key']
             p = key_data['p']
 
-            self.request_participant_key(chat_id, local_private_key, p)
+            # compute_shared_secret calls back into on_encryption_ready once the key is derived
+            run_async(self.request_participant_key(chat_id, local_private_key, p))
+            return
+
+        if chat_id in self.chat_keys:
+            self.resume_transfers(chat_id)
 
         for i in range(self.chat_tabs.count()):
             widget = self.chat_tabs.widget(i)
@@ -687,28 +911,21 @@ class MainWindow(QMainWindow):
         logger.debug(f"Preparing to send message to chat {chat_id} using {algorithm.name}")
         current_tab.show_progress("Encrypting...")
 
-        self.encryption_worker = EncryptionWorker(
-            crypto_manager=self.crypto_manager,
-            algorithm=algorithm,
-            key=aes_key,
-            data=message_text.encode('utf-8'),
-            mode=mode,
-            padding_mode=padding_mode
+        # Traced under a local id until the server assigns the message_id
+        trace_id = str(uuid.uuid4())
+        tracer.begin_message(trace_id, "out", chat_id)
+
+        data = message_text.encode('utf-8')
+        self.crypto_scheduler.submit(
+            "encrypt", chat_id, algorithm, aes_key, data, mode, padding_mode,
+            priority=PRIORITY_TEXT,
+            trace_id=trace_id,
+            on_result=lambda result: self.on_encryption_complete(chat_id, result, is_file=False,
+                                                                 plain_data=data, trace_id=trace_id),
+            on_error=lambda error: self.on_encryption_error(error, chat_id),
+            on_progress=current_tab.update_progress
         )
 
-        self.encryption_worker.progress.connect(current_tab.update_progress)
-        self.encryption_worker.result.connect(
-            lambda result: self.on_encryption_complete(chat_id, result, is_file=False)
-        )
-        self.encryption_worker.error.connect(
-            lambda error: QMessageBox.critical(self, "Encryption Error", error)
-        )
-        self.encryption_worker.finished.connect(
-            lambda: current_tab.hide_progress() if current_tab else None
-        )
-
-        self.encryption_worker.start()
-
     def attach_file_dialog(self):
         current_tab = self.get_current_chat_tab()
         if not current_tab:
@@ -730,20 +947,10 @@ class MainWindow(QMainWindow):
         if file_path_str:
             file_path = Path(file_path_str)
             if file_path.exists() and file_path.is_file():
-                file_size = file_path.stat().st_size
-                max_size = 10 * 1024 * 1024  # 10 MB
-
-                if file_size == 0:
+                if file_path.stat().st_size == 0:
                     QMessageBox.warning(self, "File Empty", "Cannot send an empty file.")
                     return
 
-                if file_size > max_size:
-                    QMessageBox.warning(
-                        self, "File Too Large",
-                        f"File size ({file_size / 1024 / 1024:.1f} MB) exceeds the limit of {max_size / 1024 / 1024:.0f} MB."
-                    )
-                    return
-
                 self.send_file(file_path)
             else:
                 QMessageBox.warning(self, "File Error", "Selected path is not a valid file.")
@@ -753,89 +960,134 @@ class MainWindow(QMainWindow):
         if not current_tab: return
 
         chat_id = current_tab.chat_id
-        aes_key = self.chat_keys.get(chat_id)
-        if not aes_key: return
+        if chat_id not in self.chat_keys: return
 
         logger.info(f"Preparing to send file: {file_path.name} to chat {chat_id}")
-        current_tab.show_progress(f"Encrypting {file_path.name}...")
+        transfer = new_upload_transfer(chat_id, file_path)
+        self.db_manager.save_transfer(transfer)
 
-        try:
-            with open(file_path, "rb") as f:
-                file_data = f.read()
-        except IOError as e:
-            logger.exception(f"Error reading file {file_path}: {e}")
-            QMessageBox.critical(self, "File Error", f"Could not read file: {e}")
-            current_tab.hide_progress()
-            return
-
-        chat_info = next((c for c in self.db_manager.get_chats() if c['chat_id'] == chat_id), None)
-        if not chat_info:
-            logger.error(f"Cannot send message: Chat info not found for {chat_id}")
-            return
+        self.start_file_upload(transfer, current_tab)
 
-        algorithm = chat_info['algorithm']
-        mode = chat_info['mode']
-        padding_mode = chat_info['padding']
-
-        self.encryption_worker = EncryptionWorker(
-            crypto_manager=self.crypto_manager,
-            algorithm=algorithm,
+    def start_file_upload(self, transfer: dict, target_tab: Optional[ChatTab] = None) -> Optional[FileUploadWorker]:
+        transfer_id = transfer["transfer_id"]
+        chat_id = transfer["chat_id"]
+        aes_key = self.chat_keys.get(chat_id)
+        chat_data = self.db_manager.get_chat_encryption_params(chat_id)
+        if transfer_id in self.file_upload_workers or not aes_key or not chat_data:
+            return None
+
+        worker = FileUploadWorker(
+            crypto_manager=self.crypto_backend,
+            api_client=self.api_client,
+            db_manager=self.db_manager,
+            transfer=transfer,
+            user_id=self.user_id,
+            algorithm=chat_data['algorithm'],
             key=aes_key,
-            data=file_data,
-            mode=mode,
-            padding_mode=padding_mode
-        )
-        self.encryption_worker.progress.connect(current_tab.update_progress)
-        self.encryption_worker.error.connect(self.on_encryption_error)
-        self.encryption_worker.result.connect(
-            lambda result_tuple: self.on_encryption_complete(chat_id, result_tuple, is_file=True,
-                                                             file_name=file_path.name)
+            mode=chat_data['mode'],
+            padding_mode=chat_data['padding']
         )
+        worker.result.connect(lambda result: self.on_file_upload_complete(result, chat_data))
+        worker.finished.connect(lambda: self.file_upload_workers.pop(transfer_id, None))
+        self.file_upload_workers[transfer_id] = worker
 
-        try:
-            self.encryption_worker.finished.disconnect()
-        except TypeError:
-            pass
-        self.encryption_worker.finished.connect(self.on_worker_finished)
+        if target_tab:
+            target_tab.show_progress(f"Sending {transfer['file_name']}...")
+            worker.progress.connect(target_tab.update_progress)
+            worker.error.connect(self.on_encryption_error)
+            worker.finished.connect(self.on_worker_finished)
+        else:
+            worker.error.connect(lambda error_msg: self.statusBar().showMessage(
+                f"Upload of '{transfer['file_name']}' interrupted: {error_msg}", 5000))
+
+        worker.start()
+        return worker
+
+    def resume_transfers(self, chat_id: Optional[str] = None):
+        for transfer in self.db_manager.get_pending_transfers("upload"):
+            if chat_id is None or transfer["chat_id"] == chat_id:
+                if self.start_file_upload(transfer):
+                    logger.info(f"Resuming upload of '{transfer['file_name']}' "
+                                f"at chunk {transfer['acked_chunks']}/{transfer['total_chunks']}")
 
-        self.encryption_worker.start()
+        for transfer in self.db_manager.get_pending_transfers("download"):
+            if chat_id is None or transfer["chat_id"] == chat_id:
+                if transfer["acked_chunks"] >= transfer["total_chunks"]:
+                    self.start_file_assembly(transfer)
+
+    @pyqtSlot(dict)
+    def on_file_upload_complete(self, transfer: dict, chat_data: dict):
+        message_id = transfer["transfer_id"]
+        chat_id = transfer["chat_id"]
+        logger.info(f"File '{transfer['file_name']}' sent to {chat_id} as transfer {message_id}")
+
+        self.db_manager.save_message(
+            message_id, chat_id, self.user_id, transfer["timestamp"],
+            None, f"File: {transfer['file_name']}",
+            None, chat_data['mode'].name, chat_data['padding'].name,
+            is_file=True, file_name=transfer["file_name"], file_path=transfer["file_path"],
+            file_hash=transfer["sha256"], seq=transfer.get("message_seq")
+        )
+        self._message_stored(chat_id, transfer.get("message_seq"))
+
+        target_tab = self.find_chat_tab(chat_id)
+        if target_tab:
+            target_tab.append_message(
+                self.user_id, '', transfer["timestamp"], is_own=True,
+                is_file=True, file_name=transfer["file_name"], file_path=transfer["file_path"],
+                message_id=message_id, file_hash=transfer["sha256"]
+            )
+            target_tab.hide_progress()
 
     @pyqtSlot(str)
-    def on_encryption_error(self, error_message: str):
+    def on_encryption_error(self, error_message: str, chat_id: Optional[str] = None):
+        target_tab = self.find_chat_tab(chat_id) if chat_id else self.get_current_chat_tab()
+        if target_tab:
+            target_tab.hide_progress()
+        if error_message == JOB_CANCELLED:
+            logger.info(f"Encryption cancelled for chat {chat_id}")
+            return
         logger.error(f"Encryption Worker Error: {error_message}")
         QMessageBox.critical(self, "Encryption Error", f"Failed to encrypt data: {error_message}")
-        current_tab = self.get_current_chat_tab()
-        if current_tab:
-            current_tab.hide_progress()
-        self.encryption_worker = None
 
-    @pyqtSlot(tuple)
-    def on_encryption_complete(self, chat_id: str, result_tuple: tuple, is_file: bool, file_name: Optional[str] = None):
+    def on_encryption_complete(self, chat_id: str, result_tuple: tuple, is_file: bool, file_name: Optional[str] = None,
+                               plain_data: Optional[bytes] = None, trace_id: Optional[str] = None):
         encrypted_base64, iv_base64 = result_tuple
         logger.info(f"Encryption complete for chat {chat_id}. Sending {'file' if is_file else 'message'}...")
 
-        current_tab = self.get_current_chat_tab()
-        if not current_tab or current_tab.chat_id != chat_id:
-            logger.warning(f"Encryption completed for chat {chat_id}, but the tab is not active or found.")
+        # Jobs are queued, so the user may have switched tabs since sending
+        current_tab = self.find_chat_tab(chat_id)
+        if not current_tab:
+            logger.warning(f"Encryption completed for chat {chat_id}, but its tab is closed.")
             return
 
         current_tab.update_progress(100)
         current_tab.show_progress("Sending...")
 
+        run_async(self.send_encrypted(current_tab, chat_id, encrypted_base64, iv_base64,
+                                      is_file, file_name, plain_data, trace_id))
+
+    async def send_encrypted(self, current_tab: ChatTab, chat_id: str, encrypted_base64: str, iv_base64: str,
+                             is_file: bool, file_name: Optional[str], plain_data: Optional[bytes],
+                             trace_id: Optional[str] = None):
         try:
             timestamp = datetime.now().isoformat()
-            response = self.api_client.send_message(
-                chat_id=chat_id,
-                user_id=self.user_id,
-                encrypted_message=encrypted_base64,
-                iv_nonce=iv_base64,
-                encryption_mode="CBC",
-                padding_mode="PKCS7",
-                timestamp=timestamp,
-                is_file=is_file,
-                file_name=file_name
-            )
+            with tracer.span("send_message", "net", trace=trace_id, stage="send"):
+                response = await self.api_client.send_message(
+                    chat_id=chat_id,
+                    user_id=self.user_id,
+                    encrypted_message=encrypted_base64,
+                    iv_nonce=iv_base64,
+                    encryption_mode="CBC",
+                    padding_mode="PKCS7",
+                    timestamp=timestamp,
+                    is_file=is_file,
+                    file_name=file_name
+                )
             message_id = response.get("message_id")
+            seq = response.get("seq")
+            if trace_id:
+                tracer.rename_message(trace_id, message_id)
 
             logger.info(f"Message/File sent successfully to {chat_id}. Message ID: {message_id}")
 
@@ -843,41 +1095,42 @@ class MainWindow(QMainWindow):
                 current_tab.append_message(
                     self.user_id, '', timestamp, is_own=True,
                     is_file=True, file_name=file_name, file_path=None,
-                    file_bytes=self.encryption_worker.data
-                )
-                self.db_manager.save_message(
-                    message_id, chat_id, self.user_id, timestamp,
-                    encrypted_base64, f"File: {file_name}",
-                    iv_base64, "CBC", "PKCS7",
-                    is_file=True, file_name=file_name, file_path=None,
-                    file_bytes=self.encryption_worker.data
+                    file_bytes=plain_data, message_id=message_id
                 )
+                with tracer.span("save_message", "db", trace=message_id, stage="persist"):
+                    self.db_manager.save_message(
+                        message_id, chat_id, self.user_id, timestamp,
+                        encrypted_base64, f"File: {file_name}",
+                        iv_base64, "CBC", "PKCS7",
+                        is_file=True, file_name=file_name, file_path=None,
+                        file_bytes=plain_data, seq=seq
+                    )
             else:
-                original_text = self.encryption_worker.data.decode(
-                    'utf-8') if self.encryption_worker else "[Original text not available]"
-                current_tab.append_message(self.user_id, original_text, timestamp, is_own=True)
-                self.db_manager.save_message(
-                    message_id, chat_id, self.user_id, timestamp,
-                    encrypted_base64, original_text,
-                    iv_base64, "CBC", "PKCS7",
-                    is_file=False
-                )
+                original_text = plain_data.decode(
+                    'utf-8') if plain_data is not None else "[Original text not available]"
+                current_tab.append_message(self.user_id, original_text, timestamp, is_own=True,
+                                           message_id=message_id)
+                with tracer.span("save_message", "db", trace=message_id, stage="persist"):
+                    self.db_manager.save_message(
+                        message_id, chat_id, self.user_id, timestamp,
+                        encrypted_base64, original_text,
+                        iv_base64, "CBC", "PKCS7",
+                        is_file=False, seq=seq
+                    )
+            self._message_stored(chat_id, seq)
 
             current_tab.hide_progress()
 
-        except (requests.exceptions.RequestException, ConnectionError, TimeoutError, ValueError) as e:
+        except (httpx.HTTPError, ConnectionError, TimeoutError, ValueError) as e:
             logger.exception(f"Failed to send message/file to chat {chat_id}:")
-            QMessageBox.critical(self, "Send Error", f"Failed to send: {e}")
+            show_message_later(QMessageBox.critical, self, "Send Error", f"Failed to send: {e}")
             current_tab.hide_progress()
         except Exception as e:
             logger.exception(f"Unexpected error sending message/file to {chat_id}:")
-            QMessageBox.critical(self, "Send Error", f"An unexpected error occurred: {e}")
+            show_message_later(QMessageBox.critical, self, "Send Error", f"An unexpected error occurred: {e}")
             current_tab.hide_progress()
-        finally:
-            self.encryption_worker = None
 
-    @pyqtSlot(dict)
-    def handle_incoming_message(self, msg_data: dict):
+    def handle_incoming_message(self, msg_data: dict, record: Optional[dict] = None) -> bool:
         chat_id = msg_data.get("chat_id")
         chat_data = self.db_manager.get_chat_encryption_params(chat_id)
         sender = msg_data.get("sender")
@@ -885,9 +1138,14 @@ class MainWindow(QMainWindow):
         iv_b64 = msg_data.get("iv_nonce")
         timestamp = msg_data.get("timestamp", datetime.now().isoformat())
         message_id = msg_data.get("message_id", str(uuid.uuid4()))
+        seq = msg_data.get("seq")
         encryption_mode = chat_data['mode']
         padding_mode = chat_data['padding']
 
+        if seq is not None and not self.sequence.claim(chat_id, seq):
+            logger.debug(f"Dropping duplicate message {message_id} (seq {seq}) in chat {chat_id}")
+            return False
+
         logger.info(f"Received encrypted message {message_id} from {sender} in chat {chat_id}")
 
         target_tab: Optional[ChatTab] = None
@@ -906,16 +1164,18 @@ class MainWindow(QMainWindow):
             self.db_manager.save_message(
                 message_id, chat_id, 'system', timestamp,
                 encrypted_message_b64, "[Decryption key missing]", iv_b64,
-                encryption_mode.name, padding_mode.name, is_file=False
+                encryption_mode.name, padding_mode.name, is_file=False, seq=seq
             )
+            self._message_stored(chat_id, seq)
             if target_tab:
                 target_tab.append_system_message(
                     "🔒 You were not online during the key exchange for this message, so decryption is not possible.")
-            return
+            return False
 
         if target_tab:
             target_tab.show_progress("Decrypting message...")
 
+        tracer.begin_message(message_id, "in", chat_id)
         decryption_context = {
             "message_id": message_id,
             "chat_id": chat_id,
@@ -925,34 +1185,21 @@ class MainWindow(QMainWindow):
             "iv_b64": iv_b64,
             "encryption_mode": encryption_mode.name,
             "padding_mode": padding_mode.name,
-            "is_file": False
+            "is_file": False,
+            "seq": seq,
+            "record": record
         }
 
-        self.decryption_worker = DecryptionWorker(
-            self.crypto_manager,
-            algorithm=chat_data['algorithm'],
-            key=aes_key,
-            encrypted_data_b64=encrypted_message_b64,
-            iv_b64=iv_b64,
-            mode=encryption_mode,
-            padding_mode=padding_mode
+        self.crypto_scheduler.submit(
+            "decrypt", chat_id, chat_data['algorithm'], aes_key, encrypted_message_b64,
+            encryption_mode, padding_mode,
+            priority=PRIORITY_TEXT,
+            trace_id=message_id,
+            on_result=lambda decrypted_bytes: self.on_decryption_complete(decrypted_bytes, decryption_context),
+            on_error=lambda error_msg: self.on_decryption_error(error_msg, decryption_context),
+            on_progress=target_tab.update_progress if target_tab else None
         )
-
-        self.decryption_worker.result.connect(
-            lambda decrypted_bytes: self.on_decryption_complete(decrypted_bytes, decryption_context)
-        )
-        self.decryption_worker.error.connect(
-            lambda error_msg: self.on_decryption_error(error_msg, decryption_context)
-        )
-        if target_tab:
-            self.decryption_worker.progress.connect(target_tab.update_progress)
-        try:
-            self.decryption_worker.finished.disconnect()
-        except TypeError:
-            pass
-        self.decryption_worker.finished.connect(self.on_worker_finished)
-
-        self.decryption_worker.start()
+        return True
 
     def ask_user_save_path(self, suggested_path: Path, file_name: str) -> Optional[Path]:
         options = QFileDialog.Options()
@@ -965,8 +1212,7 @@ class MainWindow(QMainWindow):
         )
         return Path(save_path_str) if save_path_str else None
 
-    @pyqtSlot(dict)
-    def handle_incoming_file(self, msg_data: dict):
+    def handle_incoming_file(self, msg_data: dict, record: Optional[dict] = None) -> bool:
         chat_id = msg_data.get("chat_id")
         chat_data = self.db_manager.get_chat_encryption_params(chat_id)
         sender = msg_data.get("sender")
@@ -975,9 +1221,14 @@ class MainWindow(QMainWindow):
         iv_b64 = msg_data.get("iv_nonce")
         timestamp = msg_data.get("timestamp", datetime.now().isoformat())
         message_id = msg_data.get("message_id", str(uuid.uuid4()))
+        seq = msg_data.get("seq")
         encryption_mode = chat_data['mode']
         padding_mode = chat_data['padding']
 
+        if seq is not None and not self.sequence.claim(chat_id, seq):
+            logger.debug(f"Dropping duplicate file {message_id} (seq {seq}) in chat {chat_id}")
+            return False
+
         logger.info(f"Received encrypted file '{file_name}' ({message_id}) from {sender} in chat {chat_id}")
 
         target_tab: Optional[ChatTab] = None
@@ -993,12 +1244,13 @@ class MainWindow(QMainWindow):
             self.db_manager.save_message(
                 message_id, chat_id, sender, timestamp,
                 encrypted_file_b64, f"[File: {file_name} - Key missing]", iv_b64,
-                encryption_mode, padding_mode, is_file=True, file_name=file_name
+                encryption_mode, padding_mode, is_file=True, file_name=file_name, seq=seq
             )
+            self._message_stored(chat_id, seq)
             if target_tab:
                 target_tab.append_system_message(
                     f"Error: Received file '{file_name}' but couldn't decrypt (key missing).")
-            return
+            return False
 
         download_dir = Path.home() / "Downloads" / "SecureChat"
         download_dir.mkdir(parents=True, exist_ok=True)
@@ -1006,6 +1258,7 @@ class MainWindow(QMainWindow):
         if target_tab:
             target_tab.show_progress(f"Decrypting {file_name}...")
 
+        tracer.begin_message(message_id, "in", chat_id)
         decryption_context = {
             "message_id": message_id,
             "chat_id": chat_id,
@@ -1017,41 +1270,160 @@ class MainWindow(QMainWindow):
             "padding_mode": padding_mode.name,
             "is_file": True,
             "file_name": file_name,
-            "save_path": None
+            "seq": seq,
+            "save_path": None,
+            "record": record
         }
 
         chat_data = self.db_manager.get_chat_encryption_params(chat_id)
 
-        self.decryption_worker = DecryptionWorker(
-            self.crypto_manager,
+        self.crypto_scheduler.submit(
+            "decrypt", chat_id, chat_data['algorithm'], aes_key, encrypted_file_b64,
+            encryption_mode, padding_mode,
+            priority=file_priority(ciphertext_size(encrypted_file_b64)),
+            trace_id=message_id,
+            on_result=lambda decrypted_bytes: self.on_decryption_complete(decrypted_bytes, decryption_context),
+            on_error=lambda error_msg: self.on_decryption_error(error_msg, decryption_context),
+            on_progress=target_tab.update_progress if target_tab else None
+        )
+        return True
+
+    @pyqtSlot(dict)
+    def handle_incoming_file_chunk(self, chunk: dict):
+        transfer_id = chunk["transfer_id"]
+        files_dir = self.db_manager.db_path.parent / "files"
+        transfer = {
+            "transfer_id": transfer_id,
+            "chat_id": chunk["chat_id"],
+            "direction": "download",
+            "sender": chunk["sender"],
+            "file_name": chunk["file_name"],
+            "file_path": str(files_dir / f"{transfer_id}_{Path(chunk['file_name']).name}"),
+            "file_size": chunk["file_size"],
+            "sha256": chunk["sha256"],
+            "total_chunks": chunk["total_chunks"],
+            "timestamp": chunk["timestamp"],
+            "message_seq": chunk.get("message_seq")
+        }
+        self.db_manager.save_transfer(transfer)
+        if transfer["message_seq"] is not None:
+            # Only the chunk that completed the transfer on the server carries it
+            self.db_manager.set_transfer_message_seq(transfer_id, transfer["message_seq"])
+
+        received = self.db_manager.save_file_chunk(chunk)
+        self.db_manager.update_transfer_progress(transfer_id, received)
+        if received >= chunk["total_chunks"]:
+            transfer["message_seq"] = self.db_manager.get_transfer_message_seq(transfer_id)
+            logger.info(f"All {received} chunks of '{chunk['file_name']}' ({transfer_id}) received")
+            self.start_file_assembly(transfer)
+
+    def start_file_assembly(self, transfer: dict):
+        transfer_id = transfer["transfer_id"]
+        if transfer_id in self.file_assembly_workers:
+            return
+
+        chat_id = transfer["chat_id"]
+        file_name = transfer["file_name"]
+        chat_data = self.db_manager.get_chat_encryption_params(chat_id)
+        aes_key = self.chat_keys.get(chat_id)
+        target_tab = self.find_chat_tab(chat_id)
+        if not aes_key:
+            logger.error(f"Cannot decrypt file {transfer_id} for chat {chat_id}: AES key not found.")
+            self.db_manager.delete_file_chunks(transfer_id)
+            self.db_manager.update_transfer_status(transfer_id, "failed")
+            self.db_manager.save_message(
+                transfer_id, chat_id, transfer["sender"], transfer["timestamp"],
+                None, f"[File: {file_name} - Key missing]", None,
+                chat_data['mode'].name, chat_data['padding'].name, is_file=True, file_name=file_name,
+                seq=transfer.get("message_seq")
+            )
+            self._message_stored(chat_id, transfer.get("message_seq"))
+            if target_tab:
+                target_tab.append_system_message(
+                    f"Error: Received file '{file_name}' but couldn't decrypt (key missing).")
+            return
+
+        target_path = Path(transfer["file_path"])
+        target_path.parent.mkdir(parents=True, exist_ok=True)
+
+        worker = FileAssemblyWorker(
+            self.crypto_backend,
+            self.db_manager,
+            transfer,
             algorithm=chat_data['algorithm'],
             key=aes_key,
-            encrypted_data_b64=encrypted_file_b64,
-            iv_b64=iv_b64,
-            mode=encryption_mode,
-            padding_mode=padding_mode
+            target_path=target_path,
+            mode=chat_data['mode'],
+            padding_mode=chat_data['padding']
         )
+        worker.result.connect(lambda result: self.on_file_assembly_complete(result, chat_data))
+        worker.error.connect(lambda error_msg: self.on_file_assembly_error(error_msg, transfer, chat_data))
+        worker.finished.connect(lambda: self.file_assembly_workers.pop(transfer_id, None))
+        self.file_assembly_workers[transfer_id] = worker
 
-        self.decryption_worker.result.connect(
-            lambda decrypted_bytes: self.on_decryption_complete(decrypted_bytes, decryption_context)
-        )
-        self.decryption_worker.error.connect(
-            lambda error_msg: self.on_decryption_error(error_msg, decryption_context)
+        if target_tab:
+            target_tab.show_progress(f"Decrypting {file_name}...")
+            worker.progress.connect(target_tab.update_progress)
+        worker.start()
+
+    @pyqtSlot(dict)
+    def on_file_assembly_complete(self, transfer: dict, chat_data: dict):
+        transfer_id = transfer["transfer_id"]
+        chat_id = transfer["chat_id"]
+        logger.info(f"File '{transfer['file_name']}' ({transfer_id}) reassembled at {transfer['file_path']}")
+
+        self.db_manager.delete_file_chunks(transfer_id)
+        self.db_manager.update_transfer_status(transfer_id, "completed")
+        self.db_manager.save_message(
+            transfer_id, chat_id, transfer["sender"], transfer["timestamp"],
+            None, f"[Binary data, size: {transfer['file_size']} bytes]", None,
+            chat_data['mode'].name, chat_data['padding'].name,
+            is_file=True, file_name=transfer["file_name"], file_path=transfer["file_path"],
+            file_hash=transfer["sha256"], seq=transfer.get("message_seq")
         )
+        self._message_stored(chat_id, transfer.get("message_seq"))
+
+        target_tab = self.find_chat_tab(chat_id)
         if target_tab:
-            self.decryption_worker.progress.connect(target_tab.update_progress)
-        try:
-            self.decryption_worker.finished.disconnect()
-        except TypeError:
-            pass
-        self.decryption_worker.finished.connect(self.on_worker_finished)
+            target_tab.hide_progress()
+            target_tab.append_message(
+                transfer["sender"], '', transfer["timestamp"], is_own=transfer["sender"] == self.user_id,
+                is_file=True, file_name=transfer["file_name"], file_path=transfer["file_path"],
+                message_id=transfer_id, file_hash=transfer["sha256"]
+            )
 
-        self.decryption_worker.start()
+    @pyqtSlot(str, dict)
+    def on_file_assembly_error(self, error_message: str, transfer: dict, chat_data: dict):
+        transfer_id = transfer["transfer_id"]
+        chat_id = transfer["chat_id"]
+        logger.error(f"Failed to reassemble file {transfer_id} in chat {chat_id}: {error_message}")
+
+        self.db_manager.delete_file_chunks(transfer_id)
+        self.db_manager.update_transfer_status(transfer_id, "failed")
+        self.db_manager.save_message(
+            transfer_id, chat_id, transfer["sender"], transfer["timestamp"],
+            None, f"[File: {transfer['file_name']} - Decryption Error]", None,
+            chat_data['mode'].name, chat_data['padding'].name,
+            is_file=True, file_name=transfer["file_name"], seq=transfer.get("message_seq")
+        )
+        self._message_stored(chat_id, transfer.get("message_seq"))
+
+        target_tab = self.find_chat_tab(chat_id)
+        if target_tab:
+            target_tab.hide_progress()
+            target_tab.append_system_message(f"Error decrypting file '{transfer['file_name']}'.")
 
     @pyqtSlot(str, dict)
     def on_decryption_error(self, error_message: str, context: dict):
         message_id = context["message_id"]
         chat_id = context["chat_id"]
+        if error_message == JOB_CANCELLED:
+            # Leaving or closing, not a broken message: neither stored nor acked, so it is delivered again
+            logger.info(f"Decryption of {message_id} in chat {chat_id} cancelled, leaving it for redelivery")
+            if context.get("seq") is not None:
+                self.sequence.release(chat_id, context["seq"])
+            return
+
         logger.error(f"Decryption Worker Error for message/file {message_id} in chat {chat_id}: {error_message}")
         QMessageBox.critical(self, "Decryption Error", f"Failed to decrypt data: {error_message}")
 
@@ -1071,9 +1443,10 @@ class MainWindow(QMainWindow):
             message_id, chat_id, context["sender"], context["timestamp"],
             context["encrypted_message_b64"], decrypted_placeholder, context["iv_b64"],
             context["encryption_mode"], context["padding_mode"],
-            is_file=context["is_file"], file_name=context.get("file_name")
+            is_file=context["is_file"], file_name=context.get("file_name"), seq=context.get("seq")
         )
-        self.decryption_worker = None
+        self._message_stored(chat_id, context.get("seq"))
+        self.ack_kafka_record(context.get("record"))
 
     @pyqtSlot(bytes, dict)
     def on_decryption_complete(self, decrypted_bytes: bytes, context: dict):
@@ -1119,24 +1492,30 @@ class MainWindow(QMainWindow):
                     target_tab.append_message(
                         context["sender"], decrypted_text, context["timestamp"], is_own=is_own,
                         is_file=True, file_name=context.get("file_name"), file_path=None,
-                        file_bytes=decrypted_bytes  # передаём байты
+                        file_bytes=decrypted_bytes,  # передаём байты
+                        message_id=message_id
                     )
             else:
                 target_tab.append_message(
-                    context["sender"], decrypted_text, context["timestamp"], is_own=is_own
+                    context["sender"], decrypted_text, context["timestamp"], is_own=is_own,
+                    message_id=message_id
                 )
 
-        self.db_manager.save_message(
-            message_id, chat_id, context["sender"], context["timestamp"],
-            context["encrypted_message_b64"],
-            decrypted_text,
-            context["iv_b64"],
-            context["encryption_mode"], context["padding_mode"],
-            is_file=context.get("is_file", False),
-            file_name=context.get("file_name"),
-            file_path=file_save_path,
-            file_bytes=decrypted_bytes
-        )
+        with tracer.span("save_message", "db", trace=message_id, stage="persist"):
+            self.db_manager.save_message(
+                message_id, chat_id, context["sender"], context["timestamp"],
+                context["encrypted_message_b64"],
+                decrypted_text,
+                context["iv_b64"],
+                context["encryption_mode"], context["padding_mode"],
+                is_file=context.get("is_file", False),
+                file_name=context.get("file_name"),
+                file_path=file_save_path,
+                file_bytes=decrypted_bytes,
+                seq=context.get("seq")
+            )
+        self._message_stored(chat_id, context.get("seq"))
+        self.ack_kafka_record(context.get("record"))
 
     def find_chat_tab(self, chat_id: str) -> Optional[ChatTab]:
         for i in range(self.chat_tabs.count()):
@@ -1148,23 +1527,24 @@ class MainWindow(QMainWindow):
     @pyqtSlot()
     def on_worker_finished(self):
         current_tab = self.get_current_chat_tab()
-        if current_tab and (self.encryption_worker or self.decryption_worker):
-            if current_tab.progress_bar.isVisible():
-                logger.warning("Worker finished, hiding progress bar.")
-                current_tab.hide_progress()
-        sender = self.sender()
-        if sender == self.encryption_worker:
-            self.encryption_worker = None
-        elif sender == self.decryption_worker:
-            self.decryption_worker = None
+        if current_tab and current_tab.progress_bar.isVisible() \
+                and not self.crypto_scheduler.has_jobs(current_tab.chat_id):
+            logger.warning("Worker finished, hiding progress bar.")
+            current_tab.hide_progress()
 
     def cancel_current_operation(self):
-        if self.encryption_worker and self.encryption_worker.isRunning():
-            logger.info("Requesting cancellation of encryption worker.")
-            self.encryption_worker.cancel()
-        elif self.decryption_worker and self.decryption_worker.isRunning():
-            logger.info("Requesting cancellation of decryption worker.")
-            self.decryption_worker.cancel()
+        current_tab = self.get_current_chat_tab()
+        if not current_tab:
+            return
+        chat_id = current_tab.chat_id
+        # Only the user's own sends, received messages still have to be decrypted and stored
+        cancelled = self.crypto_scheduler.cancel_chat(chat_id, kind="encrypt")
+        for worker in list(self.file_upload_workers.values()):
+            if worker.transfer["chat_id"] == chat_id and worker.isRunning():
+                worker.cancel()
+                cancelled += 1
+        if cancelled:
+            logger.info(f"Requested cancellation of {cancelled} operations in chat {chat_id}.")
         else:
             logger.debug("No active encryption/decryption operation to cancel.")
 
@@ -1211,37 +1591,40 @@ class MainWindow(QMainWindow):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
 
         if reply == QMessageBox.Yes:
-            logger.info(f"Attempting to leave chat {chat_id}...")
-            self.statusBar().showMessage(f"Leaving chat {chat_id[:8]}...")
-            try:
-                response = self.api_client.leave_chat(chat_id, self.user_id)
+            run_async(self._leave_chat(chat_id))
 
-                if response.get("status") == "leaved" or response.get("message", "").startswith("Successfully left"):
-                    logger.info(f"Successfully left chat {chat_id} via API.")
-                    self.cleanup_after_leave_or_close(chat_id)
-                    QMessageBox.information(self, "Chat Left", f"You have left chat {chat_id[:8]}...")
-                    self.statusBar().showMessage(f"Left chat {chat_id[:8]}.")
+    async def _leave_chat(self, chat_id):
+        logger.info(f"Attempting to leave chat {chat_id}...")
+        self.statusBar().showMessage(f"Leaving chat {chat_id[:8]}...")
+        try:
+            response = await self.api_client.leave_chat(chat_id, self.user_id)
 
-                else:
-                    error_msg = response.get("message", "Unknown reason")
-                    logger.error(f"API indicated failure to leave chat {chat_id}: {error_msg}")
-                    QMessageBox.warning(self, "Leave Failed", f"Could not leave chat: {error_msg}")
-                    self.statusBar().showMessage(f"Failed to leave chat {chat_id[:8]}.")
-
-            except requests.exceptions.HTTPError as e:
-                logger.exception(f"HTTP error leaving chat {chat_id}:")
-                QMessageBox.critical(self, "Leave Failed",
-                                     f"Server error leaving chat: {e.response.status_code} - {e.response.text}")
-                self.statusBar().showMessage(f"Failed to leave chat {chat_id[:8]}.")
-            except (requests.exceptions.RequestException, ConnectionError, TimeoutError) as e:
-                logger.exception(f"Network error leaving chat {chat_id}:")
-                QMessageBox.critical(self, "Leave Failed", f"Network error: {e}")
-                self.statusBar().showMessage(f"Failed to leave chat {chat_id[:8]}.")
-            except Exception as e:
-                logger.exception(f"Unexpected error leaving chat {chat_id}:")
-                QMessageBox.critical(self, "Error", f"An unexpected error occurred: {e}")
+            if response.get("status") == "leaved" or response.get("message", "").startswith("Successfully left"):
+                logger.info(f"Successfully left chat {chat_id} via API.")
+                self.cleanup_after_leave_or_close(chat_id)
+                show_message_later(QMessageBox.information, self, "Chat Left", f"You have left chat {chat_id[:8]}...")
+                self.statusBar().showMessage(f"Left chat {chat_id[:8]}.")
+
+            else:
+                error_msg = response.get("message", "Unknown reason")
+                logger.error(f"API indicated failure to leave chat {chat_id}: {error_msg}")
+                show_message_later(QMessageBox.warning, self, "Leave Failed", f"Could not leave chat: {error_msg}")
                 self.statusBar().showMessage(f"Failed to leave chat {chat_id[:8]}.")
 
+        except httpx.HTTPStatusError as e:
+            logger.exception(f"HTTP error leaving chat {chat_id}:")
+            show_message_later(QMessageBox.critical, self, "Leave Failed",
+                               f"Server error leaving chat: {e.response.status_code} - {e.response.text}")
+            self.statusBar().showMessage(f"Failed to leave chat {chat_id[:8]}.")
+        except (httpx.HTTPError, ConnectionError, TimeoutError) as e:
+            logger.exception(f"Network error leaving chat {chat_id}:")
+            show_message_later(QMessageBox.critical, self, "Leave Failed", f"Network error: {e}")
+            self.statusBar().showMessage(f"Failed to leave chat {chat_id[:8]}.")
+        except Exception as e:
+            logger.exception(f"Unexpected error leaving chat {chat_id}:")
+            show_message_later(QMessageBox.critical, self, "Error", f"An unexpected error occurred: {e}")
+            self.statusBar().showMessage(f"Failed to leave chat {chat_id[:8]}.")
+
     def close_chat(self, chat_id):
         reply = QMessageBox.question(self, 'Close Chat',
                                      f"Are you sure you want to permanently close chat {chat_id[:8]}... for ALL participants?\n"
@@ -1249,47 +1632,50 @@ class MainWindow(QMainWindow):
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
 
         if reply == QMessageBox.Yes:
-            logger.info(f"Attempting to close chat {chat_id} as creator...")
-            self.statusBar().showMessage(f"Closing chat {chat_id[:8]}...")
-            try:
-                response = self.api_client.close_chat(chat_id, self.user_id)
+            run_async(self._close_chat(chat_id))
 
-                if response.get("status") == "closed" or response.get("message", "").startswith("Chat closed"):
-                    logger.info(f"Successfully closed chat {chat_id} via API.")
-                    self.cleanup_after_leave_or_close(chat_id)
-                    QMessageBox.information(self, "Chat Closed", f"Chat {chat_id[:8]}... has been closed.")
-                    self.statusBar().showMessage(f"Closed chat {chat_id[:8]}.")
-                else:
-                    error_msg = response.get("message", "Unknown reason")
-                    logger.error(f"API indicated failure to close chat {chat_id}: {error_msg}")
-                    if "not the creator" in error_msg.lower():
-                        QMessageBox.warning(self, "Close Failed",
-                                            "You are not the creator of this chat and cannot close it.")
-                    else:
-                        QMessageBox.warning(self, "Close Failed", f"Could not close chat: {error_msg}")
-                    self.statusBar().showMessage(f"Failed to close chat {chat_id[:8]}.")
-
-            except requests.exceptions.HTTPError as e:
-                logger.exception(f"HTTP error closing chat {chat_id}:")
-                if e.response.status_code == 403:
-                    QMessageBox.critical(self, "Close Failed",
-                                         "You do not have permission to close this chat (only the creator can).")
-                elif e.response.status_code == 404:
-                    QMessageBox.critical(self, "Close Failed",
-                                         "Chat not found. It might have already been closed or deleted.")
+    async def _close_chat(self, chat_id):
+        logger.info(f"Attempting to close chat {chat_id} as creator...")
+        self.statusBar().showMessage(f"Closing chat {chat_id[:8]}...")
+        try:
+            response = await self.api_client.close_chat(chat_id, self.user_id)
+
+            if response.get("status") == "closed" or response.get("message", "").startswith("Chat closed"):
+                logger.info(f"Successfully closed chat {chat_id} via API.")
+                self.cleanup_after_leave_or_close(chat_id)
+                show_message_later(QMessageBox.information, self, "Chat Closed", f"Chat {chat_id[:8]}... has been closed.")
+                self.statusBar().showMessage(f"Closed chat {chat_id[:8]}.")
+            else:
+                error_msg = response.get("message", "Unknown reason")
+                logger.error(f"API indicated failure to close chat {chat_id}: {error_msg}")
+                if "not the creator" in error_msg.lower():
+                    show_message_later(QMessageBox.warning, self, "Close Failed",
+                                       "You are not the creator of this chat and cannot close it.")
                 else:
-                    QMessageBox.critical(self, "Close Failed",
-                                         f"Server error closing chat: {e.response.status_code} - {e.response.text}")
-                self.statusBar().showMessage(f"Failed to close chat {chat_id[:8]}.")
-            except (requests.exceptions.RequestException, ConnectionError, TimeoutError) as e:
-                logger.exception(f"Network error closing chat {chat_id}:")
-                QMessageBox.critical(self, "Close Failed", f"Network error: {e}")
-                self.statusBar().showMessage(f"Failed to close chat {chat_id[:8]}.")
-            except Exception as e:
-                logger.exception(f"Unexpected error closing chat {chat_id}:")
-                QMessageBox.critical(self, "Error", f"An unexpected error occurred: {e}")
+                    show_message_later(QMessageBox.warning, self, "Close Failed", f"Could not close chat: {error_msg}")
                 self.statusBar().showMessage(f"Failed to close chat {chat_id[:8]}.")
 
+        except httpx.HTTPStatusError as e:
+            logger.exception(f"HTTP error closing chat {chat_id}:")
+            if e.response.status_code == 403:
+                show_message_later(QMessageBox.critical, self, "Close Failed",
+                                   "You do not have permission to close this chat (only the creator can).")
+            elif e.response.status_code == 404:
+                show_message_later(QMessageBox.critical, self, "Close Failed",
+                                   "Chat not found. It might have already been closed or deleted.")
+            else:
+                show_message_later(QMessageBox.critical, self, "Close Failed",
+                                   f"Server error closing chat: {e.response.status_code} - {e.response.text}")
+            self.statusBar().showMessage(f"Failed to close chat {chat_id[:8]}.")
+        except (httpx.HTTPError, ConnectionError, TimeoutError) as e:
+            logger.exception(f"Network error closing chat {chat_id}:")
+            show_message_later(QMessageBox.critical, self, "Close Failed", f"Network error: {e}")
+            self.statusBar().showMessage(f"Failed to close chat {chat_id[:8]}.")
+        except Exception as e:
+            logger.exception(f"Unexpected error closing chat {chat_id}:")
+            show_message_later(QMessageBox.critical, self, "Error", f"An unexpected error occurred: {e}")
+            self.statusBar().showMessage(f"Failed to close chat {chat_id[:8]}.")
+
     def cleanup_after_leave_or_close(self, chat_id):
         logger.debug(f"Performing cleanup for chat {chat_id} after leave/close.")
         self.close_tab_if_open(chat_id)
@@ -1301,6 +1687,9 @@ class MainWindow(QMainWindow):
 
         self.remove_chat_from_list(chat_id)
 
+        self.crypto_scheduler.cancel_chat(chat_id)
+        self.catch_up.remove_chat(chat_id)
+        self.sequence.forget(chat_id)
         self.db_manager.delete_chat(chat_id)
 
         removed_key = self.chat_keys.pop(chat_id, None)
@@ -1360,6 +1749,7 @@ class MainWindow(QMainWindow):
 
     def closeEvent(self, event):
         logger.info("Close event triggered. Cleaning up...")
+        self.session_timer.stop()
 
         if self.kafka_thread:
             self.kafka_worker.stop()
@@ -1367,15 +1757,19 @@ class MainWindow(QMainWindow):
             self.kafka_thread.quit()
             self.kafka_thread.wait()
 
-        if self.encryption_worker and self.encryption_worker.isRunning():
-            logger.info("Stopping active encryption worker...")
-            self.encryption_worker.cancel()
-            self.encryption_worker.wait()
-
-        if self.decryption_worker and self.decryption_worker.isRunning():
-            logger.info("Stopping active decryption worker...")
-            self.decryption_worker.cancel()
-            self.decryption_worker.wait()
+        logger.info("Stopping crypto jobs...")
+        self.crypto_scheduler.shutdown()
+
+        upload_workers = [worker for worker in self.file_upload_workers.values() if worker.isRunning()]
+        for worker in upload_workers:
+            worker.cancel()
+        # Cancelling released their pending requests, so the threads stop without the event loop.
+        # The wait is bounded in case one is still in a retry delay
+        for worker in upload_workers:
+            if not worker.wait(UPLOAD_SHUTDOWN_TIMEOUT_MS):
+                logger.warning(f"Upload {worker.transfer['transfer_id']} still running at shutdown")
+        if self.crypto_process_pool:
+            self.crypto_process_pool.shutdown()
 
         self.db_manager.close_db()
 
@@ -0,0 +1,129 @@
+import mimetypes
+import uuid
+from pathlib import Path
+from typing import List, Optional, Callable
+from datetime import datetime
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+
+MessageRole = Qt.UserRole + 1
+
+def detect_media_kind(file_name: Optional[str]) -> str:
+    mime_type, _ = mimetypes.guess_type(file_name or "")
+    if mime_type is not None and mime_type.startswith("image") and not mime_type.endswith("gif"):
+        return "image"
+    if mime_type is not None and mime_type.endswith("gif"):
+        return "gif"
+    if mime_type == "text/plain":
+        return "text"
+    if mime_type in ("text/markdown", "text/x-markdown") or (file_name or "").lower().endswith(".md"):
+        return "markdown"
+    if mime_type is not None and mime_type.startswith("video"):
+        return "video"
+    return "file"
+
+def format_timestamp(timestamp: str) -> str:
+    try:
+        dt_obj = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        return dt_obj.strftime('%H:%M:%S')
+    except (ValueError, AttributeError):
+        return timestamp
+
+def build_message_entry(sender: str, text: str, timestamp: str, is_own: bool, is_file: bool = False,
+                        file_name: Optional[str] = None, file_bytes: Optional[bytes] = None,
+                        message_id: Optional[str] = None, file_hash: Optional[str] = None,
+                        load_file_bytes: Optional[Callable[[], bytes]] = None) -> dict:
+    has_media = bool(is_file and (file_bytes or load_file_bytes))
+    return {
+        "kind": "message",
+        "key": message_id or str(uuid.uuid4()),
+        "message_id": message_id,
+        "sender": sender,
+        "sender_display": "You" if is_own else f"User_{sender[:6]}...",
+        "text": text,
+        "timestamp": timestamp,
+        "formatted_time": format_timestamp(timestamp),
+        "is_own": is_own,
+        "is_file": has_media,
+        "file_name": file_name,
+        "file_bytes": file_bytes if has_media else None,
+        "file_hash": file_hash,
+        "load_file_bytes": load_file_bytes if has_media else None,
+        "media_kind": detect_media_kind(file_name) if has_media else None,
+    }
+
+def load_entry_bytes(entry: dict) -> Optional[bytes]:
+    if entry.get("file_bytes"):
+        return entry["file_bytes"]
+    if entry.get("load_file_bytes"):
+        return entry["load_file_bytes"]()
+    return None
+
+def read_file(path: str) -> Optional[bytes]:
+    try:
+        return Path(path).read_bytes()
+    except OSError:
+        return None
+
+def build_system_entry(text: str) -> dict:
+    return {
+        "kind": "system",
+        "key": str(uuid.uuid4()),
+        "message_id": None,
+        "text": text,
+    }
+
+
+class MessageListModel(QAbstractListModel):
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._entries: List[dict] = []
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._entries)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._entries):
+            return None
+        entry = self._entries[index.row()]
+        if role == MessageRole:
+            return entry
+        if role == Qt.DisplayRole:
+            return entry.get("text")
+        return None
+
+    def entry(self, row: int) -> Optional[dict]:
+        if 0 <= row < len(self._entries):
+            return self._entries[row]
+        return None
+
+    def row_for_key(self, key: str) -> int:
+        for row, entry in enumerate(self._entries):
+            if entry["key"] == key:
+                return row
+        return -1
+
+    def first_message_entry(self) -> Optional[dict]:
+        return next((e for e in self._entries if e["kind"] == "message" and e.get("message_id")), None)
+
+    def append_entries(self, entries: List[dict]):
+        if not entries:
+            return
+        first = len(self._entries)
+        self.beginInsertRows(QModelIndex(), first, first + len(entries) - 1)
+        self._entries.extend(entries)
+        self.endInsertRows()
+
+    def prepend_entries(self, entries: List[dict]):
+        if not entries:
+            return
+        self.beginInsertRows(QModelIndex(), 0, len(entries) - 1)
+        self._entries[0:0] = entries
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._entries.clear()
+        self.endResetModel()
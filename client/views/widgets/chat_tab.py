@@ -1,27 +1,18 @@
 import logging
-import mimetypes
-import tempfile
-import os
-from typing import Optional
-from datetime import datetime
+from functools import partial
+from typing import Optional, List
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout,
                              QHBoxLayout, QPushButton,
                              QTextEdit, QProgressBar,
-                             QMessageBox, QLabel, QFileDialog, QStyle, QScrollArea,
-                             QSlider, QToolButton, QSizePolicy,
-                             QGraphicsView, QGraphicsScene)
-from PyQt5.QtCore import Qt, pyqtSignal, QUrl, QSizeF
-from PyQt5.QtGui import QPixmap, QImage, QFontMetrics, QTextOption
-from PyQt5.QtMultimedia import QMediaPlayer, QMediaContent
-from PyQt5.QtMultimediaWidgets import QGraphicsVideoItem
-
-from views.dialogs.image_preview import ImagePreviewDialog
-from views.dialogs.gif_preview import GifPreviewDialog
-from views.dialogs.text_preview import TextPreviewDialog
-from views.dialogs.markdown_preview import MarkdownPreviewDialog
-from views.labels.clickable_image import ClickableImage
-from views.labels.clickable_label import ClickableLabel
-from views.labels.clickable_gif import ClickableGifLabel
+                             QMessageBox, QFileDialog, QStyle,
+                             QListView, QAbstractItemView)
+from PyQt5.QtCore import Qt, pyqtSignal
+
+from views.models.message_model import (MessageListModel, build_message_entry, build_system_entry,
+                                        load_entry_bytes, read_file)
+from views.delegates.message_delegate import MessageDelegate, GIF_SIZE
+from views.widgets.gif_animator import GifAnimator
+from utils.telemetry import tracer
 
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -33,12 +24,16 @@ class ChatTab(QWidget):
     attach_file_requested = pyqtSignal()
     cancel_operation_requested = pyqtSignal()
     invite_user_requested = pyqtSignal(str)
+    load_older_requested = pyqtSignal()
 
-    def __init__(self, chat_id, user_id, parent=None):
+    def __init__(self, chat_id, user_id, thumbnail_cache, parent=None):
         super().__init__(parent)
         self.chat_id = chat_id
         self.user_id = user_id
+        self.thumbnail_cache = thumbnail_cache
         self.is_encryption_ready = False
+        self.has_more_history = False
+        self._loading_older = False
         self.init_ui()
 
     def init_ui(self):
@@ -47,10 +42,21 @@ class ChatTab(QWidget):
         main_layout.setSpacing(10)
 
         # Messages area with modern styling
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setStyleSheet("""
-            QScrollArea {
+        self.message_model = MessageListModel(self)
+        self.message_view = QListView()
+        self.message_delegate = MessageDelegate(self.message_view, self.thumbnail_cache, self)
+        self.gif_animator = GifAnimator(self.message_view, self.message_model, GIF_SIZE, parent=self)
+        self.message_delegate.gif_animator = self.gif_animator
+        self.message_view.setModel(self.message_model)
+        self.message_view.setItemDelegate(self.message_delegate)
+        self.message_view.setSelectionMode(QAbstractItemView.NoSelection)
+        self.message_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.message_view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.message_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.message_view.setResizeMode(QListView.Adjust)
+        self.message_view.setFocusPolicy(Qt.NoFocus)
+        self.message_view.setStyleSheet("""
+            QListView {
                 background: #1e1e1e;
                 border: 1px solid #333;
                 border-radius: 4px;
@@ -70,13 +76,10 @@ class ChatTab(QWidget):
                 height: 0px;
             }
         """)
-
-        self.scroll_content = QWidget()
-        self.messages_layout = QVBoxLayout(self.scroll_content)
-        self.messages_layout.setContentsMargins(10, 10, 10, 10)
-        self.messages_layout.setSpacing(10)
-        self.messages_layout.addStretch(1)
-        self.scroll_area.setWidget(self.scroll_content)
+        self.message_delegate.save_file_requested.connect(self.save_file)
+        self.message_view.verticalScrollBar().valueChanged.connect(self.on_scroll_changed)
+        self.message_model.rowsInserted.connect(lambda *_: self.gif_animator.refresh())
+        self.thumbnail_cache.thumbnail_ready.connect(self.on_thumbnail_ready)
 
         # Input area with modern styling
         input_container = QWidget()
@@ -200,7 +203,7 @@ class ChatTab(QWidget):
         """)
         self.cancel_button.clicked.connect(self.cancel_operation_requested.emit)
 
-        main_layout.addWidget(self.scroll_area)
+        main_layout.addWidget(self.message_view)
         main_layout.addWidget(input_container)
         main_layout.addWidget(self.progress_bar)
         main_layout.addWidget(self.cancel_button)
@@ -239,396 +242,97 @@ class ChatTab(QWidget):
 
     def append_message(self, sender: str, text: str, timestamp: str, is_own: bool, is_file: bool = False,
                        file_name: Optional[str] = None, file_path: Optional[str] = None,
-                       file_bytes: Optional[bytes] = None):
-        if sender == 'system' and text == '[Decryption key missing]':
-            self.append_system_message(
-                "🔒 You were not online during the key exchange for this message, so decryption is not possible.")
+                       file_bytes: Optional[bytes] = None, message_id: Optional[str] = None,
+                       file_hash: Optional[str] = None):
+        with tracer.span("append_message", "ui", trace=message_id, stage="render"):
+            load_file_bytes = partial(read_file, file_path) if file_path and not file_bytes else None
+            entry = self._build_entry(sender, text, timestamp, is_own, is_file, file_name, file_bytes, message_id,
+                                      file_hash, load_file_bytes)
+            self.message_model.append_entries([entry])
+            self.message_view.scrollToBottom()
+
+    def append_messages(self, messages: List[dict]):
+        entries = [self._build_entry_from_message(msg) for msg in messages]
+        self.message_model.append_entries(entries)
+        self.message_view.scrollToBottom()
+
+    def prepend_messages(self, messages: List[dict]):
+        scroll_bar = self.message_view.verticalScrollBar()
+        distance_from_bottom = scroll_bar.maximum() - scroll_bar.value()
+
+        entries = [self._build_entry_from_message(msg) for msg in messages]
+        self.message_model.prepend_entries(entries)
+
+        self.message_view.doItemsLayout()
+        scroll_bar.setValue(scroll_bar.maximum() - distance_from_bottom)
+        self._loading_older = False
+
+    def set_history_state(self, has_more: bool):
+        self.has_more_history = has_more
+        self._loading_older = False
+
+    def oldest_message_cursor(self) -> Optional[str]:
+        entry = self.message_model.first_message_entry()
+        if entry is None:
+            return None
+        return entry["message_id"]
+
+    def on_scroll_changed(self, value: int):
+        self.gif_animator.refresh()
+        if value != self.message_view.verticalScrollBar().minimum():
             return
-        try:
-            dt_obj = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            formatted_time = dt_obj.strftime('%H:%M:%S')
-        except ValueError:
-            formatted_time = timestamp
-
-        sender_display = "You" if is_own else f"User_{sender[:6]}..."
-
-        bubble = QWidget()
-        bubble.setObjectName("messageBubble")
-
-        # Modern message bubble styling
-        if is_own:
-            bubble.setStyleSheet("""
-                QWidget#messageBubble {
-                    background-color: #2a4a7a;
-                    border-radius: 12px;
-                    border: 1px solid #3a5a8a;
-                    padding: 2px;
-                }
-            """)
-        else:
-            bubble.setStyleSheet("""
-                QWidget#messageBubble {
-                    background-color: #2a2a3a;
-                    border-radius: 12px;
-                    border: 1px solid #383848;
-                    padding: 2px;
-                }
-            """)
-
-        layout = QVBoxLayout(bubble)
-        layout.setContentsMargins(12, 8, 12, 8)
-        layout.setSpacing(6)
-
-        # Header with modern styling
-        header = QLabel(
-            f"<span style='color: #aaaaaa; font-size: 10px; font-weight: 500;'>{sender_display}</span> <span style='color: #888888; font-size: 9px;'>{formatted_time}</span>")
-        header.setStyleSheet("QLabel { background: transparent; }")
-        layout.addWidget(header)
-
-        def add_file_row(handle_file_row_click=None):
-            file_icon = ClickableLabel()
-            file_icon.setPixmap(self.style().standardIcon(QStyle.SP_FileIcon).pixmap(18, 18))
-            file_icon.setStyleSheet("""
-                QLabel { 
-                    background: transparent; 
-                    padding: 2px;
-                }
-            """)
-
-            if handle_file_row_click is not None:
-                file_icon.set_click_handler(lambda event: handle_file_row_click(event))
-
-            file_label = QLabel(
-                f"<span style='color: #dddddd; font-style: italic; font-size: 12px;'>{file_name}</span>")
-            file_label.setStyleSheet("""
-                QLabel { 
-                    background: transparent; 
-                    padding: 2px;
-                }
-            """)
-            file_label.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Fixed)
-            file_label.setMaximumWidth(200)
-            file_label.setWordWrap(False)
-            file_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
-
-            metrics = QFontMetrics(file_label.font())
-            elided_text = metrics.elidedText(file_name, Qt.ElideRight, 200)
-            file_label.setText(
-                f"<span style='color: #dddddd; font-style: italic; font-size: 12px;'>{elided_text}</span>")
-
-            file_row = QHBoxLayout()
-            file_row.setSpacing(6)
-            file_row.addWidget(file_icon)
-            file_row.addWidget(file_label)
-            file_row.setAlignment(Qt.AlignLeft)
-
-            file_row_container = QWidget()
-            file_row_container.setStyleSheet("QWidget { background: transparent; }")
-            file_row_container.setLayout(file_row)
-
-            layout.addWidget(file_row_container)
-
-        def handle_img_file_row_click(event, pixmap):
-            if event.button() == Qt.LeftButton:
-                dialog = ImagePreviewDialog(pixmap)
-                dialog.exec_()
-
-        def handle_gif_file_row_click(event, gif_bytes):
-            if event.button() == Qt.LeftButton:
-                dialog = GifPreviewDialog(gif_bytes)
-                dialog.exec_()
-
-        def handle_txt_file_row_click(event, text, title):
-            if event.button() == Qt.LeftButton:
-                dialog = TextPreviewDialog(text, title)
-                dialog.exec_()
-
-        def handle_md_file_row_click(event, text, title):
-            if event.button() == Qt.LeftButton:
-                dialog = MarkdownPreviewDialog(text, title)
-                dialog.exec_()
-
-        if is_file and file_bytes:
-            mime_type, _ = mimetypes.guess_type(file_name or "")
-            if mime_type is not None and mime_type.startswith("image") and not mime_type.endswith("gif"):
-                image = QImage.fromData(file_bytes)
-                if not image.isNull():
-                    pixmap = QPixmap.fromImage(image)
-                    add_file_row(lambda event: handle_img_file_row_click(event, pixmap))
-                    img_label = ClickableImage(pixmap)
-                    img_label.setStyleSheet("""
-                        QLabel { 
-                            background: transparent; 
-                            border-radius: 6px;
-                            border: 1px solid #444;
-                        }
-                    """)
-                    layout.addWidget(img_label)
-            elif mime_type is not None and mime_type.endswith("gif"):
-                add_file_row(lambda event: handle_gif_file_row_click(event, file_bytes))
-                gif_label = ClickableGifLabel(file_bytes)
-                gif_label.setStyleSheet("""
-                    QLabel { 
-                        background: transparent; 
-                        border-radius: 6px;
-                        border: 1px solid #444;
-                    }
-                """)
-                layout.addWidget(gif_label)
-            elif mime_type == "text/plain":
-                text = file_bytes.decode(errors="ignore")
-                add_file_row(lambda event: handle_txt_file_row_click(event, text, file_name))
-            elif mime_type in ("text/markdown", "text/x-markdown") or (file_name or "").lower().endswith(".md"):
-                md_text = file_bytes.decode(errors="ignore")
-                add_file_row(lambda event: handle_md_file_row_click(event, md_text, file_name))
-            elif mime_type is not None and mime_type.startswith("video"):
-                suffix = os.path.splitext(file_name or '')[-1]
-                temp_video = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-                temp_video.write(file_bytes)
-                temp_video.close()
-
-                add_file_row()
-
-                scene = QGraphicsScene()
-                video_item = QGraphicsVideoItem()
-                video_item.setSize(QSizeF(360, 200))
-
-                scene.addItem(video_item)
-
-                graphics_view = QGraphicsView(scene)
-                graphics_view.setFixedSize(360, 200)
-                graphics_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-                graphics_view.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-                graphics_view.setStyleSheet("""
-                    QGraphicsView { 
-                        background: transparent; 
-                        border: none; 
-                        border-radius: 6px;
-                    }
-                """)
-
-                layout.addWidget(graphics_view)
-
-                player = QMediaPlayer()
-                player.setVideoOutput(video_item)
-                player.setMedia(QMediaContent(QUrl.fromLocalFile(temp_video.name)))
-                player.setVolume(50)
-
-                control_panel = QWidget()
-                control_panel.setStyleSheet("""
-                    QWidget { 
-                        background: rgba(0, 0, 0, 0.3); 
-                        border-radius: 6px;
-                    }
-                """)
-                control_layout = QHBoxLayout(control_panel)
-                control_layout.setContentsMargins(6, 4, 6, 4)
-                control_layout.setSpacing(6)
-
-                play_btn = QToolButton()
-                play_btn.setIcon(play_btn.style().standardIcon(QStyle.SP_MediaPlay))
-                play_btn.setStyleSheet("""
-                    QToolButton { 
-                        background: transparent; 
-                        border: none; 
-                        color: #cccccc;
-                        padding: 4px;
-                    }
-                    QToolButton:hover {
-                        color: #ffffff;
-                    }
-                """)
-
-                def toggle_play():
-                    if player.state() == QMediaPlayer.PlayingState:
-                        player.pause()
-                    else:
-                        player.play()
-
-                play_btn.clicked.connect(toggle_play)
-
-                progress_slider = QSlider(Qt.Horizontal)
-                progress_slider.setRange(0, 0)
-                progress_slider.setStyleSheet("""
-                    QSlider::groove:horizontal {
-                        border: none;
-                        height: 3px;
-                        background: #555555;
-                        border-radius: 1px;
-                    }
-                    QSlider::handle:horizontal {
-                        background: #cccccc;
-                        border: none;
-                        width: 10px;
-                        height: 10px;
-                        border-radius: 5px;
-                        margin: -4px 0;
-                    }
-                    QSlider::sub-page:horizontal {
-                        background: #888888;
-                        border-radius: 1px;
-                    }
-                """)
-
-                def update_slider(position):
-                    progress_slider.setValue(position)
-
-                def update_duration(duration):
-                    progress_slider.setRange(0, duration)
-
-                def set_position(position):
-                    player.setPosition(position)
-
-                player.positionChanged.connect(update_slider)
-                player.durationChanged.connect(update_duration)
-                progress_slider.sliderMoved.connect(set_position)
-
-                volume_slider = QSlider(Qt.Horizontal)
-                volume_slider.setRange(0, 100)
-                volume_slider.setValue(50)
-                volume_slider.setFixedWidth(80)
-                volume_slider.setStyleSheet("""
-                    QSlider::groove:horizontal {
-                        border: none;
-                        height: 3px;
-                        background: #555555;
-                        border-radius: 1px;
-                    }
-                    QSlider::handle:horizontal {
-                        background: #cccccc;
-                        border: none;
-                        width: 8px;
-                        height: 8px;
-                        border-radius: 4px;
-                        margin: -3px 0;
-                    }
-                    QSlider::sub-page:horizontal {
-                        background: #888888;
-                        border-radius: 1px;
-                    }
-                """)
-                volume_slider.valueChanged.connect(player.setVolume)
-
-                vol_label = QLabel("Vol:")
-                vol_label.setStyleSheet("""
-                    QLabel { 
-                        color: #cccccc; 
-                        font-size: 10px; 
-                        background: transparent;
-                        padding: 0 4px;
-                    }
-                """)
-
-                control_layout.addWidget(play_btn)
-                control_layout.addWidget(progress_slider)
-                control_layout.addWidget(vol_label)
-                control_layout.addWidget(volume_slider)
-
-                layout.addWidget(control_panel)
-
-                def update_icon(state):
-                    if state == QMediaPlayer.PlayingState:
-                        play_btn.setIcon(play_btn.style().standardIcon(QStyle.SP_MediaPause))
-                    else:
-                        play_btn.setIcon(play_btn.style().standardIcon(QStyle.SP_MediaPlay))
-
-                player.stateChanged.connect(update_icon)
-
-                def handle_media_status(status):
-                    if status == QMediaPlayer.EndOfMedia:
-                        player.pause()
-                        player.setPosition(0)
-                        update_icon(QMediaPlayer.PausedState)
-
-                player.mediaStatusChanged.connect(handle_media_status)
-
-                graphics_view.player = player
-                graphics_view.temp_path = temp_video.name
-
-                player.pause()
-                player.setPosition(0)
-            else:
-                add_file_row()
-
-            save_button = QPushButton("Save File")
-            save_button.setStyleSheet("""
-                QPushButton {
-                    background-color: #3a5a7a;
-                    color: #ffffff;
-                    border: 1px solid #4a6a8a;
-                    border-radius: 8px;
-                    padding: 6px 12px;
-                    font-size: 12px;
-                    min-width: 80px;
-                }
-                QPushButton:hover {
-                    background-color: #4a6a8a;
-                    border-color: #5a7a9a;
-                }
-                QPushButton:pressed {
-                    background-color: #2a4a6a;
-                }
-            """)
-
-            def save_file():
-                path, _ = QFileDialog.getSaveFileName(self, "Save File", file_name or "download")
-                if path:
-                    with open(path, "wb") as f:
-                        f.write(file_bytes)
-
-            save_button.clicked.connect(save_file)
-            layout.addWidget(save_button)
-        else:
-            message_text = QTextEdit()
-            message_text.setReadOnly(True)
-            message_text.setHtml(
-                f"<div style='color: #eeeeee; font-size: 13px; line-height: 1.4;'>"
-                f"{text}"
-                f"</div>"
-            )
-            message_text.setStyleSheet("""
-                QTextEdit {
-                    background: transparent;
-                    border: none;
-                    padding: 0;
-                    font-size: 13px;
-                }
-            """)
-            message_text.setWordWrapMode(QTextOption.WrapAnywhere)
-            message_text.setMaximumWidth(260)
-            message_text.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Minimum)
-
-            document = message_text.document()
-            document.setTextWidth(260)
-            height = document.size().height()
-            message_text.setFixedHeight(int(height + 2))
-
-            layout.addWidget(message_text)
-
-        wrapper = QWidget()
-        wrapper.setStyleSheet("QWidget { background: transparent; }")
-        wrapper_layout = QHBoxLayout(wrapper)
-        wrapper_layout.setContentsMargins(15, 5, 15, 5)
-        wrapper_layout.setAlignment(Qt.AlignRight if is_own else Qt.AlignLeft)
-
-        if is_own:
-            wrapper_layout.addStretch(1)
-            wrapper_layout.addWidget(bubble, 0)
-            wrapper_layout.addSpacing(10)
-        else:
-            wrapper_layout.addSpacing(10)
-            wrapper_layout.addWidget(bubble, 0)
-            wrapper_layout.addStretch(1)
+        if not self.has_more_history or self._loading_older or self.message_model.rowCount() == 0:
+            return
+        self._loading_older = True
+        self.load_older_requested.emit()
 
-        self.messages_layout.insertWidget(self.messages_layout.count() - 1, wrapper)
-        self.scroll_area.verticalScrollBar().setValue(self.scroll_area.verticalScrollBar().maximum())
+    def on_thumbnail_ready(self, key: str):
+        row = self.message_model.row_for_key(key)
+        if row < 0:
+            return
+        self.message_delegate.invalidate(key)
+        self.message_delegate.sizeHintChanged.emit(self.message_model.index(row))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.gif_animator.refresh()
+
+    def hideEvent(self, event):
+        self.gif_animator.stop_all()
+        super().hideEvent(event)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.gif_animator.refresh()
+
+    def _build_entry_from_message(self, msg: dict) -> dict:
+        return self._build_entry(
+            msg['sender'], msg['text'], msg['timestamp'], msg['is_own'],
+            msg.get('is_file', False), msg.get('file_name'), msg.get('file_bytes'), msg.get('message_id'),
+            msg.get('file_hash'), msg.get('load_file_bytes')
+        )
+
+    def _build_entry(self, sender, text, timestamp, is_own, is_file, file_name, file_bytes, message_id,
+                     file_hash=None, load_file_bytes=None) -> dict:
+        if sender == 'system' and text == '[Decryption key missing]':
+            return build_system_entry(
+                "🔒 You were not online during the key exchange for this message, so decryption is not possible.")
+        return build_message_entry(sender, text, timestamp, is_own, is_file, file_name, file_bytes, message_id,
+                                   file_hash, load_file_bytes)
+
+    def save_file(self, entry: dict):
+        path, _ = QFileDialog.getSaveFileName(self, "Save File", entry["file_name"] or "download")
+        if path:
+            file_bytes = load_entry_bytes(entry)
+            if file_bytes is None:
+                QMessageBox.warning(self, "Save File", "File contents are no longer available.")
+                return
+            with open(path, "wb") as f:
+                f.write(file_bytes)
 
     def append_system_message(self, text: str):
-        label = QLabel(f"<div style='text-align:center; color: #aaaaaa; font-size: 11px;'><i>{text}</i></div>")
-        label.setTextFormat(Qt.RichText)
-        label.setAlignment(Qt.AlignCenter)
-        self.messages_layout.insertWidget(self.messages_layout.count() - 1, label)
-        self.scroll_area.verticalScrollBar().setValue(self.scroll_area.verticalScrollBar().maximum())
+        self.message_model.append_entries([build_system_entry(text)])
+        self.message_view.scrollToBottom()
 
     def show_progress(self, title="Processing..."):
         self.progress_bar.setFormat(f"{title} - %p%")
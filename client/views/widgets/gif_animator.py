@@ -0,0 +1,86 @@
+from typing import Optional
+from PyQt5.QtCore import QObject, QPoint, QBuffer, QByteArray, QIODevice, QSize
+from PyQt5.QtGui import QMovie, QPixmap
+
+from views.models.message_model import load_entry_bytes
+
+class GifAnimator(QObject):
+
+    def __init__(self, view, model, frame_size: QSize, max_active: int = 4, parent=None):
+        super().__init__(parent)
+        self.view = view
+        self.model = model
+        self.frame_size = frame_size
+        self.max_active = max_active
+        self.enabled = True
+        self._movies = {}
+
+    def current_pixmap(self, key: str) -> Optional[QPixmap]:
+        playing = self._movies.get(key)
+        if playing is None:
+            return None
+        pixmap = playing[0].currentPixmap()
+        return None if pixmap.isNull() else pixmap
+
+    def refresh(self):
+        visible = self._visible_gif_entries() if self.enabled else {}
+
+        for key in list(self._movies):
+            if key not in visible:
+                self._stop(key)
+
+        for key, entry in visible.items():
+            if key not in self._movies and len(self._movies) < self.max_active:
+                self._start(entry)
+
+    def stop_all(self):
+        for key in list(self._movies):
+            self._stop(key)
+
+    def _visible_gif_entries(self) -> dict:
+        row_count = self.model.rowCount()
+        if row_count == 0 or not self.view.isVisible():
+            return {}
+
+        viewport = self.view.viewport()
+        first = self.view.indexAt(QPoint(0, 0)).row()
+        last = self.view.indexAt(QPoint(0, viewport.height() - 1)).row()
+        first = 0 if first < 0 else first
+        last = row_count - 1 if last < 0 else last
+
+        visible = {}
+        for row in range(first, last + 1):
+            entry = self.model.entry(row)
+            if entry and entry["kind"] == "message" and entry["media_kind"] == "gif":
+                visible[entry["key"]] = entry
+        return visible
+
+    def _start(self, entry: dict):
+        gif_bytes = load_entry_bytes(entry)
+        if not gif_bytes:
+            return
+
+        buffer = QBuffer(self)
+        buffer.setData(QByteArray(gif_bytes))
+        buffer.open(QIODevice.ReadOnly)
+
+        movie = QMovie(self)
+        movie.setDevice(buffer)
+        movie.setScaledSize(self.frame_size)
+        key = entry["key"]
+        movie.frameChanged.connect(lambda _frame, key=key: self._on_frame(key))
+
+        self._movies[key] = (movie, buffer)
+        movie.start()
+
+    def _stop(self, key: str):
+        movie, buffer = self._movies.pop(key)
+        movie.stop()
+        movie.deleteLater()
+        buffer.close()
+        buffer.deleteLater()
+
+    def _on_frame(self, key: str):
+        row = self.model.row_for_key(key)
+        if row >= 0:
+            self.view.update(self.model.index(row))
@@ -21,6 +21,10 @@ if config.config_file_name is not None:
 
 from db.base import Base
 from db.models.chat import Chat, Participant
+from db.models.outbox import OutboxEvent
+from db.models.dh_params import DHParamSet
+from db.models.message import Message, FileChunk
+from db.models.rate_limit import RateLimitHit
 target_metadata = Base.metadata
 
 print("\n\n📡 DB URL:", config.get_main_option("sqlalchemy.url"), '\n\n')
@@ -0,0 +1,51 @@
+"""per chat message seq
+
+Revision ID: 4a7c1e8d0b92
+Revises: e27d4b9a6f53
+Create Date: 2026-10-19 19:07:31.640158
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a7c1e8d0b92'
+down_revision: Union[str, None] = 'e27d4b9a6f53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chats', sa.Column('last_seq', sa.BigInteger(), server_default='0', nullable=False))
+
+    # Renumber stored messages 1..n per chat. Going through negative values keeps
+    # the (chat_id, seq) primary key unique while rows are rewritten.
+    op.execute("""
+        UPDATE messages m SET seq = -ranked.rn
+        FROM (
+            SELECT chat_id, seq, row_number() OVER (PARTITION BY chat_id ORDER BY seq) AS rn
+            FROM messages
+        ) ranked
+        WHERE m.chat_id = ranked.chat_id AND m.seq = ranked.seq
+    """)
+    op.execute("UPDATE messages SET seq = -seq")
+    op.execute("""
+        UPDATE chats c SET last_seq = counts.last_seq
+        FROM (SELECT chat_id, MAX(seq) AS last_seq FROM messages GROUP BY chat_id) counts
+        WHERE c.id = counts.chat_id
+    """)
+
+    op.execute("ALTER TABLE messages ALTER COLUMN seq DROP DEFAULT")
+    op.execute("DROP SEQUENCE messages_seq")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("CREATE SEQUENCE messages_seq")
+    op.execute("SELECT setval('messages_seq', COALESCE((SELECT MAX(seq) FROM messages), 0) + 1, false)")
+    op.execute("ALTER TABLE messages ALTER COLUMN seq SET DEFAULT nextval('messages_seq')")
+    op.drop_column('chats', 'last_seq')
@@ -0,0 +1,34 @@
+"""rate limit hits
+
+Revision ID: 6e1f3c8a2d57
+Revises: 9d3b7f2e5a14
+Create Date: 2026-10-19 22:04:51.730218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e1f3c8a2d57'
+down_revision: Union[str, None] = '9d3b7f2e5a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'rate_limit_hits',
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('window_start', sa.Float(), nullable=False),
+        sa.Column('hits', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('rate_limit_hits')
@@ -0,0 +1,41 @@
+"""participants indexes
+
+Revision ID: 8b4e6f0d2c17
+Revises: 3f1d2a9c7b41
+Create Date: 2026-10-19 14:02:17.511093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b4e6f0d2c17'
+down_revision: Union[str, None] = '3f1d2a9c7b41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rows duplicated before the constraint existed would make the unique index fail to build
+    op.execute("""
+        DELETE FROM participants a
+        USING participants b
+        WHERE a.chat_id = b.chat_id AND a.user_id = b.user_id AND a.id > b.id
+    """)
+    op.create_index('uq_participants_chat_id_user_id', 'participants', ['chat_id', 'user_id'], unique=True)
+    op.create_index('ix_participants_user_id', 'participants', ['user_id'], unique=False)
+    op.drop_constraint('participants_chat_id_fkey', 'participants', type_='foreignkey')
+    op.create_foreign_key('participants_chat_id_fkey', 'participants', 'chats',
+                          ['chat_id'], ['id'], ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('participants_chat_id_fkey', 'participants', type_='foreignkey')
+    op.create_foreign_key('participants_chat_id_fkey', 'participants', 'chats', ['chat_id'], ['id'])
+    op.drop_index('ix_participants_user_id', table_name='participants')
+    op.drop_index('uq_participants_chat_id_user_id', table_name='participants')
@@ -0,0 +1,47 @@
+"""file transfer history
+
+Revision ID: 9d3b7f2e5a14
+Revises: 4a7c1e8d0b92
+Create Date: 2026-10-19 21:12:08.264517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d3b7f2e5a14'
+down_revision: Union[str, None] = '4a7c1e8d0b92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Added on the partitioned parent, Postgres adds them to every partition
+    op.add_column('messages', sa.Column('transfer_id', sa.String(), nullable=True))
+    op.add_column('messages', sa.Column('sha256', sa.String(), nullable=True))
+    op.add_column('messages', sa.Column('total_chunks', sa.Integer(), nullable=True))
+    op.add_column('messages', sa.Column('file_size', sa.BigInteger(), nullable=True))
+    op.create_table(
+        'file_chunks',
+        sa.Column('chat_id', sa.String(), nullable=False),
+        sa.Column('transfer_id', sa.String(), nullable=False),
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('encrypted_chunk', sa.LargeBinary(), nullable=False),
+        sa.Column('iv_nonce', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['chat_id'], ['chats.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('chat_id', 'transfer_id', 'seq')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('file_chunks')
+    op.drop_column('messages', 'file_size')
+    op.drop_column('messages', 'total_chunks')
+    op.drop_column('messages', 'sha256')
+    op.drop_column('messages', 'transfer_id')
@@ -0,0 +1,34 @@
+"""dh param pool
+
+Revision ID: c5a9e3f1b208
+Revises: 8b4e6f0d2c17
+Create Date: 2026-10-19 16:41:05.227316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a9e3f1b208'
+down_revision: Union[str, None] = '8b4e6f0d2c17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('dh_params',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('p', sa.Numeric(), nullable=False),
+    sa.Column('g', sa.Numeric(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('dh_params')
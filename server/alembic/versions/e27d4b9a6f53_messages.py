@@ -0,0 +1,55 @@
+"""messages
+
+Revision ID: e27d4b9a6f53
+Revises: c5a9e3f1b208
+Create Date: 2026-10-19 18:20:44.903512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e27d4b9a6f53'
+down_revision: Union[str, None] = 'c5a9e3f1b208'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS = 16
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE SEQUENCE messages_seq")
+    op.execute("""
+        CREATE TABLE messages (
+            chat_id VARCHAR NOT NULL REFERENCES chats (id) ON DELETE CASCADE,
+            seq BIGINT NOT NULL DEFAULT nextval('messages_seq'),
+            message_id VARCHAR NOT NULL,
+            sender_id VARCHAR NOT NULL,
+            recipient_id VARCHAR NOT NULL,
+            is_file BOOLEAN NOT NULL,
+            file_name VARCHAR,
+            encrypted_message BYTEA NOT NULL,
+            iv_nonce VARCHAR NOT NULL,
+            sent_at TIMESTAMP NOT NULL,
+            created_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (chat_id, seq)
+        ) PARTITION BY HASH (chat_id)
+    """)
+    for remainder in range(PARTITIONS):
+        op.execute(
+            f"CREATE TABLE messages_p{remainder} PARTITION OF messages "
+            f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})"
+        )
+    op.create_index('uq_messages_chat_id_message_id', 'messages', ['chat_id', 'message_id'], unique=True)
+    # Rows arrive in time order, so a BRIN index prunes time ranges for retention at almost no write cost
+    op.create_index('ix_messages_created_at', 'messages', ['created_at'], postgresql_using='brin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('messages')
+    op.execute("DROP SEQUENCE messages_seq")
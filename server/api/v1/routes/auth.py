@@ -1,18 +1,18 @@
 from fastapi import APIRouter, Depends, status
 from api.v1.schemas.auth import RegisterRequest, LoginRequest
 from services.auth_service import AuthService
+from infrastructure.security.session_tokens import SessionClaims
 from fastapi import APIRouter, Depends
-from dependency_injector.wiring import inject, Provide
 
-from di.container import Container
+from di.dependencies import get_auth_service, get_session_claims, limit_auth_rate
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
-@router.post("/register", status_code=status.HTTP_201_CREATED)
-@inject
+# Only the password endpoints share the per-IP brute-force budget, /refresh needs a valid token anyway
+@router.post("/register", status_code=status.HTTP_201_CREATED, dependencies=[Depends(limit_auth_rate)])
 async def register(
     payload: RegisterRequest,
-    auth_service: AuthService = Depends(Provide[Container.services.provided.auth])
+    auth_service: AuthService = Depends(get_auth_service)
 ):
     user = await auth_service.register(username=payload.username, password=payload.password)
     return {
@@ -21,13 +21,23 @@ async def register(
         "created_at": user.created_at
     }
 
-@router.post("/login")
-@inject
+@router.post("/login", dependencies=[Depends(limit_auth_rate)])
 async def login(
     payload: LoginRequest,
-    auth_service: AuthService = Depends(Provide[Container.services.provided.auth])
+    auth_service: AuthService = Depends(get_auth_service)
 ):
     id = await auth_service.authenticate(username=payload.username, password=payload.password)
     return {
-        "id": id
+        "id": id,
+        **await auth_service.issue_session(id)
+    }
+
+@router.post("/refresh")
+async def refresh(
+    claims: SessionClaims = Depends(get_session_claims),
+    auth_service: AuthService = Depends(get_auth_service)
+):
+    return {
+        "id": claims.user_id,
+        **await auth_service.issue_session(claims.user_id)
     }
@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends
-from dependency_injector.wiring import inject, Provide
 
-from di.container import Container
+from di.dependencies import get_chat_service, get_session_claims, get_session_tokens, ensure_session_user
 from services.chat_service import ChatService
+from infrastructure.security.session_tokens import SessionClaims, SessionTokenSigner
 from api.v1.schemas.chat import (
     JoinChatRequest, JoinChatResponse, 
     CloseChatRequest, CloseChatResponse, 
@@ -14,42 +14,54 @@ from api.v1.schemas.chat import (
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
 @router.post("/create", response_model=CreateChatResponse)
-@inject
 async def create_chat(
     request: CreateChatRequest,
-    chat_service: ChatService = Depends(Provide[Container.services.provided.chat])
+    claims: SessionClaims = Depends(get_session_claims),
+    sessions: SessionTokenSigner = Depends(get_session_tokens),
+    chat_service: ChatService = Depends(get_chat_service)
 ):
-    return await chat_service.create_chat(request)
+    ensure_session_user(claims, request.user_id)
+    response = await chat_service.create_chat(request)
+    # The new membership has to be in the token before the creator can send to the chat
+    response.session_token, response.expires_at = sessions.issue(claims.user_id, claims.chats | {response.chat_id})
+    return response
 
 @router.post("/join", response_model=JoinChatResponse)
-@inject
 async def join_chat(
     request: JoinChatRequest,
-    chat_service: ChatService = Depends(Provide[Container.services.provided.chat])
+    claims: SessionClaims = Depends(get_session_claims),
+    sessions: SessionTokenSigner = Depends(get_session_tokens),
+    chat_service: ChatService = Depends(get_chat_service)
 ):
-    return await chat_service.join_chat(request)
+    ensure_session_user(claims, request.user_id)
+    response = await chat_service.join_chat(request)
+    response.session_token, response.expires_at = sessions.issue(claims.user_id, claims.chats | {response.chat_id})
+    return response
 
 @router.post("/leave", response_model=LeaveChatResponse)
-@inject
 async def leave_chat(
     request: LeaveChatRequest,
-    chat_service: ChatService = Depends(Provide[Container.services.provided.chat])
+    claims: SessionClaims = Depends(get_session_claims),
+    chat_service: ChatService = Depends(get_chat_service)
 ):
+    ensure_session_user(claims, request.user_id)
     return await chat_service.leave_chat(request)
 
 @router.post("/close", response_model=CloseChatResponse)
-@inject
 async def close_chat(
     request: CloseChatRequest,
-    chat_service: ChatService = Depends(Provide[Container.services.provided.chat])
+    claims: SessionClaims = Depends(get_session_claims),
+    chat_service: ChatService = Depends(get_chat_service)
 ):
+    ensure_session_user(claims, request.user_id)
     return await chat_service.close_chat(request)
 
 @router.get("/{chat_id}/{user_id}/encryption_status", response_model=GetChatEncryptionStatusResponse)
-@inject
 async def close_chat(
     chat_id: str,
     user_id: str,
-    chat_service: ChatService = Depends(Provide[Container.services.provided.chat])
+    claims: SessionClaims = Depends(get_session_claims),
+    chat_service: ChatService = Depends(get_chat_service)
 ):
+    ensure_session_user(claims, user_id)
     return await chat_service.get_chat_encryption_status(chat_id, user_id)
@@ -0,0 +1,81 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect, status
+from dependency_injector.wiring import inject, Provide
+
+from di.container import Container
+from infrastructure.messaging.gateway import EventGateway, Subscription, frame
+from infrastructure.security.session_tokens import InvalidSessionToken, SessionTokenSigner
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+@router.websocket("/ws/{user_id}")
+@inject
+async def event_stream(
+    websocket: WebSocket,
+    user_id: str,
+    partition: Optional[int] = None,
+    offset: Optional[int] = None,
+    token: Optional[str] = None,
+    gateway: EventGateway = Depends(Provide[Container.kafka_components.provided.gateway]),
+    sessions: SessionTokenSigner = Depends(Provide[Container.session_tokens]),
+):
+    # Browsers cannot set headers on a WebSocket handshake, so the session token comes in the query
+    try:
+        authorized = token is not None and sessions.verify(token).user_id == user_id
+    except InvalidSessionToken:
+        authorized = False
+    if not authorized:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = gateway.subscribe(user_id)
+    pump = asyncio.create_task(_pump(websocket, gateway, subscription, partition, offset))
+    listener = asyncio.create_task(_wait_disconnect(websocket))
+    try:
+        await asyncio.wait((pump, listener), return_when=asyncio.FIRST_COMPLETED)
+        disconnected = listener.done()
+    finally:
+        gateway.unsubscribe(subscription)
+        for task in (pump, listener):
+            task.cancel()
+        await asyncio.gather(pump, listener, return_exceptions=True)
+
+    if not disconnected:
+        # The gateway dropped this subscriber, the client reconnects with its cursor
+        try:
+            await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        except RuntimeError:
+            pass
+
+async def _pump(websocket: WebSocket, gateway: EventGateway, subscription: Subscription,
+                partition: Optional[int], offset: Optional[int]):
+    await websocket.send_json({
+        "type": "hello",
+        "partition": subscription.partition,
+        "end_offset": gateway.end_offset(subscription.partition)
+    })
+
+    async def send(event_offset: int, value: bytes):
+        await websocket.send_bytes(frame(subscription.partition, event_offset, value))
+
+    last_sent = -1
+    if offset is not None and partition in (None, subscription.partition):
+        last_sent = await gateway.replay(subscription, offset, send)
+
+    while True:
+        item = await subscription.queue.get()
+        if item is None or subscription.closed:
+            return
+        event_offset, value = item
+        if event_offset > last_sent:
+            await send(event_offset, value)
+            last_sent = event_offset
+
+async def _wait_disconnect(websocket: WebSocket):
+    try:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    except WebSocketDisconnect:
+        pass
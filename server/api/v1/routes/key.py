@@ -1,35 +1,54 @@
 from fastapi import APIRouter, Depends
-from dependency_injector.wiring import inject, Provide
 
-from di.container import Container
+from di.dependencies import get_key_service, get_session_claims, ensure_session_user, ensure_chat_member
 from services.key_service import KeyService
-from api.v1.schemas.key import GetDHParamsResponse, StorePublicKeyRequest, StorePublicKeyResponse, GetParticipantKeyResponse
+from infrastructure.security.session_tokens import SessionClaims
+from api.v1.schemas.key import (
+    GetDHParamsResponse, StorePublicKeyRequest, StorePublicKeyResponse, GetParticipantKeyResponse,
+    KeyExchangeRequest, KeyExchangeResponse
+)
 
 router = APIRouter(prefix="/key", tags=["Key"])
 
 @router.get("/{chat_id}/dh_params", response_model=GetDHParamsResponse)
-@inject
 async def get_dh_params(
     chat_id: str,
-    key_service: KeyService = Depends(Provide[Container.services.provided.key])
+    claims: SessionClaims = Depends(get_session_claims),
+    key_service: KeyService = Depends(get_key_service)
 ):
+    ensure_chat_member(claims, chat_id)
     return await key_service.get_chat_dh_params(chat_id)
 
 
 @router.post("/public_key", response_model=StorePublicKeyResponse)
-@inject
 async def store_public_key(
     request: StorePublicKeyRequest,
-    key_service: KeyService = Depends(Provide[Container.services.provided.key])
+    claims: SessionClaims = Depends(get_session_claims),
+    key_service: KeyService = Depends(get_key_service)
 ):
+    ensure_session_user(claims, request.user_id)
+    ensure_chat_member(claims, request.chat_id)
     return await key_service.store_public_key(request)
 
 
+@router.post("/exchange", response_model=KeyExchangeResponse)
+async def exchange_keys(
+    request: KeyExchangeRequest,
+    claims: SessionClaims = Depends(get_session_claims),
+    key_service: KeyService = Depends(get_key_service)
+):
+    ensure_session_user(claims, request.user_id)
+    ensure_chat_member(claims, request.chat_id)
+    return await key_service.exchange_keys(request)
+
+
 @router.get("/{chat_id}/participant_key", response_model=GetParticipantKeyResponse)
-@inject
 async def get_participant_key(
     chat_id: str, 
     user_id: str,
-    key_service: KeyService = Depends(Provide[Container.services.provided.key])
+    claims: SessionClaims = Depends(get_session_claims),
+    key_service: KeyService = Depends(get_key_service)
 ):
+    ensure_session_user(claims, user_id)
+    ensure_chat_member(claims, chat_id)
     return await key_service.get_participant_key(chat_id, user_id)
@@ -1,16 +1,79 @@
-from fastapi import APIRouter, Depends
-from dependency_injector.wiring import inject, Provide
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
 
-from di.container import Container
+from di.dependencies import get_message_service, get_session_claims, ensure_session_user, ensure_chat_member
 from services.message_service import MessageService
-from api.v1.schemas.message import SendMessageRequest, SendMessageResponse
+from infrastructure.security.session_tokens import SessionClaims
+from infrastructure.messaging.envelope import ENVELOPE_CONTENT_TYPE, unpack_event
+from api.v1.schemas.message import (
+    SendMessageRequest, SendMessageResponse,
+    SendFileChunkRequest, SendFileChunkResponse,
+    GetMessageHistoryResponse, GetFileChunksResponse
+)
 
 router = APIRouter(prefix="/message", tags=["Message"])
 
+def negotiated_body(model: type[BaseModel]):
+    async def parse(request: Request) -> BaseModel:
+        content_type = request.headers.get("content-type", "")
+        try:
+            if content_type.startswith(ENVELOPE_CONTENT_TYPE):
+                body = unpack_event(await request.body())
+            elif not content_type or content_type.startswith("application/json"):
+                body = await request.json()
+            else:
+                raise HTTPException(
+                    status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                    detail=f"Expected application/json or {ENVELOPE_CONTENT_TYPE}")
+            return model.model_validate(body)
+        except ValidationError as e:
+            raise RequestValidationError(e.errors())
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Malformed request body")
+    return parse
+
 @router.post("/send", response_model=SendMessageResponse)
-@inject
 async def send_message(
-    request: SendMessageRequest,
-    message_service: MessageService = Depends(Provide[Container.services.provided.message]),
+    request: SendMessageRequest = Depends(negotiated_body(SendMessageRequest)),
+    claims: SessionClaims = Depends(get_session_claims),
+    message_service: MessageService = Depends(get_message_service),
 ):  
+    ensure_session_user(claims, request.user_id)
+    ensure_chat_member(claims, request.chat_id)
     return await message_service.send_message(request)
+
+@router.post("/file/chunk", response_model=SendFileChunkResponse)
+async def send_file_chunk(
+    request: SendFileChunkRequest = Depends(negotiated_body(SendFileChunkRequest)),
+    claims: SessionClaims = Depends(get_session_claims),
+    message_service: MessageService = Depends(get_message_service),
+):
+    ensure_session_user(claims, request.user_id)
+    ensure_chat_member(claims, request.chat_id)
+    return await message_service.send_file_chunk(request)
+
+@router.get("/{chat_id}/history", response_model=GetMessageHistoryResponse)
+async def get_message_history(
+    chat_id: str,
+    after: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    claims: SessionClaims = Depends(get_session_claims),
+    message_service: MessageService = Depends(get_message_service),
+):
+    ensure_chat_member(claims, chat_id)
+    return await message_service.get_history(chat_id, claims.user_id, after, limit)
+
+@router.get("/{chat_id}/transfers/{transfer_id}/chunks", response_model=GetFileChunksResponse)
+async def get_file_chunks(
+    chat_id: str,
+    transfer_id: str,
+    after: int = Query(-1, ge=-1),
+    limit: int = Query(8, ge=1, le=32),
+    claims: SessionClaims = Depends(get_session_claims),
+    message_service: MessageService = Depends(get_message_service),
+):
+    ensure_chat_member(claims, chat_id)
+    return await message_service.get_file_chunks(chat_id, transfer_id, claims.user_id, after, limit)
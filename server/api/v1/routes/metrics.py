@@ -0,0 +1,11 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from infrastructure.metrics.registry import REGISTRY
+
+router = APIRouter(tags=["Metrics"])
+
+# Plain def: in multiprocess mode rendering reads the workers' snapshot files, so it runs in the threadpool
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from enum import Enum
-from typing import Literal
+from typing import Literal, Optional
 
 class Algorithm(str, Enum):
     macguffin = "MACGUFFIN"
@@ -21,6 +21,10 @@ class PaddingMode(str, Enum):
     PKCS7 = "PKCS7"
     ISO_10126 = "ISO_10126"
 
+class DHParams(BaseModel):
+    p: int
+    g: int
+
 class BaseChatActionMeta(BaseModel):
     chat_id: str
     user_id: str
@@ -42,12 +46,20 @@ class CloseChatRequest(BaseChatActionMeta):
 
 class CreateChatResponse(BaseChatActionMeta):
     status: Literal['created'] = Field(default='created')
+    dh_params: Optional[DHParams] = None
+    session_token: Optional[str] = None
+    expires_at: Optional[int] = None
 
 class JoinChatResponse(BaseChatActionMeta):
     status: Literal['joined'] = Field(default='joined')
     algorithm: Algorithm
     encryption_mode: EncryptionMode
     padding_mode: PaddingMode
+    dh_params: Optional[DHParams] = None
+    # Last message seq of the chat before the join, the joiner's history starts after it
+    start_seq: int = 0
+    session_token: Optional[str] = None
+    expires_at: Optional[int] = None
 
 class LeaveChatResponse(BaseChatActionMeta):
     status: Literal['leaved'] = Field(default='leaved')
@@ -19,6 +19,19 @@ class StorePublicKeyResponse(BaseKeyActionMeta):
     other_participant: Optional[str]
     other_public_key: Optional[int]
 
+class KeyExchangeRequest(BaseKeyActionMeta):
+    user_id: str
+    public_key: int
+
+class KeyExchangeResponse(BaseKeyActionMeta):
+    status: Literal['stored'] = Field(default='stored')
+    user_id: str
+    p: int
+    g: int
+    encryption_ready: bool
+    other_participant: Optional[str]
+    other_public_key: Optional[int]
+
 class GetParticipantKeyResponse(BaseKeyActionMeta):
     participant_id: Optional[str]
     public_key: Optional[int]
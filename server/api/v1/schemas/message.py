@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from typing import List, Optional, Literal, Union
 from datetime import datetime
 
 class BaseMessageActionMeta(BaseModel):
@@ -7,7 +7,7 @@ class BaseMessageActionMeta(BaseModel):
     user_id: str
 
 class SendMessageRequest(BaseMessageActionMeta):
-    encrypted_message: str
+    encrypted_message: Union[bytes, str]
     iv_nonce: str
     is_file: bool
     file_name: Optional[str]
@@ -16,3 +16,54 @@ class SendMessageRequest(BaseMessageActionMeta):
 class SendMessageResponse(BaseMessageActionMeta):
     status: Literal['sent'] = Field(default='sent')
     message_id: str
+    seq: int
+
+class SendFileChunkRequest(BaseMessageActionMeta):
+    transfer_id: str
+    seq: int = Field(ge=0)
+    total_chunks: int = Field(gt=0)
+    file_name: str
+    file_size: int = Field(ge=0)
+    sha256: str
+    encrypted_chunk: Union[bytes, str]
+    iv_nonce: str
+    timestamp: datetime
+
+class SendFileChunkResponse(BaseMessageActionMeta):
+    status: Literal['accepted'] = Field(default='accepted')
+    transfer_id: str
+    seq: int
+    message_seq: Optional[int] = None
+
+class HistoryMessage(BaseModel):
+    message_id: str
+    seq: int
+    chat_id: str
+    sender: str
+    recipient: str
+    encrypted_message: str
+    iv_nonce: str
+    is_file: bool
+    file_name: Optional[str]
+    timestamp: datetime
+    transfer_id: Optional[str] = None
+    sha256: Optional[str] = None
+    total_chunks: Optional[int] = None
+    file_size: Optional[int] = None
+
+class GetMessageHistoryResponse(BaseModel):
+    chat_id: str
+    messages: List[HistoryMessage]
+    next_after: int
+    has_more: bool
+
+class FileChunkItem(BaseModel):
+    seq: int
+    encrypted_chunk: str
+    iv_nonce: str
+
+class GetFileChunksResponse(BaseModel):
+    chat_id: str
+    transfer_id: str
+    chunks: List[FileChunkItem]
+    has_more: bool
@@ -6,6 +6,9 @@ from api.v1.routes.chat import router as chat_router
 from api.v1.routes.key import router as key_router
 from api.v1.routes.message import router as message_router
 from api.v1.routes.auth import router as auth_router
+from api.v1.routes.events import router as events_router
+from api.v1.routes.metrics import router as metrics_router
+from infrastructure.metrics.middleware import RequestMetricsMiddleware
 
 app = FastAPI(lifespan=lifespan)
 
@@ -16,11 +19,14 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(RequestMetricsMiddleware)
 
 app.include_router(chat_router)
 app.include_router(key_router)
 app.include_router(message_router)
 app.include_router(auth_router)
+app.include_router(events_router)
+app.include_router(metrics_router)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,150 @@
+"""Concurrent load test against a running chat API.
+
+Usage:
+    pip install httpx
+    python benchmarks/load_test.py --url http://localhost:8000 --scenario chat --concurrency 50 --iterations 500
+
+Run it with different --concurrency values: throughput should keep growing with concurrency until the
+DB pool (DB_POOL_SIZE + DB_MAX_OVERFLOW) or the CPU is saturated, rather than staying flat.
+
+The login scenario runs a login storm on half the workers while the other half poll chat/status.
+Start the server with AUTH_RATE_LIMIT raised above --iterations so the storm reaches bcrypt, then
+compare the chat/status p99 with the status scenario alone: it should stay close, since hashing runs
+on the PASSWORD_HASH_WORKERS pool and overflow is answered with 503 instead of queueing.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from collections import defaultdict
+
+import httpx
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, client: httpx.AsyncClient, name: str, method: str, path: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError:
+            self.errors[name] += 1
+            return None
+        finally:
+            self.latencies[name].append(time.perf_counter() - started)
+
+    def report(self, elapsed: float):
+        total = sum(len(samples) for samples in self.latencies.values())
+        print(f"{total} requests in {elapsed:.2f}s -> {total / elapsed:.1f} req/s")
+        print(f"{'endpoint':<20}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+            print(f"{name:<20}{len(samples):>8}{self.errors[name]:>8}"
+                  f"{statistics.median(ordered) * 1000:>10.1f}{p95 * 1000:>10.1f}{p99 * 1000:>10.1f}")
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def register_user(client: httpx.AsyncClient, stats: Stats) -> dict | None:
+    username = f"bench-{uuid.uuid4().hex[:12]}"
+    credentials = {"username": username, "password": "benchmark-password"}
+    if not await stats.call(client, "register", "POST", "/auth/register", json=credentials):
+        return None
+    session = await stats.call(client, "auth/login", "POST", "/auth/login", json=credentials)
+    return {"id": session["id"], "username": username, "token": session["session_token"]} if session else None
+
+
+async def chat_scenario(client: httpx.AsyncClient, stats: Stats, users: list):
+    creator, joiner = users
+    created = await stats.call(client, "chat/create", "POST", "/chat/create", headers=bearer(creator["token"]), json={
+        "user_id": creator["id"], "algorithm": "SERPENT", "encryption_mode": "CBC", "padding_mode": "PKCS7"
+    })
+    if not created:
+        return
+    chat_id = created["chat_id"]
+    # Tokens returned for this chat are only used within the iteration, so they do not grow with every chat
+    creator_headers = bearer(created["session_token"])
+    joined = await stats.call(client, "chat/join", "POST", "/chat/join", headers=bearer(joiner["token"]),
+                              json={"chat_id": chat_id, "user_id": joiner["id"]})
+    if not joined:
+        return
+    joiner_headers = bearer(joined["session_token"])
+    await asyncio.gather(
+        stats.call(client, "key/exchange", "POST", "/key/exchange", headers=creator_headers,
+                   json={"chat_id": chat_id, "user_id": creator["id"], "public_key": 5}),
+        stats.call(client, "key/exchange", "POST", "/key/exchange", headers=joiner_headers,
+                   json={"chat_id": chat_id, "user_id": joiner["id"], "public_key": 7}),
+    )
+    await stats.call(client, "chat/status", "GET", f"/chat/{chat_id}/{creator['id']}/encryption_status",
+                     headers=creator_headers)
+
+
+async def status_scenario(client: httpx.AsyncClient, stats: Stats, user: dict, chat_id: str):
+    await stats.call(client, "chat/status", "GET", f"/chat/{chat_id}/{user['id']}/encryption_status",
+                     headers=bearer(user["token"]))
+
+
+async def login_scenario(client: httpx.AsyncClient, stats: Stats, username: str):
+    await stats.call(client, "auth/login", "POST", "/auth/login",
+                     json={"username": username, "password": "benchmark-password"})
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=30.0) as client:
+        setup_stats = Stats()
+        users = [await register_user(client, setup_stats) for _ in range(2)]
+        if None in users:
+            raise SystemExit("Could not register benchmark users, is the server running?")
+
+        if args.scenario in ("status", "login"):
+            created = await setup_stats.call(client, "chat/create", "POST", "/chat/create",
+                                             headers=bearer(users[0]["token"]), json={
+                "user_id": users[0]["id"], "algorithm": "SERPENT", "encryption_mode": "CBC", "padding_mode": "PKCS7"
+            })
+            owner = {**users[0], "token": created["session_token"]}
+            status = lambda stats: status_scenario(client, stats, owner, created["chat_id"])
+            iteration = status
+        else:
+            iteration = lambda stats: chat_scenario(client, stats, users)
+
+        stats = Stats()
+        remaining = iter(range(args.iterations))
+
+        async def worker(iteration):
+            for _ in remaining:
+                await iteration(stats)
+
+        if args.scenario == "login":
+            login = lambda stats: login_scenario(client, stats, users[0]["username"])
+            storm = args.concurrency // 2
+            workers = [worker(login) for _ in range(storm)] + [worker(status) for _ in range(args.concurrency - storm)]
+        else:
+            workers = [worker(iteration) for _ in range(args.concurrency)]
+
+        started = time.perf_counter()
+        await asyncio.gather(*workers)
+        stats.report(time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat API load test")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--scenario", choices=["chat", "status", "login"], default="chat")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--iterations", type=int, default=500)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
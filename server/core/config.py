@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field, PostgresDsn
-from typing import List
+from typing import List, Literal
 from functools import lru_cache
 
 class Settings(BaseSettings):
@@ -11,9 +11,55 @@ class Settings(BaseSettings):
     DB_HOST: str
     DB_PORT: int
 
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_ECHO: bool = False
+
     KAFKA_HOST: str
     KAFKA_PORT: int
     KAFKA_TOPIC: str
+    KAFKA_WIRE_FORMAT: Literal['json', 'envelope'] = 'json'
+    KAFKA_PARTITIONS: int = 12
+    KAFKA_LINGER_MS: int = 10
+    KAFKA_MAX_BATCH_SIZE: int = 64 * 1024
+    KAFKA_COMPRESSION: Literal['gzip', 'snappy', 'lz4', 'zstd'] = 'lz4'
+    KAFKA_MAX_IN_FLIGHT: int = 1000
+
+    GATEWAY_REPLAY_BUFFER: int = 256
+    GATEWAY_QUEUE_SIZE: int = 1000
+    GATEWAY_MAX_REPLAY: int = 10_000
+
+    MEMBERSHIP_CACHE_TTL: float = 5.0
+    MEMBERSHIP_CACHE_SIZE: int = 10_000
+
+    # Set by gunicorn.conf.py for the workers it starts
+    WEB_CONCURRENCY: int = 1
+
+    # Threads per worker process; the queue limit is for the whole server
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    AUTH_RATE_LIMIT: int = 10
+    AUTH_RATE_WINDOW: float = 60.0
+
+    SESSION_SECRET: str = ""
+    SESSION_TOKEN_TTL: int = 12 * 3600
+    SESSION_CACHE_SIZE: int = 10_000
+
+    DH_POOL_TARGET_SIZE: int = 32
+    DH_POOL_LOW_WATERMARK: int = 8
+    DH_POOL_REFILL_INTERVAL: float = 5.0
+    DH_PARAM_BITS: int = 64
+
+    SHUTDOWN_DRAIN_TIMEOUT: float = 20.0
+
+    # Shared by the gunicorn workers so /metrics reports all of them, empty keeps metrics per process
+    METRICS_MULTIPROC_DIR: str = ""
+    METRICS_FLUSH_INTERVAL: float = 1.0
+
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_POLL_INTERVAL: float = 0.1
 
     ORIGINS: List[str] = Field(default_factory=lambda: [
         "http://localhost:3000",
@@ -28,6 +74,10 @@ class Settings(BaseSettings):
     def postgres_dsn(self) -> PostgresDsn:
         return f"postgresql+asyncpg://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.POSTGRES_DB}"
 
+    @property
+    def postgres_listen_dsn(self) -> str:
+        return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.POSTGRES_DB}"
+
     @property
     def kafka_bootstrap_servers(self) -> str:
         return f"{self.KAFKA_HOST}:{self.KAFKA_PORT}"
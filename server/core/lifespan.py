@@ -1,7 +1,14 @@
+import time
+import asyncio
+import logging
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 
 from di.container import Container
+from db.session import engine
+from infrastructure.metrics.registry import REGISTRY
+
+logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -10,12 +17,37 @@ async def lifespan(app: FastAPI):
 
     container.init_resources()
 
+    settings = container.config()
+    if settings.METRICS_MULTIPROC_DIR:
+        REGISTRY.enable_multiprocess(settings.METRICS_MULTIPROC_DIR, settings.METRICS_FLUSH_INTERVAL)
     kafka = container.kafka_components()
+    membership_listener = container.membership_listener()
+    dh_param_pool = container.dh_param_pool()
     
     await kafka.producer.start()
+    await kafka.producer.ensure_topic("chat_messages")
+    await kafka.outbox_relay.start()
+    await kafka.gateway.start()
+    await membership_listener.start()
+    await dh_param_pool.start()
 
     yield
 
-    await kafka.producer.stop()
+    # Runs after the server stopped accepting requests, within the worker's graceful timeout
+    started = time.monotonic()
+    deadline = started + settings.SHUTDOWN_DRAIN_TIMEOUT
+    await kafka.gateway.stop()
+    await dh_param_pool.stop()
+    await membership_listener.stop()
+
+    try:
+        await asyncio.wait_for(kafka.outbox_relay.stop(), timeout=max(0.0, deadline - time.monotonic()))
+    except asyncio.TimeoutError:
+        # Undelivered rows stay in the outbox and are relayed by another worker or the next start
+        logger.warning("Outbox relay did not drain before the shutdown deadline")
+    await kafka.producer.stop(timeout=max(0.0, deadline - time.monotonic()))
+    logger.info(f"Drained Kafka producer in {time.monotonic() - started:.2f}s")
 
     container.shutdown_resources()
+    await engine.dispose()
+    REGISTRY.disable_multiprocess()
@@ -1,7 +1,7 @@
 import enum
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, ForeignKey, Numeric
+from sqlalchemy import String, ForeignKey, Numeric, Index, BigInteger
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from db.base import Base
@@ -34,17 +34,23 @@ class Chat(Base):
     status: Mapped[ChatStatus] = mapped_column(default=ChatStatus.waiting)
     p: Mapped[int] = mapped_column(Numeric)
     g: Mapped[int] = mapped_column(Numeric)
+    # Seq of the latest message, bumped under the row lock so per-chat numbering has no gaps
+    last_seq: Mapped[int] = mapped_column(BigInteger, default=0)
     created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
 
     participants: Mapped[list["Participant"]] = relationship(
-        back_populates="chat", cascade="all, delete-orphan"
+        back_populates="chat", cascade="all, delete-orphan", passive_deletes=True
     )
 
 class Participant(Base):
     __tablename__ = "participants"
+    __table_args__ = (
+        Index("uq_participants_chat_id_user_id", "chat_id", "user_id", unique=True),
+        Index("ix_participants_user_id", "user_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    chat_id: Mapped[str] = mapped_column(ForeignKey("chats.id"))
+    chat_id: Mapped[str] = mapped_column(ForeignKey("chats.id", ondelete="CASCADE"))
     user_id: Mapped[str] = mapped_column(ForeignKey("users.id"))
     public_key: Mapped[Optional[int]] = mapped_column(Numeric, nullable=True)
 
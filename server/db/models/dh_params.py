@@ -0,0 +1,13 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, Numeric
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.base import Base
+
+class DHParamSet(Base):
+    __tablename__ = "dh_params"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    p: Mapped[int] = mapped_column(Numeric)
+    g: Mapped[int] = mapped_column(Numeric)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
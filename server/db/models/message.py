@@ -0,0 +1,47 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, BigInteger, LargeBinary, ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.base import Base
+
+class Message(Base):
+    """Ciphertext of a sent message, the server never sees the plaintext.
+
+    Hash-partitioned by chat so a history page reads a single partition through its (chat_id, seq) key.
+    """
+    __tablename__ = "messages"
+    __table_args__ = (
+        Index("uq_messages_chat_id_message_id", "chat_id", "message_id", unique=True),
+        Index("ix_messages_created_at", "created_at", postgresql_using="brin"),
+        {"postgresql_partition_by": "HASH (chat_id)"},
+    )
+
+    chat_id: Mapped[str] = mapped_column(ForeignKey("chats.id", ondelete="CASCADE"), primary_key=True)
+    seq: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    message_id: Mapped[str] = mapped_column(String, nullable=False)
+    sender_id: Mapped[str] = mapped_column(String, nullable=False)
+    recipient_id: Mapped[str] = mapped_column(String, nullable=False)
+    is_file: Mapped[bool] = mapped_column(default=False)
+    file_name: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    encrypted_message: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    iv_nonce: Mapped[str] = mapped_column(String, nullable=False)
+    sent_at: Mapped[datetime]
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
+    # Chunked files: the row is written when the last chunk arrives, the ciphertext is in file_chunks
+    transfer_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    sha256: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    total_chunks: Mapped[Optional[int]] = mapped_column(nullable=True)
+    file_size: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+
+
+class FileChunk(Base):
+    """Ciphertext of one chunk of a file transfer, kept so a client that was offline can fetch the file."""
+    __tablename__ = "file_chunks"
+
+    chat_id: Mapped[str] = mapped_column(ForeignKey("chats.id", ondelete="CASCADE"), primary_key=True)
+    transfer_id: Mapped[str] = mapped_column(String, primary_key=True)
+    seq: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    encrypted_chunk: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    iv_nonce: Mapped[str] = mapped_column(String, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
@@ -0,0 +1,15 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, BigInteger, LargeBinary
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.base import Base
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    topic: Mapped[str] = mapped_column(String, nullable=False)
+    key: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    payload: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(default=datetime.utcnow)
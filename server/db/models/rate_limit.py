@@ -0,0 +1,11 @@
+from sqlalchemy import String, Float
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.base import Base
+
+class RateLimitHit(Base):
+    __tablename__ = "rate_limit_hits"
+
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    window_start: Mapped[float] = mapped_column(Float, nullable=False)
+    hits: Mapped[int] = mapped_column(nullable=False)
@@ -1,11 +1,18 @@
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 
 from core.config import get_settings
+from infrastructure.metrics.db import instrument_engine
 
 settings = get_settings()
 
-engine = create_async_engine(settings.postgres_dsn, echo=True)
+engine = create_async_engine(
+    settings.postgres_dsn,
+    echo=settings.DB_ECHO,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=True
+)
+instrument_engine(engine)
 async_session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
-
-def get_session() -> AsyncSession:
-    return async_session_factory()
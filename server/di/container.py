@@ -2,38 +2,58 @@ from dependency_injector import containers, providers
 
 from core.config import get_settings
 from di.resources import (
-    init_services,
-    init_kafka_components,
-    init_repositories,
+    init_kafka_components, init_password_hasher, init_session_tokens,
+    init_dh_param_pool, init_membership_listener
 )
-from db.session import get_session
+from infrastructure.cache.chat_membership import ChatMembershipCache
+from infrastructure.security.rate_limiter import PostgresRateLimiter
+from db.session import async_session_factory
 
 class Container(containers.DeclarativeContainer):
     wiring_config = containers.WiringConfiguration(
         modules=[
-            "api.v1.routes.chat",
-            "api.v1.routes.key",
-            "api.v1.routes.message",
-            "api.v1.routes.auth"
+            "di.dependencies",
+            "api.v1.routes.events"
         ]
     )
 
     config = providers.Singleton(get_settings)
 
-    db_session = providers.Factory(get_session)
+    membership_cache = providers.Singleton(
+        ChatMembershipCache,
+        ttl=config.provided.MEMBERSHIP_CACHE_TTL,
+        max_size=config.provided.MEMBERSHIP_CACHE_SIZE
+    )
 
-    repositories = providers.Singleton(
-        init_repositories,
-        session=db_session
+    membership_listener = providers.Singleton(
+        init_membership_listener,
+        settings=config,
+        cache=membership_cache
     )
 
-    kafka_components = providers.Resource(
-        init_kafka_components,
+    dh_param_pool = providers.Singleton(
+        init_dh_param_pool,
+        settings=config
+    )
+
+    password_hasher = providers.Resource(
+        init_password_hasher,
+        settings=config
+    )
+
+    session_tokens = providers.Singleton(
+        init_session_tokens,
         settings=config
     )
 
-    services = providers.Singleton(
-        init_services,
-        chat_repository=repositories.provided.chat,
-        producer=kafka_components.provided.producer,
+    auth_rate_limiter = providers.Singleton(
+        PostgresRateLimiter,
+        session_factory=async_session_factory,
+        limit=config.provided.AUTH_RATE_LIMIT,
+        window=config.provided.AUTH_RATE_WINDOW
+    )
+
+    kafka_components = providers.Resource(
+        init_kafka_components,
+        settings=config
     )
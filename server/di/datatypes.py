@@ -1,23 +1,12 @@
 from dataclasses import dataclass
 
-from services.chat_service import ChatService
-from services.message_service import MessageService
-from services.key_service import KeyService
-from services.auth_service import AuthService
-from repositories.chat_repository import ChatRepository
 from infrastructure.messaging.kafka.producer import KafkaEventProducer
-
-@dataclass
-class Repositories:
-    chat: ChatRepository
+from infrastructure.messaging.outbox_relay import OutboxRelay
+from infrastructure.messaging.gateway import EventGateway
 
 @dataclass
 class KafkaComponents:
     producer: KafkaEventProducer
+    outbox_relay: OutboxRelay
+    gateway: EventGateway
 
-@dataclass
-class Services:
-    chat: ChatService
-    message: MessageService
-    key: KeyService
-    auth: AuthService
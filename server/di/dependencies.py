@@ -0,0 +1,138 @@
+from typing import AsyncIterator
+import math
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.ext.asyncio import AsyncSession
+from dependency_injector.wiring import inject, Provide
+
+from di.container import Container
+from db.session import async_session_factory
+from infrastructure.messaging.kafka.producer import KafkaEventProducer
+from infrastructure.cache.chat_membership import ChatMembershipCache
+from infrastructure.dh.param_pool import DHParamPool
+from infrastructure.security.password_hasher import PasswordHasher
+from infrastructure.security.rate_limiter import PostgresRateLimiter
+from infrastructure.security.session_tokens import InvalidSessionToken, SessionClaims, SessionTokenSigner
+from repositories.chat_repository import ChatRepository
+from services.chat_service import ChatService
+from services.message_service import MessageService
+from services.key_service import KeyService
+from services.auth_service import AuthService
+
+async def get_db_session() -> AsyncIterator[AsyncSession]:
+    async with async_session_factory() as session:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+
+def get_chat_repository(session: AsyncSession = Depends(get_db_session)) -> ChatRepository:
+    return ChatRepository(session)
+
+@inject
+def get_producer(
+    producer: KafkaEventProducer = Depends(Provide[Container.kafka_components.provided.producer])
+) -> KafkaEventProducer:
+    return producer
+
+@inject
+def get_membership_cache(
+    cache: ChatMembershipCache = Depends(Provide[Container.membership_cache])
+) -> ChatMembershipCache:
+    return cache
+
+@inject
+def get_dh_param_pool(
+    pool: DHParamPool = Depends(Provide[Container.dh_param_pool])
+) -> DHParamPool:
+    return pool
+
+def get_chat_service(
+    repo: ChatRepository = Depends(get_chat_repository),
+    producer: KafkaEventProducer = Depends(get_producer),
+    membership: ChatMembershipCache = Depends(get_membership_cache),
+    dh_pool: DHParamPool = Depends(get_dh_param_pool)
+) -> ChatService:
+    return ChatService(repo, producer, membership, dh_pool)
+
+def get_message_service(
+    repo: ChatRepository = Depends(get_chat_repository),
+    producer: KafkaEventProducer = Depends(get_producer),
+    membership: ChatMembershipCache = Depends(get_membership_cache)
+) -> MessageService:
+    return MessageService(repo, producer, membership)
+
+def get_key_service(
+    repo: ChatRepository = Depends(get_chat_repository),
+    producer: KafkaEventProducer = Depends(get_producer),
+    membership: ChatMembershipCache = Depends(get_membership_cache)
+) -> KeyService:
+    return KeyService(repo, producer, membership)
+
+@inject
+def get_password_hasher(
+    hasher: PasswordHasher = Depends(Provide[Container.password_hasher])
+) -> PasswordHasher:
+    return hasher
+
+@inject
+def get_session_tokens(
+    sessions: SessionTokenSigner = Depends(Provide[Container.session_tokens])
+) -> SessionTokenSigner:
+    return sessions
+
+def get_auth_service(
+    repo: ChatRepository = Depends(get_chat_repository),
+    hasher: PasswordHasher = Depends(get_password_hasher),
+    sessions: SessionTokenSigner = Depends(get_session_tokens)
+) -> AuthService:
+    return AuthService(repo, hasher, sessions)
+
+bearer_scheme = HTTPBearer(auto_error=False)
+
+def get_session_claims(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+    sessions: SessionTokenSigner = Depends(get_session_tokens)
+) -> SessionClaims:
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Missing session token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    try:
+        return sessions.verify(credentials.credentials)
+    except InvalidSessionToken as e:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail=str(e),
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+def ensure_session_user(claims: SessionClaims, user_id: str):
+    if claims.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Session does not belong to this user"
+        )
+
+@inject
+async def limit_auth_rate(
+    request: Request,
+    limiter: PostgresRateLimiter = Depends(Provide[Container.auth_rate_limiter])
+):
+    retry_after = await limiter.hit(request.client.host if request.client else "unknown")
+    if retry_after is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many authentication attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+
+def ensure_chat_member(claims: SessionClaims, chat_id: str):
+    if not claims.is_member(chat_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not a participant"
+        )
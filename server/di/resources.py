@@ -1,41 +1,79 @@
-from typing import Any
-from sqlalchemy.ext.asyncio import AsyncSession
+import logging
+import secrets
 
 from core.config import Settings
-from di.datatypes import Services, KafkaComponents, Repositories
+from di.datatypes import KafkaComponents
 from infrastructure.messaging.kafka.producer import KafkaEventProducer
-from repositories.chat_repository import ChatRepository
-from services.chat_service import ChatService
-from services.message_service import MessageService
-from services.key_service import KeyService
-from services.auth_service import AuthService
+from infrastructure.messaging.outbox_relay import OutboxRelay
+from infrastructure.messaging.gateway import EventGateway
+from infrastructure.security.password_hasher import PasswordHasher
+from infrastructure.security.session_tokens import SessionTokenSigner
+from infrastructure.dh.param_pool import DHParamPool
+from infrastructure.cache.chat_membership import ChatMembershipCache
+from infrastructure.cache.membership_listener import MembershipInvalidationListener
+from db.session import async_session_factory, engine
 
-def init_repositories(session: AsyncSession) -> Repositories:
-    chat = ChatRepository(session)
-
-    return Repositories(
-        chat=chat
-    )
+logger = logging.getLogger(__name__)
 
 def init_kafka_components(settings: Settings) -> KafkaComponents:
-    producer = KafkaEventProducer(settings.kafka_bootstrap_servers)
+    producer = KafkaEventProducer(
+        settings.kafka_bootstrap_servers,
+        wire_format=settings.KAFKA_WIRE_FORMAT,
+        partitions=settings.KAFKA_PARTITIONS,
+        linger_ms=settings.KAFKA_LINGER_MS,
+        max_batch_size=settings.KAFKA_MAX_BATCH_SIZE,
+        compression_type=settings.KAFKA_COMPRESSION,
+        max_in_flight=settings.KAFKA_MAX_IN_FLIGHT
+    )
 
-    return KafkaComponents(
-        producer=producer
+    outbox_relay = OutboxRelay(
+        async_session_factory,
+        producer,
+        batch_size=settings.OUTBOX_BATCH_SIZE,
+        poll_interval=settings.OUTBOX_POLL_INTERVAL
     )
 
-def init_services(chat_repository: ChatRepository, producer: KafkaEventProducer) -> Services:
-    chat = ChatService(chat_repository, producer)
+    gateway = EventGateway(
+        settings.kafka_bootstrap_servers,
+        "chat_messages",
+        replay_buffer=settings.GATEWAY_REPLAY_BUFFER,
+        queue_size=settings.GATEWAY_QUEUE_SIZE,
+        max_replay=settings.GATEWAY_MAX_REPLAY
+    )
 
-    message = MessageService(chat_repository, producer)
+    return KafkaComponents(
+        producer=producer,
+        outbox_relay=outbox_relay,
+        gateway=gateway
+    )
 
-    key = KeyService(chat_repository, producer)
+def init_password_hasher(settings: Settings):
+    hasher = PasswordHasher(
+        max_workers=settings.PASSWORD_HASH_WORKERS,
+        # The queue is in process memory, the configured total is split between the workers
+        max_queue=max(1, settings.PASSWORD_HASH_MAX_QUEUE // settings.WEB_CONCURRENCY)
+    )
+    yield hasher
+    hasher.shutdown()
 
-    auth = AuthService(chat_repository)
+def init_session_tokens(settings: Settings) -> SessionTokenSigner:
+    secret = settings.SESSION_SECRET
+    if not secret:
+        # Tokens then only verify in this process and stop working after a restart.
+        # gunicorn.conf.py refuses to start several workers like this
+        logger.warning("SESSION_SECRET is not set, using a random per-process secret")
+        secret = secrets.token_urlsafe(32)
+    return SessionTokenSigner(secret, ttl=settings.SESSION_TOKEN_TTL, cache_size=settings.SESSION_CACHE_SIZE)
 
-    return Services(
-        chat=chat,
-        message=message,
-        key=key,
-        auth=auth
+def init_dh_param_pool(settings: Settings) -> DHParamPool:
+    return DHParamPool(
+        engine,
+        async_session_factory,
+        target_size=settings.DH_POOL_TARGET_SIZE,
+        low_watermark=settings.DH_POOL_LOW_WATERMARK,
+        refill_interval=settings.DH_POOL_REFILL_INTERVAL,
+        bits=settings.DH_PARAM_BITS
     )
+
+def init_membership_listener(settings: Settings, cache: ChatMembershipCache) -> MembershipInvalidationListener:
+    return MembershipInvalidationListener(settings.postgres_listen_dsn, cache)
@@ -0,0 +1,44 @@
+import os
+import shutil
+import multiprocessing
+
+from core.config import get_settings
+from infrastructure.metrics.registry import mark_process_dead
+
+# Production run mode: several single-threaded uvicorn workers behind one socket.
+# Each worker owns its event loop, DB pool, Kafka producer and caches; shared state lives in Postgres.
+bind = f"0.0.0.0:{os.environ.get('FASTAPI_PORT', '8000')}"
+# Keep (DB_POOL_SIZE + DB_MAX_OVERFLOW + 1 listener) * workers below Postgres max_connections
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# The workers read it to split server-wide limits kept in process memory, such as the hasher queue
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+# Workers write metric snapshots here and /metrics adds them up. Set before the settings are first
+# read, the workers inherit them
+metrics_dir = os.environ.setdefault("METRICS_MULTIPROC_DIR", "/tmp/securechat-metrics")
+
+# A token signed by one worker has to verify in all the others
+if workers > 1 and not get_settings().SESSION_SECRET:
+    raise RuntimeError("SESSION_SECRET must be set when running more than one worker")
+
+worker_class = "uvicorn.workers.UvicornWorker"
+
+keepalive = 5
+timeout = 60
+# Has to exceed SHUTDOWN_DRAIN_TIMEOUT so the lifespan can flush Kafka before the worker is killed
+graceful_timeout = float(os.environ.get("SHUTDOWN_DRAIN_TIMEOUT", "20")) + 10
+
+max_requests = 10_000
+max_requests_jitter = 1_000
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    # Snapshots of a previous run would be added to the new totals
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+def child_exit(server, worker):
+    mark_process_dead(worker.pid, metrics_dir)
@@ -0,0 +1,61 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from db.models.chat import Chat, ChatStatus
+
+@dataclass(frozen=True)
+class ChatMembership:
+    chat_id: str
+    creator_id: str
+    status: ChatStatus
+    participants: tuple[str, ...]
+
+    @classmethod
+    def from_chat(cls, chat: Chat) -> "ChatMembership":
+        return cls(
+            chat_id=chat.id,
+            creator_id=chat.creator_id,
+            status=chat.status,
+            participants=tuple(p.user_id for p in chat.participants)
+        )
+
+    def other_participants(self, user_id: str) -> list[str]:
+        return [p for p in self.participants if p != user_id]
+
+
+class ChatMembershipCache:
+    """Per-process LRU of chat membership for the message send path.
+
+    Writers in this process invalidate entries after commit and every worker evicts on the
+    Postgres notification sent with the commit; the TTL bounds staleness if a notification is lost.
+    """
+
+    def __init__(self, ttl: float = 5.0, max_size: int = 10_000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[float, ChatMembership]] = OrderedDict()
+
+    def get(self, chat_id: str) -> Optional[ChatMembership]:
+        entry = self._entries.get(chat_id)
+        if entry is None:
+            return None
+        expires_at, membership = entry
+        if expires_at < time.monotonic():
+            del self._entries[chat_id]
+            return None
+        self._entries.move_to_end(chat_id)
+        return membership
+
+    def put(self, membership: ChatMembership):
+        self._entries[membership.chat_id] = (time.monotonic() + self.ttl, membership)
+        self._entries.move_to_end(membership.chat_id)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, chat_id: str):
+        self._entries.pop(chat_id, None)
+
+    def clear(self):
+        self._entries.clear()
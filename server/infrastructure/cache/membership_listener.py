@@ -0,0 +1,53 @@
+import asyncio
+import logging
+import asyncpg
+
+from infrastructure.cache.chat_membership import ChatMembershipCache
+
+logger = logging.getLogger(__name__)
+
+MEMBERSHIP_CHANNEL = "chat_membership"
+
+class MembershipInvalidationListener:
+    """Evicts membership cache entries when any worker commits a change, via Postgres LISTEN/NOTIFY."""
+
+    def __init__(self, dsn: str, cache: ChatMembershipCache, channel: str = MEMBERSHIP_CHANNEL,
+                 reconnect_delay: float = 1.0):
+        self.dsn = dsn
+        self.cache = cache
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def _on_notify(self, connection, pid, channel, chat_id):
+        self.cache.invalidate(chat_id)
+
+    async def _run(self):
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                await connection.add_listener(self.channel, self._on_notify)
+                # Anything committed while we were not listening may be stale
+                self.cache.clear()
+                closed = asyncio.Event()
+                connection.add_termination_listener(lambda _: closed.set())
+                await closed.wait()
+                logger.warning("Membership listener connection closed, reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Membership listener failed: {e}")
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(self.reconnect_delay)
@@ -0,0 +1,104 @@
+import time
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from db.models.dh_params import DHParamSet
+from diffie_hellman.diffie_hellman import DiffieHellman
+from infrastructure.metrics.registry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+GENERATION_DURATION = REGISTRY.histogram(
+    "dh_param_generation_seconds", "DH parameter generation time, including the wait for the generator process",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+POOL_MISSES = REGISTRY.counter("dh_param_pool_misses", "Chats created while the DH parameter pool was empty")
+
+# Only the worker holding this advisory lock refills, so N workers do not all burn CPU on primes
+REFILL_LOCK_KEY = 0x64685f706f6f6c
+
+class DHParamPool:
+    """Keeps a stock of pre-generated DH parameters in Postgres shared by every worker process.
+
+    Chats take a row in their own transaction; generation runs in a separate process so the
+    event loop never executes the prime search.
+    """
+
+    def __init__(self, engine: AsyncEngine, session_factory: async_sessionmaker, target_size: int = 32,
+                 low_watermark: int = 8, refill_interval: float = 5.0, bits: int = 64):
+        self.engine = engine
+        self.session_factory = session_factory
+        self.target_size = target_size
+        self.low_watermark = low_watermark
+        self.refill_interval = refill_interval
+        self.bits = bits
+        self._executor: ProcessPoolExecutor | None = None
+        self._task: asyncio.Task | None = None
+        self._wakeup = asyncio.Event()
+
+    async def start(self):
+        self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def generate(self) -> tuple[int, int]:
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        params = await loop.run_in_executor(self._executor, DiffieHellman.generate_dh_parameters, self.bits)
+        GENERATION_DURATION.observe(time.perf_counter() - started)
+        return params
+
+    def request_refill(self):
+        self._wakeup.set()
+
+    def record_miss(self):
+        POOL_MISSES.inc()
+
+    async def _run(self):
+        while True:
+            try:
+                await self._refill()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"DH param refill failed: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.refill_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _available(self) -> int:
+        async with self.session_factory() as session:
+            return await session.scalar(select(func.count()).select_from(DHParamSet))
+
+    async def _refill(self):
+        if await self._available() >= self.low_watermark:
+            return
+
+        async with self.engine.connect() as conn:
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            if not await conn.scalar(select(func.pg_try_advisory_lock(REFILL_LOCK_KEY))):
+                return
+            try:
+                for _ in range(self.target_size - await self._available()):
+                    p, g = await self.generate()
+                    async with self.session_factory() as session:
+                        session.add(DHParamSet(p=p, g=g))
+                        await session.commit()
+                logger.info(f"Refilled DH param pool to {self.target_size}")
+            finally:
+                await conn.scalar(select(func.pg_advisory_unlock(REFILL_LOCK_KEY)))
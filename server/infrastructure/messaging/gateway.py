@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import struct
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, Set
+from aiokafka import AIOKafkaConsumer, TopicPartition
+
+from infrastructure.messaging.kafka.partitioning import partition_for
+
+logger = logging.getLogger(__name__)
+
+# Every pushed frame is the raw Kafka value prefixed with its partition and offset,
+# which the client hands back as its resume cursor.
+FRAME_HEADER = struct.Struct(">iq")
+
+class Subscription:
+    def __init__(self, user_id: str, partition: int, queue_size: int):
+        self.user_id = user_id
+        self.partition = partition
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+
+    def push(self, offset: int, value: bytes):
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait((offset, value))
+        except asyncio.QueueFull:
+            # A client this far behind resumes from its cursor on reconnect instead of growing memory
+            logger.warning(f"Dropping slow subscriber {self.user_id}")
+            self.closed = True
+
+    def close(self):
+        self.closed = True
+        if not self.queue.full():
+            self.queue.put_nowait(None)
+
+
+class EventGateway:
+    """Consumes a topic once per process and fans events out to connected users by recipient key."""
+
+    def __init__(self, bootstrap_servers: str, topic: str, replay_buffer: int = 256,
+                 queue_size: int = 1000, max_replay: int = 10_000):
+        self.bootstrap_servers = bootstrap_servers
+        self.topic = topic
+        self.replay_buffer = replay_buffer
+        self.queue_size = queue_size
+        self.max_replay = max_replay
+        self._consumer: AIOKafkaConsumer | None = None
+        self._task: asyncio.Task | None = None
+        self._partitions = 0
+        self._positions: Dict[int, int] = {}
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._recent: Dict[str, deque] = {}
+
+    async def start(self):
+        self._consumer = AIOKafkaConsumer(
+            bootstrap_servers=self.bootstrap_servers,
+            group_id=None,
+            enable_auto_commit=False,
+            max_partition_fetch_bytes=4 * 1024 * 1024
+        )
+        await self._consumer.start()
+
+        partitions = self._consumer.partitions_for_topic(self.topic)
+        if not partitions:
+            await self._consumer.topics()
+            partitions = self._consumer.partitions_for_topic(self.topic) or {0}
+        assignment = [TopicPartition(self.topic, partition) for partition in sorted(partitions)]
+        self._partitions = len(assignment)
+        self._consumer.assign(assignment)
+        await self._consumer.seek_to_end(*assignment)
+        for tp in assignment:
+            self._positions[tp.partition] = await self._consumer.position(tp)
+
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Event gateway consuming {self._partitions} partitions of {self.topic}")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._consumer:
+            await self._consumer.stop()
+            self._consumer = None
+        for subscriptions in self._subscriptions.values():
+            for subscription in subscriptions:
+                subscription.close()
+
+    @property
+    def connections(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    def partition_for_user(self, user_id: str) -> int:
+        return partition_for(user_id, self._partitions)
+
+    def end_offset(self, partition: int) -> int:
+        return self._positions.get(partition, 0)
+
+    async def _run(self):
+        while True:
+            try:
+                batches = await self._consumer.getmany(timeout_ms=1000, max_records=500)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Event gateway fetch failed: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            for tp, messages in batches.items():
+                for msg in messages:
+                    self._dispatch(msg.key.decode("utf-8") if msg.key else None, msg.offset, msg.value)
+                if messages:
+                    self._positions[tp.partition] = messages[-1].offset + 1
+
+    def _dispatch(self, user_id: Optional[str], offset: int, value: bytes):
+        if user_id is None:
+            return
+        recent = self._recent.get(user_id)
+        if recent is not None:
+            recent.append((offset, value))
+        for subscription in self._subscriptions.get(user_id, ()):
+            subscription.push(offset, value)
+
+    def subscribe(self, user_id: str) -> Subscription:
+        subscription = Subscription(user_id, self.partition_for_user(user_id), self.queue_size)
+        self._subscriptions.setdefault(user_id, set()).add(subscription)
+        self._recent.setdefault(user_id, deque(maxlen=self.replay_buffer))
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscriptions = self._subscriptions.get(subscription.user_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.user_id]
+            self._recent.pop(subscription.user_id, None)
+
+    async def replay(self, subscription: Subscription, since: int,
+                     send: Callable[[int, bytes], Awaitable[None]]) -> int:
+        """Sends events for the subscriber from `since` up to the live position, returns the last offset sent."""
+        upto = self.end_offset(subscription.partition)
+        if since >= upto:
+            return since - 1
+        if upto - since > self.max_replay:
+            logger.warning(f"User {subscription.user_id} is {upto - since} events behind, "
+                           f"replaying only the last {self.max_replay}")
+            since = upto - self.max_replay
+
+        recent = self._recent.get(subscription.user_id)
+        if recent and recent[0][0] <= since:
+            last_sent = since - 1
+            for offset, value in list(recent):
+                if since <= offset < upto:
+                    await send(offset, value)
+                    last_sent = offset
+            return last_sent
+
+        return await self._replay_from_kafka(subscription, since, upto, send)
+
+    async def _replay_from_kafka(self, subscription: Subscription, since: int, upto: int,
+                                 send: Callable[[int, bytes], Awaitable[None]]) -> int:
+        tp = TopicPartition(self.topic, subscription.partition)
+        consumer = AIOKafkaConsumer(
+            bootstrap_servers=self.bootstrap_servers,
+            group_id=None,
+            enable_auto_commit=False
+        )
+        await consumer.start()
+        last_sent = since - 1
+        try:
+            consumer.assign([tp])
+            consumer.seek(tp, since)
+            position = since
+            while position < upto:
+                batches = await consumer.getmany(tp, timeout_ms=1000, max_records=500)
+                messages = batches.get(tp, [])
+                if not messages:
+                    break
+                for msg in messages:
+                    if msg.offset >= upto:
+                        return last_sent
+                    if msg.key and msg.key.decode("utf-8") == subscription.user_id:
+                        await send(msg.offset, msg.value)
+                        last_sent = msg.offset
+                position = messages[-1].offset + 1
+        finally:
+            await consumer.stop()
+        return last_sent
+
+def frame(partition: int, offset: int, value: bytes) -> bytes:
+    return FRAME_HEADER.pack(partition, offset) + value
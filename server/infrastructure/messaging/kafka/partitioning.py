@@ -0,0 +1,4 @@
+import zlib
+
+def partition_for(key: str, partitions: int) -> int:
+    return zlib.crc32(key.encode("utf-8")) % partitions
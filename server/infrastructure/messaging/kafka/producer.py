@@ -1,25 +1,141 @@
-import json
+import time
+import asyncio
+import logging
+from typing import Iterable, List, Tuple
 from aiokafka import AIOKafkaProducer
+from aiokafka.admin import AIOKafkaAdminClient, NewTopic, NewPartitions
+from aiokafka.errors import TopicAlreadyExistsError
+
+from infrastructure.messaging.envelope import pack_event, dumps_event
+from infrastructure.messaging.kafka.partitioning import partition_for
+from infrastructure.metrics.registry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+PRODUCE_DURATION = REGISTRY.histogram(
+    "kafka_produce_duration_seconds", "Time from handing an event to the producer until the broker acked it",
+    ("topic",)
+)
+PRODUCE_ERRORS = REGISTRY.counter("kafka_produce_errors", "Events the broker did not acknowledge", ("topic",))
+IN_FLIGHT = REGISTRY.gauge("kafka_producer_in_flight", "Events sent and not yet acknowledged")
+WAITING = REGISTRY.gauge("kafka_producer_waiting", "Senders blocked on the in-flight limit")
 
 class KafkaEventProducer:
-    def __init__(self, bootstrap_servers: str):
+    def __init__(self, bootstrap_servers: str, wire_format: str = "json", partitions: int = 1,
+                 linger_ms: int = 10, max_batch_size: int = 64 * 1024, compression_type: str = "lz4",
+                 max_in_flight: int = 1000):
         self.bootstrap_servers = bootstrap_servers
+        self.wire_format = wire_format
+        self.partitions = partitions
+        self.linger_ms = linger_ms
+        self.max_batch_size = max_batch_size
+        self.compression_type = compression_type
         self._producer: AIOKafkaProducer | None = None
+        self._partition_counts: dict[str, int] = {}
+        self._in_flight = asyncio.Semaphore(max_in_flight)
 
     async def start(self):
         self._producer = AIOKafkaProducer(
             bootstrap_servers=self.bootstrap_servers,
-            value_serializer=lambda v: json.dumps(v).encode("utf-8"),
-            max_request_size=10 * 1024 * 1024,
-            compression_type="gzip"
+            max_request_size=2 * 1024 * 1024,
+            compression_type=self.compression_type,
+            linger_ms=self.linger_ms,
+            max_batch_size=self.max_batch_size
         )
         await self._producer.start()
 
-    async def stop(self):
+    async def stop(self, timeout: float | None = None):
         if self._producer:
+            try:
+                await asyncio.wait_for(self._producer.flush(), timeout=timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Kafka producer did not flush within {timeout}s, pending sends are dropped")
             await self._producer.stop()
+            self._producer = None
+
+    async def ensure_topic(self, topic: str):
+        admin = AIOKafkaAdminClient(bootstrap_servers=self.bootstrap_servers)
+        await admin.start()
+        try:
+            try:
+                await admin.create_topics([NewTopic(topic, num_partitions=self.partitions, replication_factor=1)])
+                logger.info(f"Created topic {topic} with {self.partitions} partitions")
+            except TopicAlreadyExistsError:
+                pass
+
+            existing = len(await self._producer.partitions_for(topic))
+            if existing < self.partitions:
+                await admin.create_partitions({topic: NewPartitions(total_count=self.partitions)})
+                logger.info(f"Grew topic {topic} from {existing} to {self.partitions} partitions")
+        finally:
+            await admin.close()
+        self._partition_counts.pop(topic, None)
+
+    def serialize(self, event: dict) -> bytes:
+        return pack_event(event) if self.wire_format == "envelope" else dumps_event(event)
+
+    def serialize_for_users(self, event: dict, recipients: Iterable[str]) -> List[Tuple[str, bytes]]:
+        return [
+            (recipient, self.serialize({**event, "recipient": recipient}))
+            for recipient in dict.fromkeys(recipients)
+        ]
 
-    async def send_event(self, topic: str, event: dict):
+    async def send_event(self, topic: str, event: dict, key: str | None = None) -> asyncio.Future:
+        return await self.send_raw(topic, self.serialize(event), key=key)
+
+    async def send_raw(self, topic: str, value: bytes, key: str | None = None) -> asyncio.Future:
         if not self._producer:
             raise RuntimeError("Kafka producer not initialized")
-        await self._producer.send_and_wait(topic, event)
+
+        partition = None
+        if key is not None:
+            partition = partition_for(key, await self._partition_count(topic))
+
+        started = time.perf_counter()
+        WAITING.inc()
+        try:
+            await self._in_flight.acquire()
+        finally:
+            WAITING.dec()
+        IN_FLIGHT.inc()
+        try:
+            delivery = await self._producer.send(
+                topic, value,
+                key=key.encode("utf-8") if key is not None else None,
+                partition=partition
+            )
+        except BaseException:
+            self._in_flight.release()
+            IN_FLIGHT.dec()
+            raise
+        delivery.add_done_callback(lambda f: self._on_delivered(f, topic, started))
+        return delivery
+
+    async def send_to_users(self, topic: str, event: dict, recipients: Iterable[str],
+                            wait: bool = False) -> List[asyncio.Future]:
+        deliveries = [
+            await self.send_raw(topic, value, key=recipient)
+            for recipient, value in self.serialize_for_users(event, recipients)
+        ]
+        if wait:
+            await asyncio.gather(*deliveries)
+        return deliveries
+
+    def _on_delivered(self, delivery: asyncio.Future, topic: str, started: float):
+        self._in_flight.release()
+        IN_FLIGHT.dec()
+        if delivery.cancelled():
+            PRODUCE_ERRORS.labels(topic=topic).inc()
+            logger.warning(f"Delivery to {topic} was cancelled")
+        elif delivery.exception() is not None:
+            PRODUCE_ERRORS.labels(topic=topic).inc()
+            logger.error(f"Delivery to {topic} failed: {delivery.exception()}")
+        else:
+            PRODUCE_DURATION.labels(topic=topic).observe(time.perf_counter() - started)
+
+    async def _partition_count(self, topic: str) -> int:
+        count = self._partition_counts.get(topic)
+        if count is None:
+            count = len(await self._producer.partitions_for(topic))
+            self._partition_counts[topic] = count
+        return count
@@ -0,0 +1,86 @@
+import asyncio
+import logging
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from db.models.outbox import OutboxEvent
+from infrastructure.messaging.kafka.producer import KafkaEventProducer
+
+logger = logging.getLogger(__name__)
+
+# Every worker runs a relay, but only the one holding this lock relays. Parallel relays would send
+# interleaved batches concurrently and break the per-key order of the events
+RELAY_LOCK_KEY = 0x6f7574626f78
+
+class OutboxRelay:
+    def __init__(self, session_factory: async_sessionmaker, producer: KafkaEventProducer,
+                 batch_size: int = 500, poll_interval: float = 0.1, max_backoff: float = 5.0):
+        self.session_factory = session_factory
+        self.producer = producer
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_backoff = max_backoff
+        self._task: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
+
+    async def start(self):
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task:
+            await self._task
+            self._task = None
+
+    async def _run(self):
+        backoff = self.poll_interval
+        while not self._stopping.is_set():
+            try:
+                relayed = await self.relay_batch()
+                backoff = self.poll_interval
+            except Exception as e:
+                logger.error(f"Outbox relay failed, retrying in {backoff:.1f}s: {e}")
+                relayed = 0
+                backoff = min(backoff * 2, self.max_backoff)
+
+            if relayed < self.batch_size:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=backoff)
+                except asyncio.TimeoutError:
+                    pass
+
+        # Drain what is already committed so a clean shutdown does not strand events
+        try:
+            while await self.relay_batch():
+                pass
+        except Exception as e:
+            logger.error(f"Outbox relay could not drain on shutdown: {e}")
+
+    async def relay_batch(self) -> int:
+        async with self.session_factory() as session:
+            async with session.begin():
+                # Held until the batch is delivered and deleted, so the next batch starts after it
+                if not await session.scalar(select(func.pg_try_advisory_xact_lock(RELAY_LOCK_KEY))):
+                    return 0
+                result = await session.execute(
+                    select(OutboxEvent)
+                    .order_by(OutboxEvent.id)
+                    .limit(self.batch_size)
+                )
+                events = result.scalars().all()
+                if not events:
+                    return 0
+
+                deliveries = [
+                    await self.producer.send_raw(event.topic, event.payload, key=event.key)
+                    for event in events
+                ]
+                await asyncio.gather(*deliveries)
+
+                await session.execute(
+                    delete(OutboxEvent).where(OutboxEvent.id.in_([event.id for event in events]))
+                )
+
+        logger.debug(f"Relayed {len(events)} outbox events")
+        return len(events)
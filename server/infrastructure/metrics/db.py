@@ -0,0 +1,58 @@
+import time
+import inspect
+import functools
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from infrastructure.metrics.registry import REGISTRY
+
+QUERY_DURATION = REGISTRY.histogram(
+    "db_query_duration_seconds", "Duration of single SQL statements by repository method", ("operation",)
+)
+REPOSITORY_DURATION = REGISTRY.histogram(
+    "db_repository_call_duration_seconds", "Duration of repository calls including all their statements",
+    ("operation",)
+)
+
+_operation: ContextVar[str] = ContextVar("db_operation", default="other")
+
+def instrument_engine(engine: AsyncEngine):
+    """Times every statement and attributes it to the repository method running it."""
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        QUERY_DURATION.labels(operation=_operation.get()).observe(time.perf_counter() - started)
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _error(context):
+        # A failed statement never reaches after_cursor_execute
+        if context.connection is not None and context.connection.info.get("query_started"):
+            context.connection.info["query_started"].pop()
+
+def instrument_repository(cls):
+    """Class decorator that times each public coroutine method and labels its statements with its name."""
+    for name, method in list(vars(cls).items()):
+        if name.startswith("_") or not inspect.iscoroutinefunction(method):
+            continue
+        setattr(cls, name, _timed(f"{cls.__name__}.{name}", method))
+    return cls
+
+def _timed(operation: str, method):
+    histogram = REPOSITORY_DURATION.labels(operation=operation)
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        token = _operation.set(operation)
+        started = time.perf_counter()
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - started)
+            _operation.reset(token)
+    return wrapper
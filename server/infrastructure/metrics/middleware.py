@@ -0,0 +1,43 @@
+import time
+
+from infrastructure.metrics.registry import REGISTRY
+
+REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route", "status")
+)
+REQUESTS_IN_PROGRESS = REGISTRY.gauge("http_requests_in_progress", "HTTP requests being handled")
+
+
+class RequestMetricsMiddleware:
+    """Plain ASGI middleware, so timing a request does not add a BaseHTTPMiddleware task per call."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            # The router stores the matched route in the scope; labelling by template keeps ids out of the series
+            route = scope.get("route")
+            REQUEST_DURATION.labels(
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status_code
+            ).observe(time.perf_counter() - started)
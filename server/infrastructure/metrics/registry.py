@@ -0,0 +1,338 @@
+import os
+import json
+import math
+import time
+import logging
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds, from a cache hit to a slow DH generation
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(pairs: Iterable[Tuple[str, str]]) -> str:
+    body = ",".join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return f"{{{body}}}" if body else ""
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"Metric {self.name} needs labels {self.labelnames}")
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _value(self, child):
+        raise NotImplementedError
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            children = list(self._children.items())
+        return {
+            "kind": self.kind,
+            "documentation": self.documentation,
+            "labelnames": list(self.labelnames),
+            "values": [[list(key), self._value(child)] for key, child in children]
+        }
+
+
+class _CounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name if name.endswith("_total") else f"{name}_total", documentation, labelnames)
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def _value(self, child):
+        return child.value
+
+
+class _GaugeChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.inc(-amount)
+
+    def set_function(self, function: Callable[[], float]):
+        # Read at scrape time, for values the owner already tracks
+        self.function = function
+
+    def get(self) -> float:
+        return self.function() if self.function else self.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    def set_function(self, function: Callable[[], float]):
+        self._default().set_function(function)
+
+    def _value(self, child):
+        return child.get()
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _value(self, child):
+        with child._lock:
+            return {"counts": list(child.counts), "sum": child.sum}
+
+    def snapshot(self) -> dict:
+        return {**super().snapshot(), "buckets": list(self.buckets)}
+
+
+def _merge(snapshots: Iterable[dict]) -> Dict[str, dict]:
+    """Adds up the series of several registry snapshots, label set by label set."""
+    merged: Dict[str, dict] = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "values": {}})
+            for key, value in metric["values"]:
+                key = tuple(key)
+                current = target["values"].get(key)
+                if metric["kind"] == "histogram":
+                    if current is not None:
+                        value = {
+                            "counts": [a + b for a, b in zip(current["counts"], value["counts"])],
+                            "sum": current["sum"] + value["sum"]
+                        }
+                elif current is not None:
+                    value = current + value
+                target["values"][key] = value
+    return merged
+
+def _render_metric(name: str, metric: dict) -> List[str]:
+    lines = [f"# HELP {name} {metric['documentation']}", f"# TYPE {name} {metric['kind']}"]
+    for key, value in sorted(metric["values"].items()):
+        labels = list(zip(metric["labelnames"], key))
+        if metric["kind"] != "histogram":
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            continue
+        cumulative = 0
+        for bound, count in zip(metric["buckets"] + [math.inf], value["counts"]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels + [('le', _format_value(bound))])} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    return lines
+
+def _read_snapshot(path: Path) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_snapshot(path: Path, snapshot: dict):
+    # Replaced atomically, so a scrape in another worker never reads half a file
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+def mark_process_dead(pid: int, directory: str):
+    """Drops the gauges of an exited worker and keeps its counters and histograms in the totals.
+
+    Called from gunicorn's child_exit hook in the master.
+    """
+    path = Path(directory) / f"{pid}.json"
+    try:
+        snapshot = _read_snapshot(path)
+    except (OSError, ValueError):
+        return
+    _write_snapshot(path, {name: metric for name, metric in snapshot.items() if metric["kind"] != "gauge"})
+
+
+class MetricsRegistry:
+    """Metrics rendered in the Prometheus text format, without the client library.
+
+    Under gunicorn a scrape lands on any one worker. With multiprocess mode enabled every worker
+    writes a snapshot of its registry to a shared directory, and the worker answering a scrape adds
+    all snapshots up, so the series do not depend on which worker answered.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self.multiprocess_dir: Optional[Path] = None
+        self._flush_interval = 1.0
+        self._stop_flushing = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def enable_multiprocess(self, directory: str, flush_interval: float = 1.0):
+        """Starts writing this worker's snapshot to `directory` every `flush_interval` seconds."""
+        self.multiprocess_dir = Path(directory)
+        self.multiprocess_dir.mkdir(parents=True, exist_ok=True)
+        self._flush_interval = flush_interval
+        self._stop_flushing.clear()
+        self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+        self._flusher.start()
+
+    def disable_multiprocess(self):
+        if self._flusher is None:
+            return
+        self._stop_flushing.set()
+        self._flusher.join()
+        self._flusher = None
+        # The last values of an exiting worker stay in the totals
+        self._flush()
+
+    def _flush_loop(self):
+        while not self._stop_flushing.wait(self._flush_interval):
+            self._flush()
+
+    def _flush(self):
+        try:
+            _write_snapshot(self.multiprocess_dir / f"{os.getpid()}.json", self.snapshot())
+        except OSError as e:
+            logger.error(f"Could not write metrics snapshot: {e}")
+
+    def _collect(self) -> List[dict]:
+        if self.multiprocess_dir is None:
+            return [self.snapshot()]
+        # This worker's own values are written now, the others are at most one flush interval old
+        self._flush()
+        snapshots = []
+        for path in self.multiprocess_dir.glob("*.json"):
+            try:
+                snapshots.append(_read_snapshot(path))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping metrics snapshot {path.name}: {e}")
+        return snapshots
+
+    def render(self) -> str:
+        merged = _merge(self._collect())
+        lines = []
+        for name in sorted(merged):
+            lines.extend(_render_metric(name, merged[name]))
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,65 @@
+import time
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+
+from infrastructure.metrics.registry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+HASH_DURATION = REGISTRY.histogram(
+    "password_hash_duration_seconds", "bcrypt call latency including the wait for a pool thread", ("operation",)
+)
+HASH_REJECTED = REGISTRY.counter("password_hash_rejected", "bcrypt calls rejected because the queue was full")
+HASH_QUEUE_DEPTH = REGISTRY.gauge("password_hash_queue_depth", "bcrypt calls waiting for a pool thread")
+HASH_BUSY_WORKERS = REGISTRY.gauge("password_hash_busy_workers", "Pool threads running bcrypt")
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """Runs bcrypt on a small dedicated thread pool so hashing never blocks the event loop.
+
+    bcrypt releases the GIL, so the pool size bounds the CPU spent on passwords. Work beyond
+    `max_queue` waiting calls is rejected instead of letting a login burst queue up unbounded latency.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 64):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self.rejected = 0
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hasher")
+        HASH_QUEUE_DEPTH.set_function(lambda: self.queue_depth)
+        HASH_BUSY_WORKERS.set_function(lambda: min(self._pending, self.max_workers))
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self._pending - self.max_workers)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", self.context.hash, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self._run("verify", self.context.verify, password, password_hash)
+
+    async def _run(self, operation: str, fn, *args):
+        if self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            HASH_REJECTED.inc()
+            logger.warning(f"Password hasher saturated, {self.queue_depth} calls queued, rejecting")
+            raise PasswordHasherBusy()
+
+        self._pending += 1
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+            HASH_DURATION.labels(operation=operation).observe(time.perf_counter() - started)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
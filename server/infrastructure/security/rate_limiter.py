@@ -0,0 +1,48 @@
+import time
+from typing import Optional
+from sqlalchemy import case, delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from db.models.rate_limit import RateLimitHit
+
+class PostgresRateLimiter:
+    """Allows `limit` hits per key within a fixed `window` of seconds, counted in Postgres.
+
+    Every gunicorn worker updates the same row of a key, so the limit holds for the whole server.
+    """
+
+    def __init__(self, session_factory: async_sessionmaker[AsyncSession], limit: int, window: float):
+        self.session_factory = session_factory
+        self.limit = limit
+        self.window = window
+        self._purged_at = 0.0
+
+    async def hit(self, key: str) -> Optional[float]:
+        """Records a hit, returns None when allowed or the seconds until the key may retry."""
+        now = time.time()
+        window_start = now - now % self.window
+        stmt = insert(RateLimitHit).values(key=key, window_start=window_start, hits=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RateLimitHit.key],
+            set_={
+                "hits": case(
+                    (RateLimitHit.window_start == stmt.excluded.window_start, RateLimitHit.hits + 1),
+                    else_=1
+                ),
+                "window_start": stmt.excluded.window_start
+            }
+        ).returning(RateLimitHit.hits)
+
+        async with self.session_factory() as session:
+            hits = (await session.execute(stmt)).scalar_one()
+            await session.commit()
+            if now - self._purged_at > self.window:
+                # In its own transaction, so it never holds one key's row while waiting for another
+                self._purged_at = now
+                await session.execute(delete(RateLimitHit).where(RateLimitHit.window_start < window_start))
+                await session.commit()
+
+        if hits > self.limit:
+            return window_start + self.window - now
+        return None
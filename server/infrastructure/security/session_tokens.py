@@ -0,0 +1,90 @@
+import hmac
+import json
+import time
+import base64
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable
+
+@dataclass(frozen=True)
+class SessionClaims:
+    user_id: str
+    chats: frozenset[str]
+    expires_at: int
+
+    def is_member(self, chat_id: str) -> bool:
+        return chat_id in self.chats
+
+
+class InvalidSessionToken(Exception):
+    pass
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class SessionTokenSigner:
+    """Issues and verifies HS256 JWTs carrying the user id and the chats they belong to.
+
+    Verified claims are kept in an LRU keyed by the token, so repeated requests with the same
+    token skip the signature check and JSON decoding.
+    """
+
+    HEADER = _b64encode(json.dumps({"alg": "HS256", "typ": "JWT"}, separators=(",", ":")).encode())
+
+    def __init__(self, secret: str, ttl: int = 12 * 3600, cache_size: int = 10_000):
+        self._key = secret.encode("utf-8")
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, SessionClaims] = OrderedDict()
+
+    def issue(self, user_id: str, chats: Iterable[str]) -> tuple[str, int]:
+        expires_at = int(time.time()) + self.ttl
+        payload = _b64encode(json.dumps({
+            "sub": user_id,
+            "chats": sorted(set(chats)),
+            "exp": expires_at
+        }, separators=(",", ":")).encode())
+        signing_input = f"{self.HEADER}.{payload}"
+        return f"{signing_input}.{self._sign(signing_input)}", expires_at
+
+    def verify(self, token: str) -> SessionClaims:
+        claims = self._cache.get(token)
+        if claims is None:
+            claims = self._decode(token)
+            self._cache[token] = claims
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(token)
+
+        if claims.expires_at <= time.time():
+            self._cache.pop(token, None)
+            raise InvalidSessionToken("Session token expired")
+        return claims
+
+    def _decode(self, token: str) -> SessionClaims:
+        try:
+            header, payload, signature = token.split(".")
+        except ValueError:
+            raise InvalidSessionToken("Malformed session token")
+        if header != self.HEADER or not hmac.compare_digest(signature, self._sign(f"{header}.{payload}")):
+            raise InvalidSessionToken("Invalid session token signature")
+
+        try:
+            data = json.loads(_b64decode(payload))
+            return SessionClaims(
+                user_id=data["sub"],
+                chats=frozenset(data["chats"]),
+                expires_at=int(data["exp"])
+            )
+        except (ValueError, KeyError, TypeError):
+            raise InvalidSessionToken("Malformed session token")
+
+    def _sign(self, signing_input: str) -> str:
+        return _b64encode(hmac.new(self._key, signing_input.encode("ascii"), hashlib.sha256).digest())
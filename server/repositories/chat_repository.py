@@ -1,8 +1,18 @@
+from datetime import datetime
+
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, update, func
+from sqlalchemy.orm import joinedload
+from sqlalchemy.dialects.postgresql import insert
 
 from db.models.chat import Chat, Participant, ChatStatus, User
+from db.models.outbox import OutboxEvent
+from db.models.dh_params import DHParamSet
+from db.models.message import Message, FileChunk
+from infrastructure.cache.membership_listener import MEMBERSHIP_CHANNEL
+from infrastructure.metrics.db import instrument_repository
 
+@instrument_repository
 class ChatRepository:
     def __init__(self, session: AsyncSession):
         self._session = session
@@ -10,13 +20,42 @@ class ChatRepository:
     async def get_chat(self, chat_id: str) -> Chat | None:
         return await self._session.get(Chat, chat_id)
 
+    async def get_chat_with_participants(self, chat_id: str) -> Chat | None:
+        result = await self._session.execute(
+            select(Chat)
+            .where(Chat.id == chat_id)
+            .options(joinedload(Chat.participants))
+        )
+        return result.unique().scalar_one_or_none()
+
+    async def get_chat_for_update(self, chat_id: str) -> Chat | None:
+        # Locks the chat row so concurrent key exchanges for it are serialized
+        result = await self._session.execute(
+            select(Chat)
+            .where(Chat.id == chat_id)
+            .options(joinedload(Chat.participants))
+            .with_for_update(of=Chat)
+        )
+        return result.unique().scalar_one_or_none()
+
     async def create_chat(self, chat: Chat):
         self._session.add(chat)
         await self._session.commit()
 
-    async def add_participant(self, participant: Participant):
+    async def add_participant(self, participant: Participant, commit: bool = True):
         self._session.add(participant)
-        await self._session.commit()
+        if commit:
+            await self._session.commit()
+
+    async def add_participant_if_absent(self, chat_id: str, user_id: str) -> bool:
+        # Relies on the unique (chat_id, user_id) index, returns False when the user is already in the chat
+        result = await self._session.execute(
+            insert(Participant)
+            .values(chat_id=chat_id, user_id=user_id)
+            .on_conflict_do_nothing(index_elements=[Participant.chat_id, Participant.user_id])
+            .returning(Participant.id)
+        )
+        return result.scalar_one_or_none() is not None
 
     async def add_chat_with_creator(self, chat: Chat, creator: Participant):
         self._session.add_all([chat, creator])
@@ -28,19 +67,22 @@ class ChatRepository:
             return None
         return chat.status
 
-    async def set_chat_status(self, chat_id: str, status: ChatStatus):
+    async def set_chat_status(self, chat_id: str, status: ChatStatus, commit: bool = True):
         chat = await self.get_chat(chat_id)
         if chat is None:
             return
         chat.status = status
-        await self._session.commit()
+        if commit:
+            await self._session.commit()
 
-    async def update_participant_public_key(self, chat_id: str, user_id: str, public_key: str):
+    async def update_participant_public_key(self, chat_id: str, user_id: str, public_key: str,
+                                            commit: bool = True):
         participant = await self.get_participant(chat_id, user_id)
         if participant is None:
             return
         participant.public_key = public_key
-        await self._session.commit()
+        if commit:
+            await self._session.commit()
 
     async def get_participant(self, chat_id: str, user_id: str) -> Participant | None:
         result = await self._session.execute(
@@ -57,22 +99,135 @@ class ChatRepository:
         )
         return result.scalars().all()
 
-    async def delete_participant(self, chat_id: str, user_id: str):
+    async def get_user_chat_ids(self, user_id: str) -> list[str]:
+        result = await self._session.execute(
+            select(Participant.chat_id).where(Participant.user_id == user_id)
+        )
+        return result.scalars().all()
+
+    async def delete_participant(self, chat_id: str, user_id: str, commit: bool = True):
         await self._session.execute(
             delete(Participant).where(
                 Participant.chat_id == chat_id,
                 Participant.user_id == user_id
             )
         )
-        await self._session.commit()
+        if commit:
+            await self._session.commit()
 
-    async def delete_chat(self, chat_id: str):
+    async def delete_chat(self, chat_id: str, commit: bool = True):
         chat = await self.get_chat(chat_id)
         if chat is None:
             return
         await self._session.delete(chat)
+        if commit:
+            await self._session.commit()
+
+    async def next_message_seq(self, chat_id: str) -> int | None:
+        # The row lock taken here is held until commit, so concurrent sends to a chat are numbered in order
+        result = await self._session.execute(
+            update(Chat)
+            .where(Chat.id == chat_id)
+            .values(last_seq=Chat.last_seq + 1)
+            .returning(Chat.last_seq)
+        )
+        return result.scalar_one_or_none()
+
+    def add_message(self, message: Message):
+        self._session.add(message)
+
+    async def lock_chat(self, chat_id: str) -> bool:
+        result = await self._session.execute(select(Chat.id).where(Chat.id == chat_id).with_for_update())
+        return result.scalar_one_or_none() is not None
+
+    async def has_message(self, chat_id: str, message_id: str) -> bool:
+        result = await self._session.execute(
+            select(Message.seq).where(Message.chat_id == chat_id, Message.message_id == message_id)
+        )
+        return result.first() is not None
+
+    async def get_message(self, chat_id: str, message_id: str) -> Message | None:
+        result = await self._session.execute(
+            select(Message).where(Message.chat_id == chat_id, Message.message_id == message_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def add_file_chunk(self, chat_id: str, transfer_id: str, seq: int, encrypted_chunk: bytes,
+                             iv_nonce: str) -> bool:
+        """Stores a chunk once, returns False for a resent chunk."""
+        result = await self._session.execute(
+            insert(FileChunk)
+            .values(chat_id=chat_id, transfer_id=transfer_id, seq=seq, encrypted_chunk=encrypted_chunk,
+                    iv_nonce=iv_nonce, created_at=datetime.utcnow())
+            .on_conflict_do_nothing()
+            .returning(FileChunk.seq)
+        )
+        return result.first() is not None
+
+    async def count_file_chunks(self, chat_id: str, transfer_id: str) -> int:
+        return await self._session.scalar(
+            select(func.count())
+            .select_from(FileChunk)
+            .where(FileChunk.chat_id == chat_id, FileChunk.transfer_id == transfer_id)
+        )
+
+    async def get_file_chunks(self, chat_id: str, transfer_id: str, after: int, limit: int) -> list[FileChunk]:
+        result = await self._session.execute(
+            select(FileChunk)
+            .where(FileChunk.chat_id == chat_id, FileChunk.transfer_id == transfer_id, FileChunk.seq > after)
+            .order_by(FileChunk.seq)
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    async def get_last_message_seq(self, chat_id: str) -> int | None:
+        return await self._session.scalar(select(Chat.last_seq).where(Chat.id == chat_id))
+
+    async def get_messages_after(self, chat_id: str, recipient_id: str, after: int, upto: int,
+                                 limit: int) -> list[Message]:
+        result = await self._session.execute(
+            select(Message)
+            .where(
+                Message.chat_id == chat_id,
+                Message.recipient_id == recipient_id,
+                Message.seq > after,
+                Message.seq <= upto
+            )
+            .order_by(Message.seq)
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+    async def take_dh_params(self) -> tuple[int, int] | None:
+        claimable = (
+            select(DHParamSet.id)
+            .order_by(DHParamSet.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        result = await self._session.execute(
+            delete(DHParamSet).where(DHParamSet.id == claimable).returning(DHParamSet.p, DHParamSet.g)
+        )
+        row = result.one_or_none()
+        return (int(row.p), int(row.g)) if row else None
+
+    async def notify_membership_changed(self, chat_id: str):
+        # Delivered to every worker's listener only when the transaction commits
+        await self._session.execute(select(func.pg_notify(MEMBERSHIP_CHANNEL, chat_id)))
+
+    def add_outbox_events(self, topic: str, records: list[tuple[str, bytes]]):
+        self._session.add_all([
+            OutboxEvent(topic=topic, key=key, payload=payload)
+            for key, payload in records
+        ])
+
+    async def commit(self):
         await self._session.commit()
 
+    async def rollback(self):
+        await self._session.rollback()
+
     async def get_user_by_username(self, username: str) -> User | None:
         result = await self._session.execute(
             select(User).where(User.username == username)
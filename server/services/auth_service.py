@@ -1,16 +1,17 @@
 from datetime import datetime
-from passlib.context import CryptContext
 from fastapi import HTTPException, status
 from uuid import uuid4
 
 from repositories.chat_repository import ChatRepository
+from infrastructure.security.password_hasher import PasswordHasher, PasswordHasherBusy
+from infrastructure.security.session_tokens import SessionTokenSigner
 from db.models.chat import User
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 class AuthService:
-    def __init__(self, chat_repository: ChatRepository):
+    def __init__(self, chat_repository: ChatRepository, hasher: PasswordHasher, sessions: SessionTokenSigner):
         self.chat_repository = chat_repository
+        self.hasher = hasher
+        self.sessions = sessions
 
     async def register(self, username: str, password: str) -> User:
         existing_user = await self.chat_repository.get_user_by_username(username)
@@ -20,7 +21,7 @@ class AuthService:
                 detail="Username is already taken"
             )
 
-        password_hash = self._hash_password(password)
+        password_hash = await self._hash_password(password)
         user = User(
             id=str(uuid4()),
             username=username,
@@ -33,7 +34,7 @@ class AuthService:
 
     async def authenticate(self, username: str, password: str) -> User:
         user = await self.chat_repository.get_user_by_username(username)
-        if not user or not self._verify_password(password, user.password_hash):
+        if not user or not await self._verify_password(password, user.password_hash):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid username or password"
@@ -41,8 +42,29 @@ class AuthService:
 
         return user.id
 
-    def _hash_password(self, password: str) -> str:
-        return pwd_context.hash(password)
+    async def issue_session(self, user_id: str) -> dict:
+        chat_ids = await self.chat_repository.get_user_chat_ids(user_id)
+        token, expires_at = self.sessions.issue(user_id, chat_ids)
+        return {
+            "session_token": token,
+            "expires_at": expires_at
+        }
+
+    async def _hash_password(self, password: str) -> str:
+        try:
+            return await self.hasher.hash(password)
+        except PasswordHasherBusy:
+            raise self._busy()
 
-    def _verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        return pwd_context.verify(plain_password, hashed_password)
+    async def _verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        try:
+            return await self.hasher.verify(plain_password, hashed_password)
+        except PasswordHasherBusy:
+            raise self._busy()
+
+    def _busy(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, try again later",
+            headers={"Retry-After": "1"}
+        )
@@ -3,29 +3,39 @@ from uuid import uuid4
 from datetime import datetime
 from fastapi import HTTPException
 
-from diffie_hellman.diffie_hellman import DiffieHellman
 from infrastructure.messaging.kafka.producer import KafkaEventProducer
 from repositories.chat_repository import ChatRepository
+from infrastructure.cache.chat_membership import ChatMembership, ChatMembershipCache
+from infrastructure.dh.param_pool import DHParamPool
 from db.models.chat import Chat, Participant, ChatStatus
 from api.v1.schemas.chat import (
     JoinChatRequest, JoinChatResponse, 
     CloseChatRequest, CloseChatResponse, 
     LeaveChatRequest, LeaveChatResponse, 
     CreateChatRequest, CreateChatResponse,
-    GetChatEncryptionStatusResponse
+    GetChatEncryptionStatusResponse, DHParams
 )
 
 logger = logging.getLogger(__name__)
 
 
 class ChatService:
-    def __init__(self, repo: ChatRepository, producer: KafkaEventProducer):
+    def __init__(self, repo: ChatRepository, producer: KafkaEventProducer, membership: ChatMembershipCache,
+                 dh_pool: DHParamPool):
         self.repo = repo
         self.producer = producer
+        self.membership = membership
+        self.dh_pool = dh_pool
 
     async def create_chat(self, data: CreateChatRequest) -> CreateChatResponse:
         chat_id = str(uuid4())
-        p, g = DiffieHellman.generate_dh_parameters()
+        params = await self.repo.take_dh_params()
+        if params is None:
+            logger.warning("DH param pool is empty, generating parameters for this chat")
+            self.dh_pool.record_miss()
+            self.dh_pool.request_refill()
+            params = await self.dh_pool.generate()
+        p, g = params
 
         chat = Chat(
             id=chat_id,
@@ -46,37 +56,41 @@ class ChatService:
 
         return CreateChatResponse(
             chat_id=chat_id,
-            user_id=data.user_id
+            user_id=data.user_id,
+            dh_params=DHParams(p=p, g=g)
         )
 
     async def join_chat(self, data: JoinChatRequest) -> JoinChatResponse:
-        chat = await self.repo.get_chat(data.chat_id)
+        # The row lock serializes joins of the same chat so two users cannot both take the last seat
+        chat = await self.repo.get_chat_for_update(data.chat_id)
         if not chat:
             logger.warning(f"Chat {data.chat_id} not found")
             raise HTTPException(status_code=400, detail="Cannot join chat")
         
-        participants = await self.repo.get_participants(data.chat_id)
-
-        if any(p.user_id == data.user_id for p in participants):
-            logger.warning(f"User {data.user_id } already in chat {data.chat_id}")
-            raise HTTPException(status_code=400, detail="Cannot join chat")
+        participants = list(chat.participants)
 
         if len(participants) >= 2:
+            await self.repo.rollback()
             logger.warning(f"Chat {data.chat_id} is full")
             raise HTTPException(status_code=400, detail="Cannot join chat")
 
-        await self.repo.add_participant(Participant(chat_id=data.chat_id, user_id=data.user_id ))
+        if not await self.repo.add_participant_if_absent(data.chat_id, data.user_id):
+            await self.repo.rollback()
+            logger.warning(f"User {data.user_id } already in chat {data.chat_id}")
+            raise HTTPException(status_code=400, detail="Cannot join chat")
+
         if len(participants) + 1 == 2:
-            await self.repo.set_chat_status(data.chat_id, ChatStatus.active)
-        
-        chat = await self.repo.get_chat(data.chat_id)
+            chat.status = ChatStatus.active
 
-        await self.producer.send_event("chat_messages", {
+        self.repo.add_outbox_events("chat_messages", self.producer.serialize_for_users({
             "type": "user_joined",
             "chat_id": data.chat_id,
             "user_id": data.user_id ,
             "status": chat.status
-        })
+        }, [p.user_id for p in participants] + [data.user_id]))
+        await self.repo.notify_membership_changed(data.chat_id)
+        await self.repo.commit()
+        self.membership.invalidate(data.chat_id)
 
         logger.info(f"User {data.user_id } joined chat {data.chat_id}")
         
@@ -85,35 +99,36 @@ class ChatService:
             user_id=data.user_id,
             algorithm=chat.algorithm,
             encryption_mode=chat.encryption_mode,
-            padding_mode=chat.padding_mode
+            padding_mode=chat.padding_mode,
+            dh_params=DHParams(p=chat.p, g=chat.g),
+            # Sends number under the chat row lock, so nothing is assigned between the join and this value
+            start_seq=chat.last_seq or 0
         )
 
     async def leave_chat(self, data: LeaveChatRequest) -> LeaveChatResponse:
-        chat = await self.repo.get_chat(data.chat_id)
+        chat = await self.repo.get_chat_with_participants(data.chat_id)
         if not chat:
             raise HTTPException(status_code=400, detail="Cannot leave chat")
 
-        await self.repo.delete_participant(data.chat_id, data.user_id)
-
-        chat = await self.repo.get_chat(data.chat_id)
-
-        is_creator =  chat is not None and chat.creator_id == data.user_id
+        recipients = [p.user_id for p in chat.participants]
+        remaining = [user_id for user_id in recipients if user_id != data.user_id]
+        is_creator = chat.creator_id == data.user_id
 
-        participants = await self.repo.get_participants(data.chat_id)
-        if not participants or len(participants) == 0 or is_creator:
-            await self.close_chat(CloseChatRequest(
-                chat_id=data.chat_id,
-                user_id=chat.creator_id
-            ))
+        if not remaining or is_creator:
+            await self._close_chat(chat, chat.creator_id, remaining)
             logger.info(f"Chat {data.chat_id} deleted — no participants")
         else:
-            await self.repo.set_chat_status(data.chat_id, ChatStatus.waiting)
+            await self.repo.delete_participant(data.chat_id, data.user_id, commit=False)
+            chat.status = ChatStatus.waiting
 
-        await self.producer.send_event("chat_messages", {
+        self.repo.add_outbox_events("chat_messages", self.producer.serialize_for_users({
             "type": "user_left",
             "chat_id": data.chat_id,
             "user_id": data.user_id
-        })
+        }, recipients))
+        await self.repo.notify_membership_changed(data.chat_id)
+        await self.repo.commit()
+        self.membership.invalidate(data.chat_id)
 
         logger.info(f"User {data.chat_id} left chat {data.chat_id}")
         return LeaveChatResponse(
@@ -122,19 +137,16 @@ class ChatService:
         )
 
     async def close_chat(self, data: CloseChatRequest) -> CloseChatResponse:
-        chat = await self.repo.get_chat(data.chat_id)
+        chat = await self.repo.get_chat_with_participants(data.chat_id)
         if not chat or chat.creator_id != data.user_id:
             logger.warning(f"User {data.user_id} is not the creator of chat {data.chat_id}")
             raise HTTPException(status_code=400, detail="Cannot close chat")
 
-        await self.repo.delete_chat(chat.id)
-
-        await self.producer.send_event("chat_messages", {
-            "type": "chat_closed",
-            "chat_id": data.chat_id,
-            "closed_by": data.user_id,
-            "timestamp": datetime.utcnow().isoformat()
-        })
+        recipients = [p.user_id for p in chat.participants]
+        await self._close_chat(chat, data.user_id, recipients)
+        await self.repo.notify_membership_changed(data.chat_id)
+        await self.repo.commit()
+        self.membership.invalidate(data.chat_id)
 
         logger.info(f"Chat {data.chat_id} closed by creator {data.user_id}")
         return CloseChatResponse(
@@ -142,18 +154,26 @@ class ChatService:
             user_id=data.user_id
         )
 
-    async def get_chat_encryption_status(self, chat_id: str, user_id: str) -> GetChatEncryptionStatusResponse:
-        chat = await self.repo.get_chat(chat_id)
-    
-        participants = await self.repo.get_participants(chat_id)
+    async def _close_chat(self, chat: Chat, closed_by: str, recipients: list[str]):
+        await self.repo.delete_chat(chat.id, commit=False)
 
-        if not chat or user_id not in [p.user_id for p in participants]:
-            raise HTTPException(status_code=400, detail="Cannot get chat encryption status")
+        self.repo.add_outbox_events("chat_messages", self.producer.serialize_for_users({
+            "type": "chat_closed",
+            "chat_id": chat.id,
+            "closed_by": closed_by,
+            "timestamp": datetime.utcnow().isoformat()
+        }, recipients + [closed_by]))
 
-        chat_status = await self.repo.get_chat_status(chat_id)
+    async def get_chat_encryption_status(self, chat_id: str, user_id: str) -> GetChatEncryptionStatusResponse:
+        membership = self.membership.get(chat_id)
+        if membership is None:
+            chat = await self.repo.get_chat_with_participants(chat_id)
+            membership = ChatMembership.from_chat(chat) if chat else None
 
-        print(chat_status)
+        if not membership or user_id not in membership.participants:
+            raise HTTPException(status_code=400, detail="Cannot get chat encryption status")
 
+        chat_status = membership.status
         is_ready = chat_status == ChatStatus.secure
 
         return GetChatEncryptionStatusResponse(
@@ -1,13 +1,20 @@
 from repositories.chat_repository import ChatRepository
+from infrastructure.cache.chat_membership import ChatMembershipCache
 from infrastructure.messaging.kafka.producer import KafkaEventProducer
 from db.models.chat import ChatStatus
-from api.v1.schemas.key import GetDHParamsResponse, StorePublicKeyRequest, StorePublicKeyResponse, GetParticipantKeyResponse
+from fastapi import HTTPException, status
+
+from api.v1.schemas.key import (
+    GetDHParamsResponse, StorePublicKeyRequest, StorePublicKeyResponse, GetParticipantKeyResponse,
+    KeyExchangeRequest, KeyExchangeResponse
+)
 
 class KeyService:
 
-    def __init__(self, repo: ChatRepository, producer: KafkaEventProducer):
+    def __init__(self, repo: ChatRepository, producer: KafkaEventProducer, membership: ChatMembershipCache):
         self.repo = repo
         self.producer = producer
+        self.membership = membership
 
     async def get_chat_dh_params(self, chat_id: str) -> GetDHParamsResponse:
         chat = await self.repo.get_chat(chat_id)
@@ -18,13 +25,21 @@ class KeyService:
         )
     
     async def store_public_key(self, data: StorePublicKeyRequest) -> StorePublicKeyResponse:        
-        await self.repo.update_participant_public_key(data.chat_id, data.user_id, data.public_key)
+        await self.repo.update_participant_public_key(data.chat_id, data.user_id, data.public_key, commit=False)
 
         participants = await self.repo.get_participants(data.chat_id)
         
         all_keys_exchanged = all(p.public_key for p in participants)
         if all_keys_exchanged:
-            await self.repo.set_chat_status(data.chat_id, ChatStatus.secure)
+            await self.repo.set_chat_status(data.chat_id, ChatStatus.secure, commit=False)
+            self.repo.add_outbox_events("chat_messages", self.producer.serialize_for_users({
+                "type": "encryption_ready",
+                "chat_id": data.chat_id
+            }, [p.user_id for p in participants]))
+
+        await self.repo.notify_membership_changed(data.chat_id)
+        await self.repo.commit()
+        self.membership.invalidate(data.chat_id)
 
         other_participant_id = None
         participants = await self.repo.get_participants(data.chat_id)
@@ -35,12 +50,6 @@ class KeyService:
         other_participant = await self.repo.get_participant(data.chat_id, other_participant_id)
         other_public_key = other_participant.public_key if other_participant else None
         
-        if all_keys_exchanged:
-            await self.producer.send_event("chat_messages", {
-                "type": "encryption_ready",
-                "chat_id": data.chat_id
-            })
-        
         return StorePublicKeyResponse(
             chat_id=data.chat_id,
             user_id=data.user_id,
@@ -49,6 +58,42 @@ class KeyService:
             other_public_key=other_public_key
         )  
 
+    async def exchange_keys(self, data: KeyExchangeRequest) -> KeyExchangeResponse:
+        chat = await self.repo.get_chat_for_update(data.chat_id)
+        if chat is None:
+            await self.repo.rollback()
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chat not found")
+
+        participant = next((p for p in chat.participants if p.user_id == data.user_id), None)
+        if participant is None:
+            await self.repo.rollback()
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not a participant of this chat")
+
+        participant.public_key = data.public_key
+        other = next((p for p in chat.participants if p.user_id != data.user_id), None)
+
+        all_keys_exchanged = other is not None and all(p.public_key for p in chat.participants)
+        if all_keys_exchanged and chat.status != ChatStatus.secure:
+            chat.status = ChatStatus.secure
+            self.repo.add_outbox_events("chat_messages", self.producer.serialize_for_users({
+                "type": "encryption_ready",
+                "chat_id": data.chat_id
+            }, [p.user_id for p in chat.participants]))
+
+        response = KeyExchangeResponse(
+            chat_id=data.chat_id,
+            user_id=data.user_id,
+            p=chat.p,
+            g=chat.g,
+            encryption_ready=all_keys_exchanged,
+            other_participant=other.user_id if other else None,
+            other_public_key=other.public_key if other else None
+        )
+        await self.repo.notify_membership_changed(data.chat_id)
+        await self.repo.commit()
+        self.membership.invalidate(data.chat_id)
+        return response
+
     async def get_participant_key(self, chat_id: str, user_id: str) -> GetParticipantKeyResponse:
         other_participant_id = None
         participants = await self.repo.get_participants(chat_id)
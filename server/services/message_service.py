@@ -1,41 +1,40 @@
+import base64
+from datetime import datetime, timezone
 from fastapi import HTTPException, status
 from uuid import uuid4
 
 from db.models.chat import ChatStatus
+from db.models.message import Message
 from repositories.chat_repository import ChatRepository
+from infrastructure.cache.chat_membership import ChatMembership, ChatMembershipCache
 from infrastructure.messaging.kafka.producer import KafkaEventProducer
-from api.v1.schemas.message import SendMessageRequest, SendMessageResponse
+from api.v1.schemas.message import (
+    SendMessageRequest, SendMessageResponse,
+    SendFileChunkRequest, SendFileChunkResponse,
+    GetMessageHistoryResponse, HistoryMessage,
+    GetFileChunksResponse, FileChunkItem
+)
 
 class MessageService:
 
-    def __init__(self, repo: ChatRepository, producer: KafkaEventProducer):
+    def __init__(self, repo: ChatRepository, producer: KafkaEventProducer, membership: ChatMembershipCache):
         self.repo = repo
         self.producer = producer
+        self.membership = membership
     
     async def send_message(self, data: SendMessageRequest) -> SendMessageResponse:
-        chat = await self.repo.get_chat(data.chat_id)
-        if not chat:
+        recipient = await self._get_recipient(data.chat_id, data.user_id)
+
+        message_id = str(uuid4())
+        seq = await self.repo.next_message_seq(data.chat_id)
+        if seq is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Chat not found")
         
-        participants = await self.repo.get_participants(data.chat_id)
-        if data.user_id not in [p.user_id for p in participants]:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Not a participant")
-
-        chat_status = await self.repo.get_chat_status(data.chat_id)
-        if not chat_status == ChatStatus.secure:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Encryption not established for this chat")
-
-        message_id = str(uuid4())
-        recipient = [p.user_id for p in participants if p.user_id != data.user_id][0]
-        
         message = {
             "message_id": message_id,
+            "seq": seq,
             "chat_id": data.chat_id,
             "sender": data.user_id,
             "recipient": recipient,
@@ -45,17 +44,209 @@ class MessageService:
             "file_name": data.file_name,
             "timestamp": data.timestamp.isoformat()
         }
-        
-        await self.producer.send_event("chat_messages", {
+
+        self.repo.add_message(Message(
+            chat_id=data.chat_id,
+            seq=seq,
+            message_id=message_id,
+            sender_id=data.user_id,
+            recipient_id=recipient,
+            is_file=data.is_file,
+            file_name=data.file_name,
+            encrypted_message=_ciphertext_bytes(data.encrypted_message),
+            iv_nonce=data.iv_nonce,
+            sent_at=_as_naive_utc(data.timestamp)
+        ))
+        self.repo.add_outbox_events("chat_messages", self.producer.serialize_for_users({
             "type": "file" if data.is_file else "message",
             "chat_id": data.chat_id,
             "sender": data.user_id,
-            "recipient": recipient,
             "data": message
-        })
+        }, [recipient]))
+        await self.repo.commit()
 
         return SendMessageResponse(
             chat_id=data.chat_id,
             user_id=data.user_id,
-            message_id=message_id
+            message_id=message_id,
+            seq=seq
         )
+
+    async def send_file_chunk(self, data: SendFileChunkRequest) -> SendFileChunkResponse:
+        if data.seq >= data.total_chunks:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Chunk sequence number out of range")
+
+        recipient = await self._get_recipient(data.chat_id, data.user_id)
+        encrypted_chunk = _ciphertext_bytes(data.encrypted_chunk)
+        message_seq = None
+        if await self.repo.add_file_chunk(data.chat_id, data.transfer_id, data.seq, encrypted_chunk, data.iv_nonce):
+            # The chat lock makes the chunks committed before it visible to the count, so exactly one request sees the last one
+            if not await self.repo.lock_chat(data.chat_id):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Chat not found")
+            completed = await self.repo.count_file_chunks(data.chat_id, data.transfer_id) == data.total_chunks
+            if completed and not await self.repo.has_message(data.chat_id, data.transfer_id):
+                message_seq = await self.repo.next_message_seq(data.chat_id)
+                self.repo.add_message(Message(
+                    chat_id=data.chat_id,
+                    seq=message_seq,
+                    message_id=data.transfer_id,
+                    sender_id=data.user_id,
+                    recipient_id=recipient,
+                    is_file=True,
+                    file_name=data.file_name,
+                    encrypted_message=b"",
+                    iv_nonce="",
+                    sent_at=_as_naive_utc(data.timestamp),
+                    transfer_id=data.transfer_id,
+                    sha256=data.sha256,
+                    total_chunks=data.total_chunks,
+                    file_size=data.file_size
+                ))
+        else:
+            # A resent chunk, e.g. the last one after its response was lost, still reports the file's seq
+            message = await self.repo.get_message(data.chat_id, data.transfer_id)
+            message_seq = message.seq if message is not None else None
+
+        chunk = {
+            "message_id": data.transfer_id,
+            "transfer_id": data.transfer_id,
+            "chat_id": data.chat_id,
+            "sender": data.user_id,
+            "recipient": recipient,
+            "seq": data.seq,
+            "total_chunks": data.total_chunks,
+            "file_name": data.file_name,
+            "file_size": data.file_size,
+            "sha256": data.sha256,
+            "encrypted_chunk": data.encrypted_chunk,
+            "iv_nonce": data.iv_nonce,
+            "timestamp": data.timestamp.isoformat(),
+            "message_seq": message_seq
+        }
+
+        self.repo.add_outbox_events("chat_messages", self.producer.serialize_for_users({
+            "type": "file_chunk",
+            "chat_id": data.chat_id,
+            "sender": data.user_id,
+            "data": chunk
+        }, [recipient]))
+        await self.repo.commit()
+
+        return SendFileChunkResponse(
+            chat_id=data.chat_id,
+            user_id=data.user_id,
+            transfer_id=data.transfer_id,
+            seq=data.seq,
+            message_seq=message_seq
+        )
+
+    async def get_history(self, chat_id: str, user_id: str, after: int, limit: int) -> GetMessageHistoryResponse:
+        membership = await self._get_membership(chat_id)
+        if user_id not in membership.participants:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not a participant")
+
+        # Read before the rows, so every seq up to it is committed and the page covers it completely
+        last_seq = await self.repo.get_last_message_seq(chat_id) or 0
+        # Only rows encrypted for this user, the others are under another participant's key.
+        # One extra row tells whether another page follows without a COUNT
+        rows = await self.repo.get_messages_after(chat_id, user_id, after, last_seq, limit + 1)
+        page = rows[:limit]
+        has_more = len(rows) > limit
+        return GetMessageHistoryResponse(
+            chat_id=chat_id,
+            messages=[
+                HistoryMessage(
+                    message_id=row.message_id,
+                    seq=row.seq,
+                    chat_id=row.chat_id,
+                    sender=row.sender_id,
+                    recipient=row.recipient_id,
+                    encrypted_message=base64.b64encode(row.encrypted_message).decode("utf-8"),
+                    iv_nonce=row.iv_nonce,
+                    is_file=row.is_file,
+                    file_name=row.file_name,
+                    timestamp=row.sent_at,
+                    transfer_id=row.transfer_id,
+                    sha256=row.sha256,
+                    total_chunks=row.total_chunks,
+                    file_size=row.file_size
+                )
+                for row in page
+            ],
+            # Seqs up to next_after that are not in the page belong to other recipients
+            next_after=page[-1].seq if has_more else max(last_seq, after),
+            has_more=has_more
+        )
+
+    async def get_file_chunks(self, chat_id: str, transfer_id: str, user_id: str,
+                              after: int, limit: int) -> GetFileChunksResponse:
+        message = await self.repo.get_message(chat_id, transfer_id)
+        # Chunks are encrypted for the recipient, only a completed transfer is served
+        if message is None or message.transfer_id is None or message.recipient_id != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Transfer not found")
+
+        rows = await self.repo.get_file_chunks(chat_id, transfer_id, after, limit + 1)
+        return GetFileChunksResponse(
+            chat_id=chat_id,
+            transfer_id=transfer_id,
+            chunks=[
+                FileChunkItem(
+                    seq=row.seq,
+                    encrypted_chunk=base64.b64encode(row.encrypted_chunk).decode("utf-8"),
+                    iv_nonce=row.iv_nonce
+                )
+                for row in rows[:limit]
+            ],
+            has_more=len(rows) > limit
+        )
+
+    async def _get_membership(self, chat_id: str) -> ChatMembership:
+        membership = self.membership.get(chat_id)
+        if membership is None:
+            chat = await self.repo.get_chat_with_participants(chat_id)
+            if not chat:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Chat not found")
+            membership = ChatMembership.from_chat(chat)
+            if membership.status == ChatStatus.secure:
+                self.membership.put(membership)
+        return membership
+
+    async def _get_recipient(self, chat_id: str, user_id: str) -> str:
+        membership = await self._get_membership(chat_id)
+        if user_id not in membership.participants:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not a participant")
+
+        if not membership.status == ChatStatus.secure:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Encryption not established for this chat")
+
+        return membership.other_participants(user_id)[0]
+
+def _ciphertext_bytes(encrypted_message: bytes | str) -> bytes:
+    # JSON clients send base64 text, envelope clients send the raw ciphertext
+    if isinstance(encrypted_message, str):
+        try:
+            return base64.b64decode(encrypted_message, validate=True)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="encrypted_message is not valid base64")
+    return encrypted_message
+
+def _as_naive_utc(timestamp: datetime) -> datetime:
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)